@@ -1,4 +1,3 @@
-from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.gdal import SpatialReference
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
@@ -8,7 +7,7 @@ from rest_framework import viewsets
 from rest_framework.exceptions import ParseError
 
 from services.api_pagination import Pagination
-from services.utils import strtobool
+from services.utils import order_by_nearest, strtobool
 
 from ..models import BicycleNetwork, BicycleNetworkPart
 from .serializers import (
@@ -76,9 +75,7 @@ class BicycleNetworkPartViewSet(viewsets.ReadOnlyModelViewSet):
                 queryset = queryset.filter(
                     geometry__distance_lte=(point, D(m=distance))
                 )
-            queryset = queryset.annotate(distance=Distance("geometry", point)).order_by(
-                "distance"
-            )
+            queryset = order_by_nearest(queryset, "geometry", point)
         # Return elements that are inside bbox
         if "bbox" in filters:
             val = filters.get("bbox", None)
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bicycle_network", "0012_alter_bicyclenetwork_options_and_more"),
+    ]
+    operations = [
+        # Index for the nearest first ordering, which uses the KNN operator
+        # on the geography of the lon/lat geometries.
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX bicyclenetworkpart_geography_idx
+            ON bicycle_network_bicyclenetworkpart USING GIST ((geometry::geography));
+            """,
+            reverse_sql="""
+            DROP INDEX bicyclenetworkpart_geography_idx;
+            """,
+        ),
+    ]
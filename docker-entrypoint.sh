@@ -39,6 +39,13 @@ elif [ "$1" = 'maintenance_tasks' ]; then
 elif [ "$1" ]; then
     echo "Running command: $1"
     $1
+elif [[ "$SERVER_INTERFACE" = "asgi" ]]; then
+    # Static files are served by WhiteNoise
+    su -s /bin/bash nobody --command "exec uvicorn smbackend.asgi:application \
+               --host 0.0.0.0 --port 8000 \
+               --workers ${ASGI_WORKERS:-4} \
+               --root-path '${URL_PREFIX:-}' \
+               --proxy-headers"
 else
     su -s /bin/bash nobody --command "exec uwsgi --plugin http,python3 --master --http :8000 \
                --processes 4 --threads 1 \
@@ -7,6 +7,8 @@ from rest_framework.decorators import action
 from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
+from services.api_pagination import KeysetPaginationMixin
+
 from ..models import (
     CSV_DATA_SOURCES,
     Day,
@@ -88,7 +90,7 @@ class StationViewSet(viewsets.ReadOnlyModelViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class HourDataViewSet(viewsets.ReadOnlyModelViewSet):
+class HourDataViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = HourData.objects.all()
     serializer_class = HourDataSerializer
 
@@ -98,7 +100,7 @@ class HourDataViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class DayDataViewSet(viewsets.ReadOnlyModelViewSet):
+class DayDataViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = DayData.objects.all()
     serializer_class = DayDataSerializer
 
@@ -127,7 +129,7 @@ class DayDataViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class WeekDataViewSet(viewsets.ReadOnlyModelViewSet):
+class WeekDataViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = WeekData.objects.all()
     serializer_class = WeekDataSerializer
 
@@ -176,7 +178,7 @@ class WeekDataViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class MonthDataViewSet(viewsets.ReadOnlyModelViewSet):
+class MonthDataViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MonthData.objects.all()
     serializer_class = MonthDataSerializer
 
@@ -226,7 +228,7 @@ class MonthDataViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class YearDataViewSet(viewsets.ReadOnlyModelViewSet):
+class YearDataViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = YearData.objects.all()
     serializer_class = YearDataSerializer
 
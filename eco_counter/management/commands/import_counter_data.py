@@ -40,6 +40,7 @@ from eco_counter.models import (
     Year,
     YearData,
 )
+from services.import_runs import add_import_rows, import_phase, records_import_run
 
 from .utils import (
     check_counters_argument,
@@ -478,14 +479,18 @@ def import_data(counters, initial_import=False, force=False):
         start_time = get_start_time(counter, import_state)
 
         if counter == TELRAAM_COUNTER:
-            save_telraam_data(start_time)
+            with import_phase(counter):
+                save_telraam_data(start_time)
         else:
-            csv_data = get_csv_data(counter, import_state, start_time)
-            save_observations(
-                csv_data,
-                start_time,
-                csv_data_source=counter,
-            )
+            with import_phase(f"{counter} fetch"):
+                csv_data = get_csv_data(counter, import_state, start_time)
+            with import_phase(f"{counter} write"):
+                save_observations(
+                    csv_data,
+                    start_time,
+                    csv_data_source=counter,
+                )
+                add_import_rows(len(csv_data))
             # Try to free some memory
             del csv_data
             gc.collect()
@@ -533,6 +538,7 @@ class Command(BaseCommand):
             help="Force the initial import and discard data check",
         )
 
+    @records_import_run()
     def handle(self, *args, **options):
         initial_import_counters = None
         start_time = None
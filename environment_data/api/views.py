@@ -1,5 +1,4 @@
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, extend_schema_view
 from rest_framework import viewsets
@@ -29,6 +28,7 @@ from environment_data.models import (
     WeekData,
     YearData,
 )
+from services.response_cache import generation_cache_page
 
 from .utils import (
     DayDataFilterSet,
@@ -52,7 +52,7 @@ class StationViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_class = StationFilterSet
 
-    @method_decorator(cache_page(60 * 60))
+    @method_decorator(generation_cache_page(60 * 60, "environment_data"))
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
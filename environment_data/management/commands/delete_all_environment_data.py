@@ -13,12 +13,14 @@ from environment_data.models import (
     Week,
     Year,
 )
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
     @db.transaction.atomic
+    @invalidates_cache("environment_data")
     def handle(self, *args, **options):
         logger.info("Deleting all environment data...")
         logger.info(f"{Station.objects.all().delete()}")
@@ -33,6 +33,8 @@ from environment_data.models import (
     Year,
     YearData,
 )
+from services.import_runs import add_import_rows, import_phase, records_import_run
+from services.response_cache import invalidates_cache
 
 from .utils import (
     create_row,
@@ -483,6 +485,8 @@ class Command(BaseCommand):
                     f"Invalid data type, valid types are: {VALID_DATA_TYPE_CHOICES}."
                 )
 
+    @invalidates_cache("environment_data")
+    @records_import_run()
     def handle(self, *args, **options):
         start_time = datetime.now()
         initial_import = options.get("initial_import", False)
@@ -523,29 +527,32 @@ class Command(BaseCommand):
             else:
                 import_state = ImportState.objects.get(data_type=data_type)
 
-            match data_type:
-                case DATA_TYPES.AIR_QUALITY:
-                    stations = get_stations(aq_constants.STATION_MATCH_STRINGS)
-                    df = am_utils.get_dataframe(
-                        stations,
-                        import_state.year_number,
-                        import_state.month_number,
-                        initial_import,
-                    )
-                case DATA_TYPES.WEATHER_OBSERVATION:
-                    stations = get_stations(wo_constants.STATION_MATCH_STRINGS)
-                    df = wo_utils.get_dataframe(
-                        stations,
-                        import_state.year_number,
-                        import_state.month_number,
-                        initial_import,
-                    )
-            save_stations(
-                stations, data_type, initial_import_stations=initial_import_stations
-            )
-            save_parameter_types(df, data_type, initial_import)
-            save_measurements(df, data_type, initial_import)
-            save_station_parameters(data_type)
+            with import_phase(f"{data_type} fetch"):
+                match data_type:
+                    case DATA_TYPES.AIR_QUALITY:
+                        stations = get_stations(aq_constants.STATION_MATCH_STRINGS)
+                        df = am_utils.get_dataframe(
+                            stations,
+                            import_state.year_number,
+                            import_state.month_number,
+                            initial_import,
+                        )
+                    case DATA_TYPES.WEATHER_OBSERVATION:
+                        stations = get_stations(wo_constants.STATION_MATCH_STRINGS)
+                        df = wo_utils.get_dataframe(
+                            stations,
+                            import_state.year_number,
+                            import_state.month_number,
+                            initial_import,
+                        )
+            with import_phase(f"{data_type} write"):
+                save_stations(
+                    stations, data_type, initial_import_stations=initial_import_stations
+                )
+                save_parameter_types(df, data_type, initial_import)
+                save_measurements(df, data_type, initial_import)
+                save_station_parameters(data_type)
+                add_import_rows(len(df))
             logger.info(
                 f"Imported {DATA_TYPES_FULL_NAME[data_type]} observations until:{str(df.index[-1])}"
             )
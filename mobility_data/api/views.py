@@ -6,13 +6,14 @@ from django.core.exceptions import ValidationError
 from django.db import connection, reset_queries
 from django.db.models import Q
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from munigeo import api as munigeo_api
 from rest_framework import status, viewsets
 from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
+from services.api_pagination import KeysetPaginationMixin
 from services.models import Unit
+from services.response_cache import generation_cache_page
 from services.utils import strtobool
 
 from ..models import ContentType, GroupType, MobileUnit, MobileUnitGroup
@@ -122,9 +123,10 @@ class MobileUnitGroupViewSet(viewsets.ReadOnlyModelViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class MobileUnitViewSet(viewsets.ReadOnlyModelViewSet):
+class MobileUnitViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = MobileUnit.objects.filter(is_active=True)
     serializer_class = MobileUnitSerializer
+    keyset_ordering = "id"
 
     def retrieve(self, request, pk=None):
         try:
@@ -238,7 +240,7 @@ class MobileUnitViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
-    @method_decorator(cache_page(60 * 60))
+    @method_decorator(generation_cache_page(60 * 60, "mobility_data"))
     def list(self, request):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
@@ -11,7 +11,6 @@ import requests
 import yaml
 from django import db
 from django.conf import settings
-from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.gdal import DataSource as GDALDataSource
 from django.contrib.gis.geos import GEOSGeometry
 from munigeo.models import (
@@ -25,6 +24,7 @@ from munigeo.models import (
 
 from mobility_data.models import ContentType, DataSource, MobileUnit
 from services.models import Unit
+from services.utils import order_by_nearest
 
 logger = logging.getLogger("mobility_data")
 
@@ -152,11 +152,7 @@ def get_closest_address(point):
     """
     Return the closest address to the point.
     """
-    address = (
-        Address.objects.annotate(distance=Distance("location", point))
-        .order_by("distance")
-        .first()
-    )
+    address = order_by_nearest(Address.objects.all(), "location", point).first()
     return address
 
 
@@ -1,6 +1,7 @@
 from django.core.management import BaseCommand
 
 from mobility_data.models import ContentType, GroupType
+from services.response_cache import invalidates_cache
 
 """
 This command removes all units that have a ContentType or
@@ -10,6 +11,7 @@ as only the name will be used in future.
 
 
 class Command(BaseCommand):
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         ContentType.objects.filter(type_name__isnull=False).delete()
         GroupType.objects.filter(type_name__isnull=False).delete()
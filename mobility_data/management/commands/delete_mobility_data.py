@@ -4,6 +4,7 @@ from django.core.management import BaseCommand
 
 from mobility_data.importers.utils import delete_mobile_units
 from mobility_data.models import ContentType
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
@@ -18,6 +19,7 @@ class Command(BaseCommand):
             help="Give names of the content types to be removed as arguments",
         )
 
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         for content_type_name in options["content_type_names"]:
             delete_mobile_units(content_type_name)
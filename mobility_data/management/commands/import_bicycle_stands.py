@@ -12,11 +12,13 @@ from mobility_data.importers.utils import (
     log_imported_message,
     save_to_database,
 )
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
 
 class Command(BaseCommand):
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         logger.info("Importing bicycle stands from: {}".format(BICYCLE_STANDS_URL))
         objects = get_bicycle_stand_objects()
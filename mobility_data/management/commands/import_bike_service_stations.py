@@ -11,11 +11,13 @@ from mobility_data.importers.utils import (
     log_imported_message,
     save_to_database,
 )
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
 
 class Command(BaseCommand):
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         logger.info("Importing bike service stations.")
         objects = get_bike_service_station_objects()
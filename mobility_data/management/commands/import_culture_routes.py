@@ -8,6 +8,7 @@ from mobility_data.importers.culture_routes import (
     save_to_database,
 )
 from mobility_data.models import MobileUnitGroup
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
@@ -21,6 +22,7 @@ class Command(BaseCommand):
             help="Deletes Culture Routes before importing. ",
         )
 
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         logger.info("Importing culture routes...")
         delete_tables = options.get("delete", False)
@@ -13,11 +13,13 @@ from mobility_data.importers.utils import (
     log_imported_message,
     save_to_database,
 )
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
 
 class Command(BaseCommand):
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         car_stops = get_parkandride_car_stop_objects()
         content_type = get_or_create_content_type_from_config(
@@ -11,11 +11,13 @@ from mobility_data.importers.utils import (
     log_imported_message,
     save_to_database,
 )
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
 
 class Command(BaseCommand):
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         objects = get_filtered_gas_filling_station_objects()
         content_type = get_or_create_content_type_from_config(CONTENT_TYPE_NAME)
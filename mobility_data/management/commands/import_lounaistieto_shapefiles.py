@@ -8,6 +8,7 @@ from mobility_data.importers.lounaistieto_shapefiles import (
     import_lounaistieto_data_source,
 )
 from mobility_data.importers.utils import delete_mobile_units, get_root_dir
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 CONFIG_FILE = "lounaistieto_shapefiles_config.yml"
@@ -24,6 +25,7 @@ class Command(BaseCommand):
             help="",
         )
 
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         if options["delete_data_source"]:
             content_type = options["delete_data_source"]
@@ -10,6 +10,8 @@ from django.core.management import BaseCommand
 from mobility_data.management.commands.import_wfs import (
     get_configured_cotent_type_names,
 )
+from services.import_runs import import_phase, records_import_run
+from services.response_cache import invalidates_cache
 
 # Names of the mobility_data importers to be include when importing data.
 importers = [
@@ -34,8 +36,12 @@ logger = logging.getLogger("mobility_data")
 
 
 class Command(BaseCommand):
+    @invalidates_cache("mobility_data")
+    @records_import_run()
     def handle(self, *args, **options):
         logger.info("Importing mobility data...")
-        management.call_command("import_wfs", wfs_content_type_names)
+        with import_phase("wfs"):
+            management.call_command("import_wfs", wfs_content_type_names)
         for importer in importers:
-            management.call_command(f"import_{importer}")
+            with import_phase(importer):
+                management.call_command(f"import_{importer}")
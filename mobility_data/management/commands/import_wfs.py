@@ -5,6 +5,7 @@ from django.core.management import BaseCommand
 
 from mobility_data.importers.utils import get_root_dir
 from mobility_data.importers.wfs import import_wfs_feature
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("mobility_data")
 
@@ -41,6 +42,7 @@ class Command(BaseCommand):
             "content_type_names", nargs="*", help=", ".join(self.choices)
         )
 
+    @invalidates_cache("mobility_data")
     def handle(self, *args, **options):
         if options["config_file"]:
             self.config = get_yaml_config(options["config_file"])
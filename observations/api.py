@@ -1,3 +1,4 @@
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import viewsets
 from rest_framework.exceptions import AuthenticationFailed
@@ -41,10 +42,8 @@ class ObservableSerializerMixin:
             ).data
         if "observations" in self.context.get("include", []):
             observations = self.get_observations(obj)
-            if observations:
-                data["observations"] = ObservationSerializer(
-                    observations, many=True
-                ).data
+            if observations is not None:
+                data["observations"] = observations
 
         return data
 
@@ -64,7 +63,11 @@ class ObservableUnitSerializer(ObservableSerializerMixin, UnitSerializer):
         )
 
     def get_observations(self, unit):
-        return unit.observation_set
+        try:
+            snapshot = unit.observation_snapshot
+        except models.UnitObservationSnapshot.DoesNotExist:
+            return []
+        return snapshot.get_current_observations(timezone.now())
 
 
 UnitViewSet.serializer_class = ObservableUnitSerializer
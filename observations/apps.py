@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class ObservationsConfig(AppConfig):
+    name = "observations"
+
+    def ready(self):
+        # register signals
+        from observations import signals  # noqa: F401
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from observations.snapshots import (
+    expire_unit_observation_snapshots,
+    update_all_unit_observation_snapshots,
+)
+
+
+class Command(BaseCommand):
+    help = "Update the observation snapshots of units"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--expired-only",
+            action="store_true",
+            help="Only rebuild the snapshots containing expired observations",
+        )
+
+    def handle(self, **options):
+        if options["expired_only"]:
+            count = expire_unit_observation_snapshots()
+        else:
+            count = update_all_unit_observation_snapshots()
+        self.stdout.write("Updated {} observation snapshots.".format(count))
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("observations", "0009_alter_observation_polymorphic_ctype"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnitObservationSnapshot",
+            fields=[
+                (
+                    "unit",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="observation_snapshot",
+                        serialize=False,
+                        to="services.unit",
+                    ),
+                ),
+                ("observations", models.JSONField(default=list)),
+                ("expires_at", models.DateTimeField(db_index=True, null=True)),
+            ],
+        ),
+    ]
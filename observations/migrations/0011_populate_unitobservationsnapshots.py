@@ -0,0 +1,25 @@
+# Generated by Django 4.1.13 on 2026-10-19 10:00
+
+from django.db import migrations
+
+
+def populate_unit_observation_snapshots(apps, schema_editor):
+    # The snapshots are built with the same serializer as the API output,
+    # so the current models are used instead of the historical ones.
+    from observations.snapshots import update_all_unit_observation_snapshots
+
+    update_all_unit_observation_snapshots()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("observations", "0010_unitobservationsnapshot"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            populate_unit_observation_snapshots,
+            migrations.RunPython.noop,
+            elidable=True,
+        ),
+    ]
@@ -159,6 +159,35 @@ class UnitLatestObservation(models.Model):
         unique_together = (("unit", "property"),)
 
 
+class UnitObservationSnapshot(models.Model):
+    """Serialized current observations of a unit.
+
+    Rebuilt whenever the latest observations of the unit change so that
+    units can be listed with their observations without querying the
+    observation tables. `expires_at` is the earliest expiration time of
+    the observations in the snapshot.
+    """
+
+    unit = models.OneToOneField(
+        services_models.Unit,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="observation_snapshot",
+    )
+    observations = models.JSONField(default=list)
+    expires_at = models.DateTimeField(null=True, db_index=True)
+
+    def get_current_observations(self, now):
+        if self.expires_at is None or self.expires_at > now:
+            return [o["observation"] for o in self.observations]
+        timestamp = now.timestamp()
+        return [
+            o["observation"]
+            for o in self.observations
+            if o["expires"] is None or o["expires"] > timestamp
+        ]
+
+
 class PluralityAuthToken(models.Model):
     """
     A token class which can have multiple active tokens per user.
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from observations.models import UnitLatestObservation
+from observations.snapshots import update_unit_observation_snapshot
+
+
+@receiver(post_save, sender=UnitLatestObservation)
+@receiver(post_delete, sender=UnitLatestObservation)
+def unit_latest_observation_on_change(sender, **kwargs):
+    obj = kwargs["instance"]
+    update_unit_observation_snapshot(obj.unit_id)
@@ -0,0 +1,72 @@
+from django.utils import timezone
+
+from . import models
+from .serializers import ObservationSerializer
+
+
+def update_unit_observation_snapshot(unit_id):
+    """
+    Rebuild the observation snapshot of the unit from its latest
+    observations, leaving out the expired ones.
+    """
+    now = timezone.now()
+    observations = models.Observation.objects.filter(
+        unitlatestobservation__unit_id=unit_id
+    ).select_related("property")
+    entries = []
+    expiration_times = []
+    for observation in observations:
+        expires = None
+        if observation.property.expiration:
+            expires = observation.time + observation.property.expiration
+            if expires <= now:
+                continue
+            expiration_times.append(expires)
+        entries.append(
+            {
+                "expires": expires.timestamp() if expires else None,
+                "observation": ObservationSerializer(observation).data,
+            }
+        )
+    if not entries:
+        models.UnitObservationSnapshot.objects.filter(unit_id=unit_id).delete()
+        return
+    models.UnitObservationSnapshot.objects.update_or_create(
+        unit_id=unit_id,
+        defaults={
+            "observations": entries,
+            "expires_at": min(expiration_times) if expiration_times else None,
+        },
+    )
+
+
+def expire_unit_observation_snapshots():
+    """
+    Rebuild the snapshots which contain expired observations.
+    Returns the number of rebuilt snapshots.
+    """
+    unit_ids = list(
+        models.UnitObservationSnapshot.objects.filter(
+            expires_at__lte=timezone.now()
+        ).values_list("unit_id", flat=True)
+    )
+    for unit_id in unit_ids:
+        update_unit_observation_snapshot(unit_id)
+    return len(unit_ids)
+
+
+def update_all_unit_observation_snapshots():
+    """
+    Rebuild the snapshots of all units with observations.
+    Returns the number of rebuilt snapshots.
+    """
+    unit_ids = (
+        models.UnitLatestObservation.objects.values_list("unit_id", flat=True)
+        .order_by("unit_id")
+        .distinct()
+    )
+    count = 0
+    for unit_id in unit_ids:
+        update_unit_observation_snapshot(unit_id)
+        count += 1
+    return count
@@ -0,0 +1,13 @@
+from django.core import management
+
+from smbackend.utils import shared_task_email
+
+
+@shared_task_email
+def expire_observation_snapshots(name="expire_observation_snapshots"):
+    management.call_command("update_observation_snapshots", "--expired-only")
+
+
+@shared_task_email
+def update_observation_snapshots(name="update_observation_snapshots"):
+    management.call_command("update_observation_snapshots")
@@ -0,0 +1,32 @@
+import datetime as d
+
+import pytest
+from django.utils import timezone
+
+from observations.models import UnitLatestObservation, UnitObservationSnapshot
+from observations.snapshots import expire_unit_observation_snapshots
+
+
+@pytest.mark.django_db
+def test__snapshot_follows_latest_observations(unit, unit_latest_observation):
+    snapshot = UnitObservationSnapshot.objects.get(unit=unit)
+    observations = snapshot.get_current_observations(timezone.now())
+    assert len(observations) == 1
+    assert observations[0]["id"] == unit_latest_observation.observation_id
+
+    UnitLatestObservation.objects.filter(unit=unit).delete()
+    assert not UnitObservationSnapshot.objects.filter(unit=unit).exists()
+
+
+@pytest.mark.django_db
+def test__expired_snapshots_are_rebuilt(unit, unit_latest_observation):
+    snapshot = UnitObservationSnapshot.objects.get(unit=unit)
+    later = timezone.now() + d.timedelta(hours=1)
+    assert snapshot.get_current_observations(later) == []
+
+    UnitObservationSnapshot.objects.filter(unit=unit).update(
+        expires_at=timezone.now() - d.timedelta(minutes=1)
+    )
+    assert expire_unit_observation_snapshots() == 1
+    snapshot.refresh_from_db()
+    assert len(snapshot.observations) == 1
@@ -3,6 +3,7 @@ import logging
 from django.core.management import BaseCommand
 
 from ptv.importers.ptv import PTVImporter
+from services.response_cache import invalidates_cache
 
 
 class Command(BaseCommand):
@@ -11,6 +12,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("area_codes", nargs="+", type=str)
 
+    @invalidates_cache("service_node_tree")
     def handle(self, *args, **options):
         for area_code in options["area_codes"]:
             logger = logging.getLogger(__name__)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Measure the throughput and latency of the API under concurrent load.
+
+Run the application once with WSGI (uwsgi) and once with ASGI
+(SERVER_INTERFACE=asgi, optionally with CONCURRENT_QUERIES=true) and
+compare the results, e.g.
+
+    ./scripts/benchmark_concurrent_load.py http://localhost:8000 \
+        --concurrency 32 --requests 2000
+
+The default paths are read-only high-traffic endpoints. The search path
+contains a cache buster so that the response cache is bypassed.
+"""
+import argparse
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_PATHS = [
+    "/api/v2/search/?q=koulu&nocache={nonce}",
+    "/api/v2/search/?q=kirjasto&type=unit,address&nocache={nonce}",
+    "/api/v2/unit/?page_size=100",
+    "/api/v2/service_node/?page_size=100",
+]
+
+
+def fetch(session, url):
+    start = time.perf_counter()
+    response = session.get(url)
+    return time.perf_counter() - start, response.status_code
+
+
+def run(base_url, paths, concurrency, num_requests):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=concurrency, pool_maxsize=concurrency
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    urls = [
+        base_url + paths[i % len(paths)].format(nonce=uuid.uuid4().hex)
+        for i in range(num_requests)
+    ]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda url: fetch(session, url), urls))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status != 200)
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"Base URL:     {base_url}")
+    print(f"Concurrency:  {concurrency}")
+    print(f"Requests:     {num_requests} ({errors} errors)")
+    print(f"Throughput:   {num_requests / elapsed:.1f} req/s")
+    print(f"Latency p50:  {quantiles[49] * 1000:.1f} ms")
+    print(f"Latency p95:  {quantiles[94] * 1000:.1f} ms")
+    print(f"Latency p99:  {quantiles[98] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("base_url", help="E.g. http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument(
+        "--path",
+        action="append",
+        dest="paths",
+        help="Path to request, can be given multiple times. "
+        "{nonce} is replaced with a random string.",
+    )
+    args = parser.parse_args()
+    run(
+        args.base_url.rstrip("/"),
+        args.paths or DEFAULT_PATHS,
+        args.concurrency,
+        args.requests,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,112 @@
+import hashlib
+import json
 import os
+import threading
+import time
 
 from django.conf import settings
 
 from .scripts import accessibility_rules
 
+EQ, NEQ, AND, OR = range(4)
+OPERATORS = {"EQ": EQ, "NEQ": NEQ, "AND": AND, "OR": OR}
+
+
+class OperatorError(Exception):
+    def __init__(self, operator):
+        self.message = "Invalid operator {}".format(operator)
+
+
+class CompiledRules(object):
+    """
+    Flat, indexed form of the accessibility rules.
+
+    The nodes of the rule trees are numbered and their attributes are kept
+    in lists indexed by the node number. The operands of a leaf node are a
+    (property id, value) tuple and the operands of a compound node are a
+    tuple of the numbers of its child nodes. `profile_roots` maps the first
+    character of the rule keys, i.e. the profile id, to the root nodes of
+    the rules of the profile.
+
+    The rules are also kept as pre-rendered JSON together with a hash of
+    their content.
+    """
+
+    def __init__(self, rules, messages):
+        self.rules = rules
+        self.messages = messages
+        self.operators = []
+        self.operands = []
+        self.ids = []
+        self.requirement_ids = []
+        self.segments = []
+        self.message_ids = []
+        self.property_ids = set()
+        self.profile_roots = {}
+        for key, rule in rules.items():
+            if rule is None:
+                continue
+            root = self._add_node(rule)
+            self.profile_roots.setdefault(str(key)[0], []).append(root)
+
+        self.json = json.dumps(
+            {"rules": rules, "messages": messages}, ensure_ascii=False
+        ).encode("utf-8")
+        self.hash = hashlib.sha256(
+            json.dumps([rules, messages], sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def _add_node(self, rule):
+        is_leaf = not isinstance(rule["operands"][0], dict)
+        if rule["operator"] not in (["EQ", "NEQ"] if is_leaf else ["AND", "OR"]):
+            raise OperatorError(rule["operator"])
+        node = len(self.operators)
+        msg = rule["msg"]
+        self.operators.append(OPERATORS[rule["operator"]])
+        self.operands.append(None)
+        self.ids.append(rule["id"])
+        self.requirement_ids.append(rule.get("requirement_id"))
+        self.segments.append(rule["path"][0] if rule["path"] else None)
+        self.message_ids.append(
+            msg if msg is not None and msg < len(self.messages) else None
+        )
+        if is_leaf:
+            self.property_ids.add(rule["operands"][0])
+            self.operands[node] = tuple(rule["operands"][:2])
+        else:
+            self.operands[node] = tuple(
+                self._add_node(operand) for operand in rule["operands"]
+            )
+        return node
+
 
 class AccessibilityRules(object):
+    # Seconds between the checks for a modified data file.
+    check_interval = 60
+
     def __init__(self, data_paths, filename):
         self.data_paths = data_paths
         self.filename = filename
         self.modified_time = None
-        self.tree = None
-        self.messages = None
+        self.checked_at = None
+        self.compiled = None
+        self.lock = threading.Lock()
 
     def get_data(self):
-        if self.is_data_file_modified():
-            self._parse()
-        return self.tree, self.messages
+        compiled = self.get_compiled()
+        return compiled.rules, compiled.messages
+
+    def get_compiled(self):
+        with self.lock:
+            if self.is_data_file_modified():
+                self._parse()
+            return self.compiled
 
     def is_data_file_modified(self):
+        now = time.monotonic()
+        if self.compiled is not None and now - self.checked_at < self.check_interval:
+            return False
+        self.checked_at = now
         datafile = self.find_data_file(self.filename)
         new_time = os.path.getmtime(datafile)
         if self.modified_time is None or new_time > self.modified_time:
@@ -34,16 +122,17 @@ class AccessibilityRules(object):
         raise FileNotFoundError("Data file '%s' not found" % data_file)
 
     def _parse(self):
-        tree, self.messages = accessibility_rules.parse_accessibility_rules(
+        tree, messages = accessibility_rules.parse_accessibility_rules(
             self.find_data_file(self.filename)
         )
 
-        self.tree = {}
+        rules = {}
         mode_letters = "ABC"
         for case, expression in tree.items():
             for mode in range(0, len(expression.messages["case_names"])):
                 expression.set_mode(mode)
-                self.tree[str(case) + mode_letters[mode]] = expression.val()
+                rules[str(case) + mode_letters[mode]] = expression.val()
+        self.compiled = CompiledRules(rules, messages)
 
 
 if hasattr(settings, "PROJECT_ROOT"):
@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.db.models import OuterRef, Subquery
 from modeltranslation.admin import TranslationAdmin
 
+from services.models import ImportRun
 from services.models.notification import Announcement, ErrorMessage
 
 
@@ -10,5 +12,68 @@ class NotificationAdmin(TranslationAdmin):
     list_filter = ("active",)
 
 
+class ImportRunAdmin(admin.ModelAdmin):
+    """
+    History of the import runs. Filtering by the name of the import lists
+    its runs over time with the change of the duration from the previous
+    successful run.
+    """
+
+    list_display = (
+        "name",
+        "started_at",
+        "status",
+        "get_duration",
+        "get_duration_change",
+        "query_count",
+        "row_count",
+        "get_peak_memory",
+        "get_phases",
+    )
+    list_filter = ("name", "status")
+    date_hierarchy = "started_at"
+
+    def get_readonly_fields(self, request, obj=None):
+        return [f.name for f in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="duration", ordering="duration")
+    def get_duration(self, obj):
+        return None if obj.duration is None else "%.1f s" % obj.duration
+
+    def get_queryset(self, request):
+        previous_runs = ImportRun.objects.filter(
+            name=OuterRef("name"),
+            arguments=OuterRef("arguments"),
+            status=ImportRun.SUCCEEDED,
+            started_at__lt=OuterRef("started_at"),
+        ).order_by("-started_at")
+        return (
+            super(ImportRunAdmin, self)
+            .get_queryset(request)
+            .annotate(previous_duration=Subquery(previous_runs.values("duration")[:1]))
+        )
+
+    @admin.display(description="change from previous run")
+    def get_duration_change(self, obj):
+        previous = obj.previous_duration
+        if obj.duration is None or not previous:
+            return None
+        return "{:+.0f} %".format((obj.duration - previous) / previous * 100)
+
+    @admin.display(description="peak memory", ordering="peak_memory")
+    def get_peak_memory(self, obj):
+        return None if obj.peak_memory is None else "%.0f MB" % (obj.peak_memory / 1024)
+
+    @admin.display(description="phases")
+    def get_phases(self, obj):
+        return ", ".join(
+            "%s %.1f s" % (phase["name"], phase["duration"]) for phase in obj.phases
+        )
+
+
 admin.site.register(Announcement, NotificationAdmin)
 admin.site.register(ErrorMessage, NotificationAdmin)
+admin.site.register(ImportRun, ImportRunAdmin)
@@ -3,45 +3,58 @@ import re
 import uuid
 
 from django.conf import settings
-from django.contrib.gis.db.models.functions import Distance
 from django.contrib.gis.gdal import SpatialReference
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import D
 from django.core.exceptions import ValidationError
-from django.db.models import F, Prefetch, Q
-from django.http import Http404
+from django.db.models import Exists, OuterRef, Prefetch, Q
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.utils import timezone, translation
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
 from django.utils.module_loading import import_string
 from django_filters.rest_framework import DjangoFilterBackend
 from modeltranslation.translator import NotRegistered, translator
 from mptt.utils import drilldown_tree_for_node
 from munigeo import api as munigeo_api
-from munigeo.models import AdministrativeDivision, Municipality
 from rest_framework import generics, renderers, serializers, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 
-from observations.models import Observation
 from services.accessibility import RULES
+from services.api_pagination import KeysetPagination, KeysetPaginationMixin
+from services.departments import DEPARTMENTS
+from services.divisions import DIVISIONS, within_divisions_filter
 from services.models import (
     Announcement,
     Department,
     ErrorMessage,
     Service,
+    ServiceDivisionUnitCount,
     ServiceNode,
+    ServiceNodeDivisionUnitCount,
     Unit,
     UnitAccessibilityProperty,
     UnitAccessibilityShortcomings,
     UnitAlias,
+    UnitChange,
     UnitConnection,
     UnitEntrance,
     UnitIdentifier,
     UnitServiceDetails,
 )
 from services.models.unit import CONTRACT_TYPES, ORGANIZER_TYPES, PROVIDER_TYPES
-from services.utils import check_valid_concrete_field
+from services.municipalities import MUNICIPALITIES
+from services.response_cache import record_request
+from services.service_node_tree import SERVICE_NODE_TREE, TREE_DOMAIN
+from services.utils import (
+    check_valid_concrete_field,
+    filter_by_address,
+    order_by_nearest,
+)
 
 if settings.REST_FRAMEWORK and settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"]:
     DEFAULT_RENDERERS = [
@@ -201,7 +214,7 @@ def root_service_nodes(services):
 
 
 def resolve_divisions(divisions):
-    div_list = []
+    ocd_ids = []
     for division_path in divisions:
         if division_path.startswith("ocd-division"):
             muni_ocd_id = division_path
@@ -214,18 +227,128 @@ def resolve_divisions(divisions):
 
             arr = division_path.split("/")
             muni_ocd_id = make_muni_ocd_id(arr.pop(0), "/".join(arr))
-        try:
-            div = AdministrativeDivision.objects.select_related("geometry").get(
-                ocd_id=muni_ocd_id
-            )
-        except AdministrativeDivision.DoesNotExist:
+        ocd_ids.append(muni_ocd_id)
+
+    divs_by_ocd_id = DIVISIONS.get_many(ocd_ids)
+    div_list = []
+    for ocd_id in ocd_ids:
+        if ocd_id not in divs_by_ocd_id:
             raise ParseError(
-                "administrative division with OCD ID '%s' not found" % muni_ocd_id
+                "administrative division with OCD ID '%s' not found" % ocd_id
             )
-        div_list.append(div)
+        div_list.append(divs_by_ocd_id[ocd_id])
     return div_list
 
 
+def get_division_params(request):
+    division = request.query_params.get("division", "")
+    return [x.strip() for x in division.split(",") if x]
+
+
+def resolve_count_divisions(divisions, count_model):
+    """
+    Resolve the divisions of `unit_count_per_division`. The counts are
+    precomputed only for the types in settings.UNIT_COUNT_DIVISION_TYPES,
+    so other types are rejected. Return the divisions and the ids of the
+    divisions without precomputed counts, e.g. divisions imported after
+    the last recount, which are counted live.
+    """
+    div_list = resolve_divisions(divisions)
+    count_types = settings.UNIT_COUNT_DIVISION_TYPES
+    for div in div_list:
+        if count_types and div.type not in count_types:
+            raise ParseError(
+                "unit counts are not available for divisions of type '%s'" % div.type
+            )
+    div_ids = set(div.id for div in div_list)
+    counted_ids = set(
+        count_model.objects.filter(division_id__in=div_ids)
+        .values_list("division_id", flat=True)
+        .distinct()
+    )
+    return div_list, div_ids - counted_ids
+
+
+def count_service_units(service, division):
+    return (
+        Unit.objects.filter(public=True, is_active=True, services=service.pk)
+        .filter(within_divisions_filter([division]))
+        .distinct()
+        .count()
+    )
+
+
+def count_service_node_units(service_node, division):
+    return (
+        Unit.objects.filter(
+            public=True,
+            is_active=True,
+            service_nodes__tree_id=service_node.tree_id,
+            service_nodes__lft__gte=service_node.lft,
+            service_nodes__rght__lte=service_node.rght,
+        )
+        .filter(within_divisions_filter([division]))
+        .distinct()
+        .count()
+    )
+
+
+def get_unit_count_per_division(obj, count_divisions, count_units):
+    """
+    Return the unit counts of the service or service node in the divisions
+    returned by resolve_count_divisions, read from the prefetched
+    `division_unit_counts` or counted live with `count_units`.
+    """
+    div_list, uncounted_ids = count_divisions
+    counts = dict((x.division_id, x.count) for x in obj.division_unit_counts.all())
+    ret = {}
+    for div in div_list:
+        if div.id in uncounted_ids:
+            ret[div.name] = count_units(obj, div)
+        else:
+            ret[div.name] = counts.get(div.id, 0)
+    return ret
+
+
+class DivisionUnitCountMixin:
+    """
+    Viewset mixin for `include=unit_count_per_division`, counting the units
+    in the divisions of the `division` parameter.
+    """
+
+    division_count_model = None
+
+    def get_count_divisions(self):
+        if not hasattr(self, "_count_divisions"):
+            divisions = get_division_params(self.request)
+            if "unit_count_per_division" in self.include_fields and divisions:
+                self._count_divisions = resolve_count_divisions(
+                    divisions, self.division_count_model
+                )
+            else:
+                self._count_divisions = None
+        return self._count_divisions
+
+    def get_serializer_context(self):
+        ret = super(DivisionUnitCountMixin, self).get_serializer_context()
+        ret["count_divisions"] = self.get_count_divisions()
+        return ret
+
+    def prefetch_division_unit_counts(self, queryset):
+        count_divisions = self.get_count_divisions()
+        if not count_divisions:
+            return queryset
+        div_ids = [div.id for div in count_divisions[0]]
+        return queryset.prefetch_related(
+            Prefetch(
+                "division_unit_counts",
+                queryset=self.division_count_model.objects.filter(
+                    division_id__in=div_ids
+                ),
+            )
+        )
+
+
 class JSONAPISerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
         super(JSONAPISerializer, self).__init__(*args, **kwargs)
@@ -309,6 +432,12 @@ class ServiceNodeSerializer(
         for _, part in ret["unit_count"]["municipality"].items():
             total += part
         ret["unit_count"]["total"] = total
+
+        count_divisions = self.context.get("count_divisions")
+        if count_divisions:
+            ret["unit_count_per_division"] = get_unit_count_per_division(
+                obj, count_divisions, count_service_node_units
+            )
         return ret
 
     def root_service_nodes(self, obj):
@@ -338,15 +467,11 @@ class ServiceSerializer(TranslatedModelSerializer, JSONAPISerializer):
             ret["unit_count"]["municipality"][div_name] = unit_count.count
         ret["unit_count"]["total"] = total
 
-        divisions = self.context.get("divisions", [])
-        include_fields = self.context.get("include", [])
-        if "unit_count_per_division" in include_fields and divisions:
-            ret["unit_count_per_division"] = {}
-            div_list = resolve_divisions(divisions)
-            for div in div_list:
-                ret["unit_count_per_division"][div.name] = Unit.objects.filter(
-                    services=obj.pk, location__within=div.geometry.boundary
-                ).count()
+        count_divisions = self.context.get("count_divisions")
+        if count_divisions:
+            ret["unit_count_per_division"] = get_unit_count_per_division(
+                obj, count_divisions, count_service_units
+            )
         return ret
 
     class Meta:
@@ -444,7 +569,8 @@ class DepartmentViewSet(JSONAPIViewSet):
             raise Http404
 
         dept = get_object_or_404(Department, uuid=pk)
-        serializer = self.serializer_class(dept, context=self.get_serializer_context())
+        context = self.get_serializer_context()
+        serializer = self.serializer_class(dept, context=context)
 
         include_hierarchy = request.query_params.get("include_hierarchy")
         data = serializer.data
@@ -453,10 +579,16 @@ class DepartmentViewSet(JSONAPIViewSet):
             "false",
             "0",
         ]:
-            hierarchy = drilldown_tree_for_node(dept)
-            data["hierarchy"] = self.serializer_class(
-                hierarchy, many=True, context=self.get_serializer_context()
-            ).data
+            if DEPARTMENTS.get(dept.id) is not None:
+                data["hierarchy"] = [
+                    cached.serialize(self.serializer_class, context)
+                    for cached in DEPARTMENTS.get_hierarchy(dept.id)
+                ]
+            else:
+                hierarchy = drilldown_tree_for_node(dept)
+                data["hierarchy"] = self.serializer_class(
+                    hierarchy, many=True, context=context
+                ).data
 
         return Response(data)
 
@@ -531,9 +663,12 @@ class UnitIdentifierSerializer(serializers.ModelSerializer):
         exclude = ["unit", "id"]
 
 
-class ServiceNodeViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
+class ServiceNodeViewSet(
+    DivisionUnitCountMixin, JSONAPIViewSet, viewsets.ReadOnlyModelViewSet
+):
     queryset = ServiceNode.objects.all()
     serializer_class = ServiceNodeSerializer
+    division_count_model = ServiceNodeDivisionUnitCount
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ["level", "parent"]
 
@@ -552,22 +687,31 @@ class ServiceNodeViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
         if "ancestor" in args:
             val = args["ancestor"]
             queryset = queryset.by_ancestor(val)
-        return queryset
+        return self.prefetch_division_unit_counts(queryset)
+
+    @action(detail=False, methods=["get"])
+    def tree(self, request):
+        """
+        The whole service node tree as nested nodes with their children.
+        """
+        content, etag = SERVICE_NODE_TREE.get()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(content, content_type="application/json")
+            record_request(TREE_DOMAIN, request)
+        response["ETag"] = etag
+        return response
 
 
 register_view(ServiceNodeViewSet, "service_node")
 
 
-class ServiceViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
+class ServiceViewSet(
+    DivisionUnitCountMixin, JSONAPIViewSet, viewsets.ReadOnlyModelViewSet
+):
     queryset = Service.objects.all()
     serializer_class = ServiceSerializer
-
-    def get_serializer_context(self):
-        ret = super(ServiceViewSet, self).get_serializer_context()
-        query_params = self.request.query_params
-        division = query_params.get("division", "")
-        ret["divisions"] = [x.strip() for x in division.split(",") if x]
-        return ret
+    division_count_model = ServiceDivisionUnitCount
 
     def get_queryset(self):
         queryset = (
@@ -579,7 +723,7 @@ class ServiceViewSet(JSONAPIViewSet, viewsets.ReadOnlyModelViewSet):
         if "id" in args:
             id_list = args["id"].split(",")
             queryset = queryset.filter(id__in=id_list)
-        return queryset
+        return self.prefetch_division_unit_counts(queryset)
 
 
 register_view(ServiceViewSet, "service")
@@ -633,6 +777,9 @@ class UnitSerializer(
         return result
 
     def _department_uuid(self, obj, field):
+        cached = DEPARTMENTS.get(getattr(obj, field + "_id"))
+        if cached is not None:
+            return cached.uuid
         if getattr(obj, field) is not None:
             return getattr(obj, field).uuid
         return None
@@ -675,9 +822,13 @@ class UnitSerializer(
         include_fields = self.context.get("include", [])
         for field in ["department", "root_department"]:
             if field in include_fields:
-                dep_json = DepartmentSerializer(
-                    getattr(obj, field), context=self.context
-                ).data
+                cached = DEPARTMENTS.get(getattr(obj, field + "_id"))
+                if cached is not None:
+                    dep_json = cached.serialize(DepartmentSerializer, self.context)
+                else:
+                    dep_json = DepartmentSerializer(
+                        getattr(obj, field), context=self.context
+                    ).data
                 ret[field] = dep_json
         # Not using actual serializer instances below is a performance optimization.
         if "service_nodes" in include_fields:
@@ -758,6 +909,7 @@ class UnitSerializer(
             "service_details_hash",
             "accessibility_property_hash",
             "identifier_hash",
+            "source_hash",
             "public",
             "syllables_fi",
             "search_column_fi",
@@ -810,8 +962,27 @@ class KmlRenderer(renderers.BaseRenderer):
         return render_to_string("kml.xml", resp)
 
 
+class UnitChangeSerializer(serializers.ModelSerializer):
+    unit = serializers.IntegerField(source="unit_id")
+    change_type = serializers.SerializerMethodField()
+
+    def get_change_type(self, obj):
+        # Units hidden after the change, e.g. by a bulk update, are reported
+        # as deleted so that their changes are not shown.
+        if getattr(obj, "unit_is_visible", True):
+            return obj.change_type
+        return UnitChange.DELETED
+
+    class Meta:
+        model = UnitChange
+        fields = ["id", "unit", "change_type", "time"]
+
+
 class UnitViewSet(
-    munigeo_api.GeoModelAPIView, JSONAPIViewSet, viewsets.ReadOnlyModelViewSet
+    KeysetPaginationMixin,
+    munigeo_api.GeoModelAPIView,
+    JSONAPIViewSet,
+    viewsets.ReadOnlyModelViewSet,
 ):
     queryset = Unit.objects.filter(public=True, is_active=True)
     serializer_class = UnitSerializer
@@ -848,7 +1019,7 @@ class UnitViewSet(
             val = filters["municipality"].lower().strip()
             if len(val) > 0:
                 municipalities = val.split(",")
-                muni_sq = Q()
+                muni_ids = []
 
                 for municipality_raw in municipalities:
                     municipality = municipality_raw.strip()
@@ -856,13 +1027,12 @@ class UnitViewSet(
                         ocd_id = municipality
                     else:
                         ocd_id = make_muni_ocd_id(municipality)
-                    try:
-                        muni = Municipality.objects.get(division__ocd_id=ocd_id)
-                        muni_sq |= Q(municipality=muni)
-                    except Municipality.DoesNotExist:
+                    muni = MUNICIPALITIES.get_by_ocd_id(ocd_id)
+                    if muni is None:
                         raise ParseError("municipality with ID '%s' not found" % ocd_id)
+                    muni_ids.append(muni.id)
 
-                queryset = queryset.filter(muni_sq)
+                queryset = queryset.filter(municipality_id__in=muni_ids)
 
         if "city_as_department" in filters:
             val = filters["city_as_department"].lower().strip()
@@ -870,21 +1040,23 @@ class UnitViewSet(
             if len(val) > 0:
                 deps_uuids = val.split(",")
 
+                deps = []
                 for deps_uuid in deps_uuids:
                     try:
-                        uuid.UUID(deps_uuid)
+                        dep = DEPARTMENTS.get_by_uuid(uuid.UUID(deps_uuid))
                     except ValueError:
                         raise serializers.ValidationError(
                             "'city_as_department' value must be a valid UUID"
                         )
+                    if dep is not None:
+                        deps.append(dep)
 
-                deps = Department.objects.filter(uuid__in=deps_uuids).select_related(
-                    "municipality"
-                )
-                munis = [d.municipality for d in deps]
-
-                queryset = queryset.filter(root_department__in=deps) | queryset.filter(
-                    municipality__in=munis
+                queryset = queryset.filter(
+                    root_department_id__in=[d.id for d in deps]
+                ) | queryset.filter(
+                    municipality_id__in=[
+                        d.municipality_id for d in deps if d.municipality_id
+                    ]
                 )
 
         if "provider_type" in filters:
@@ -957,12 +1129,7 @@ class UnitViewSet(
             # division=helsinki/kaupunginosa:kallio,vantaa/äänestysalue:5
             d_list = filters["division"].lower().split(",")
             div_list = resolve_divisions(d_list)
-            if div_list:
-                mp = div_list.pop(0).geometry.boundary
-                for div in div_list:
-                    mp += div.geometry.boundary
-
-            queryset = queryset.filter(location__within=mp)
+            queryset = queryset.filter(within_divisions_filter(div_list))
 
         if "lat" in filters and "lon" in filters:
             try:
@@ -982,9 +1149,7 @@ class UnitViewSet(
                 queryset = queryset.filter(
                     location__distance_lte=(point, D(m=distance))
                 )
-            queryset = queryset.annotate(distance=Distance("location", point)).order_by(
-                "distance"
-            )
+            queryset = order_by_nearest(queryset, "location", point)
 
         if "bbox" in filters:
             val = self.request.query_params.get("bbox", None)
@@ -1017,16 +1182,9 @@ class UnitViewSet(
 
         if "address" in filters:
             language = filters["language"] if "language" in filters else "fi"
-            address_splitted = filters["address"].split(" ")
-            key = f"street_address_{language}"
-            if len(address_splitted) == 1:
-                key += "__startswith"
-                arg = address_splitted[0]
-
-            else:
-                key += "__iregex"
-                arg = filters["address"] + r"($|\s|,|[a-zA-Z]).*"
-            queryset = queryset.filter(**{key: arg})
+            queryset = filter_by_address(
+                queryset, f"street_address_{language}", filters["address"]
+            )
 
         maintenance_organization = self.request.query_params.get(
             "maintenance_organization"
@@ -1040,19 +1198,7 @@ class UnitViewSet(
             )
 
         if "observations" in self.include_fields:
-            queryset = (
-                queryset.prefetch_related(
-                    Prefetch(
-                        "observation_set",
-                        queryset=Observation.objects.filter(
-                            Q(property__expiration=None)
-                            | Q(time__gt=timezone.now() - F("property__expiration"))
-                        ),
-                    )
-                )
-                .prefetch_related("observation_set__property__allowed_values")
-                .prefetch_related("observation_set__value")
-            )
+            queryset = queryset.prefetch_related("observation_snapshot")
 
         if "service_nodes" in self.include_fields:
             queryset = queryset.prefetch_related("service_nodes")
@@ -1073,6 +1219,41 @@ class UnitViewSet(
             or field_name in self.include_fields
         )
 
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        """
+        Created, updated and deleted units in the order of the changes. Use
+        `since` to get the changes made since the given time and follow the
+        `next` links to get the rest. Units which are not public or active
+        are reported as deleted.
+        """
+        queryset = UnitChange.objects.annotate(
+            unit_is_visible=Exists(
+                Unit.objects.filter(id=OuterRef("unit_id"), public=True, is_active=True)
+            )
+        )
+        since = request.query_params.get("since")
+        if since:
+            try:
+                since_time = parse_datetime(since)
+            except ValueError:
+                since_time = None
+            if since_time is None:
+                raise ParseError("'since' must be an ISO 8601 timestamp")
+            if timezone.is_naive(since_time):
+                since_time = timezone.make_aware(since_time)
+            if since_time < UnitChange.get_retention_start():
+                raise ParseError(
+                    "'since' is older than the kept unit changes, "
+                    "fetch all the units instead"
+                )
+            queryset = queryset.filter(time__gte=since_time)
+        paginator = KeysetPagination()
+        paginator.ordering = "id"
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = UnitChangeSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def _add_content_disposition_header(self, response):
         if isinstance(response.accepted_renderer, KmlRenderer):
             header = "attachment; filename={}".format("palvelukartta.kml")
@@ -1106,8 +1287,13 @@ class AccessibilityRuleView(viewsets.ViewSetMixin, generics.ListAPIView):
     serializer_class = None
 
     def list(self, request, *args, **kwargs):
-        rules, messages = RULES.get_data()
-        return Response({"rules": rules, "messages": messages})
+        compiled = RULES.get_compiled()
+        etag = '"%s"' % compiled.hash
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(compiled.json, content_type="application/json")
+        response["ETag"] = etag
+        return response
 
 
 register_view(
@@ -1115,6 +1301,69 @@ register_view(
 )
 
 
+def parse_unit_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def serialize_division_units(divisions, unit_include):
+    """
+    Serialize the units referenced by the given divisions with a single
+    UnitSerializer instance. Returns a tuple of dicts (service point id ->
+    unit data, unit id -> unit data). Service point ids are resolved
+    through unit aliases too.
+    """
+    service_point_ids = set()
+    unit_ids = set()
+    for division in divisions:
+        service_point_id = parse_unit_id(division.service_point_id)
+        if service_point_id is not None:
+            service_point_ids.add(service_point_id)
+        unit_ids.update(division.units or [])
+
+    only = unit_include.split(",")
+    queryset = Unit.objects.prefetch_related("accessibility_shortcomings")
+    for field in ["connections", "entrances", "accessibility_properties"]:
+        if field in only:
+            queryset = queryset.prefetch_related(field)
+    units_by_id = dict(
+        (unit.id, unit) for unit in queryset.filter(id__in=service_point_ids | unit_ids)
+    )
+    missing_ids = service_point_ids - set(units_by_id.keys())
+    aliases = dict(
+        UnitAlias.objects.filter(second__in=missing_ids).values_list("second", "first")
+    )
+    missing_alias_units = set(aliases.values()) - set(units_by_id.keys())
+    if missing_alias_units:
+        units_by_id.update(
+            (unit.id, unit) for unit in queryset.filter(id__in=missing_alias_units)
+        )
+
+    serializer = UnitSerializer(context={"only": only})
+    unit_data = {}
+
+    def get_unit_data(unit_id):
+        if unit_id not in units_by_id:
+            return None
+        if unit_id not in unit_data:
+            unit_data[unit_id] = serializer.to_representation(units_by_id[unit_id])
+        return unit_data[unit_id]
+
+    service_points = {}
+    for service_point_id in service_point_ids:
+        data = get_unit_data(aliases.get(service_point_id, service_point_id))
+        if data is not None:
+            service_points[service_point_id] = data
+    units = dict(
+        (unit_id, get_unit_data(unit_id))
+        for unit_id in unit_ids
+        if unit_id in units_by_id
+    )
+    return service_points, units
+
+
 class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSerializer):
     def to_representation(self, obj):
         ret = super(AdministrativeDivisionSerializer, self).to_representation(obj)
@@ -1123,33 +1372,27 @@ class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSeriali
 
         query_params = self.context["request"].query_params
         unit_include = query_params.get("unit_include", None)
-        service_point_id = ret["service_point_id"]
 
-        if service_point_id and unit_include:
-            try:
-                unit = Unit.objects.get(id=service_point_id)
-            except Unit.DoesNotExist:
-                try:
-                    unit_alias = UnitAlias.objects.get(second=service_point_id)
-                    unit = unit_alias.first
-                except UnitAlias.DoesNotExist:
-                    unit = None
-            if unit:
-                ser = UnitSerializer(unit, context={"only": unit_include.split(",")})
-                ret["unit"] = ser.data
-
-        unit_ids = ret["units"]
-        if unit_ids and unit_include:
-            units = Unit.objects.filter(id__in=unit_ids)
-            if units:
-                units_data = []
-                for unit in units:
-                    units_data.append(
-                        UnitSerializer(
-                            unit, context={"only": unit_include.split(",")}
-                        ).data
-                    )
-                ret["units"] = units_data
+        if unit_include:
+            if "division_units" in self.context:
+                service_points, units = self.context["division_units"]
+            else:
+                service_points, units = serialize_division_units([obj], unit_include)
+
+            service_point_id = parse_unit_id(ret["service_point_id"])
+            if service_point_id in service_points:
+                ret["unit"] = service_points[service_point_id]
+
+            unit_ids = ret["units"]
+            if unit_ids:
+                # Same ordering as the default ordering of units.
+                units_data = [
+                    units[unit_id]
+                    for unit_id in sorted(set(unit_ids), reverse=True)
+                    if unit_id in units
+                ]
+                if units_data:
+                    ret["units"] = units_data
 
         include_fields = query_params.get("include", [])
         if "centroid" in include_fields and obj.geometry:
@@ -1162,6 +1405,21 @@ class AdministrativeDivisionSerializer(munigeo_api.AdministrativeDivisionSeriali
 class AdministrativeDivisionViewSet(munigeo_api.AdministrativeDivisionViewSet):
     serializer_class = AdministrativeDivisionSerializer
 
+    def get_serializer(self, *args, **kwargs):
+        # Resolve and serialize the units of all the divisions on the page
+        # at once instead of separately for every division.
+        unit_include = self.request.query_params.get("unit_include", None)
+        if args and unit_include:
+            divisions = args[0] if kwargs.get("many", False) else [args[0]]
+            context = self.get_serializer_context()
+            context["division_units"] = serialize_division_units(
+                divisions, unit_include
+            )
+            kwargs["context"] = context
+        return super(AdministrativeDivisionViewSet, self).get_serializer(
+            *args, **kwargs
+        )
+
 
 register_view(AdministrativeDivisionViewSet, "administrative_division")
 
@@ -1,7 +1,9 @@
+import json
 import re
 
 from django.conf import settings
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 KML_REGEXP = re.compile(settings.KML_REGEXP)
 
@@ -16,3 +18,81 @@ class Pagination(PageNumberPagination):
         ):
             return 30000
         return super(Pagination, self).get_page_size(request)
+
+
+def estimate_count(queryset):
+    """
+    Return the row count of the queryset estimated by the query planner.
+    Unlike count() this does not scan the matching rows.
+    """
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination on a stable ordering of the view. Pages are fetched
+    with a WHERE condition on the ordering field instead of an OFFSET and
+    no COUNT query is made. An estimated count is included when requested
+    with `count=estimate`.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    ordering = "-id"
+    estimated_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.estimated_count = None
+        if request.query_params.get("count", None) == "estimate":
+            self.estimated_count = estimate_count(queryset)
+        return super(KeysetPagination, self).paginate_queryset(
+            queryset, request, view=view
+        )
+
+    def get_paginated_response(self, data):
+        response = super(KeysetPagination, self).get_paginated_response(data)
+        if self.estimated_count is not None:
+            response.data["estimated_count"] = self.estimated_count
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        ret = super(KeysetPagination, self).get_paginated_response_schema(schema)
+        ret["properties"]["estimated_count"] = {"type": "integer", "example": 123}
+        return ret
+
+
+class KeysetPaginationMixin:
+    """
+    View mixin enabling the opt-in keyset pagination mode with the `cursor`
+    query parameter, e.g. `?cursor=` for the first page. The other pages
+    are fetched by following the `next` and `previous` links.
+
+    The ordering used in the keyset mode is given by `keyset_ordering`. It
+    must be a stable ordering, e.g. by id or timestamp. Querysets ordered
+    otherwise by the view, e.g. by distance, can not be paged by a cursor
+    and the keyset mode is rejected for them.
+    """
+
+    keyset_ordering = "-id"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and (
+            KeysetPagination.cursor_query_param in self.request.query_params
+        ):
+            paginator = KeysetPagination()
+            paginator.ordering = self.keyset_ordering
+            paginator.max_page_size = getattr(
+                self.pagination_class, "max_page_size", paginator.max_page_size
+            )
+            self._paginator = paginator
+        return super(KeysetPaginationMixin, self).paginator
+
+    def paginate_queryset(self, queryset):
+        if isinstance(self.paginator, KeysetPagination) and queryset.query.order_by:
+            raise ParseError(
+                "'%s' can not be used with an ordering of the results, e.g. by "
+                "distance" % KeysetPagination.cursor_query_param
+            )
+        return super(KeysetPaginationMixin, self).paginate_queryset(queryset)
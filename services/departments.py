@@ -0,0 +1,152 @@
+import copy
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+
+from services.models import Department
+from services.response_cache import get_cache_generation
+
+# Cache domain whose generation is bumped by the department importers.
+DEPARTMENTS_DOMAIN = "departments"
+# Maximum number of memoized serializations per department.
+SERIALIZED_CACHE_SIZE = 16
+
+
+@lru_cache(maxsize=None)
+def get_field_names(serializer_class):
+    return frozenset(serializer_class().fields)
+
+
+class CachedDepartment(object):
+    """
+    Process-local representation of a department. `instance` is the
+    Department with its parent and municipality selected, so it can be
+    serialized without queries.
+    """
+
+    def __init__(self, instance, root_id):
+        self.instance = instance
+        self.id = instance.id
+        self.uuid = instance.uuid
+        self.parent_id = instance.parent_id
+        self.root_id = root_id
+        self.municipality_id = instance.municipality_id
+        self.children = []
+        self._serialized = {}
+
+    def serialize(self, serializer_class, context=None):
+        """
+        Serialize the department with the given serializer. The results are
+        memoized by the parts of the context the department serializers
+        depend on. Only the field names of the serializer are part of the
+        key, as `only` comes from the request.
+        """
+        context = context or {}
+        only = context.get("only")
+        key = (
+            serializer_class,
+            (
+                frozenset(only) & get_field_names(serializer_class)
+                if only is not None
+                else None
+            ),
+            "municipality" in context.get("include", []),
+        )
+        data = self._serialized.get(key)
+        if data is None:
+            data = dict(serializer_class(self.instance, context=context).data)
+            if len(self._serialized) >= SERIALIZED_CACHE_SIZE:
+                self._serialized.clear()
+            self._serialized[key] = data
+        return copy.deepcopy(data)
+
+
+class DepartmentCache(object):
+    """
+    Caches the whole department tree. The tree is small and it only changes
+    on import, so it is loaded with a single query and reloaded when the
+    import generation of the departments changes. The generation is checked
+    at most once per `settings.DEPARTMENT_CACHE_CHECK_INTERVAL` seconds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_id = None
+        self.by_uuid = None
+        self.generation = None
+        self.checked_at = None
+
+    def clear(self):
+        with self.lock:
+            self.by_id = None
+            self.by_uuid = None
+            self.generation = None
+            self.checked_at = None
+
+    def _is_stale(self):
+        if self.by_id is None:
+            return True
+        now = time.monotonic()
+        if now - self.checked_at < settings.DEPARTMENT_CACHE_CHECK_INTERVAL:
+            return False
+        self.checked_at = now
+        return get_cache_generation(DEPARTMENTS_DOMAIN) != self.generation
+
+    def _load(self):
+        self.generation = get_cache_generation(DEPARTMENTS_DOMAIN)
+        self.checked_at = time.monotonic()
+        qs = Department.objects.select_related("parent", "municipality").order_by(
+            "tree_id", "lft"
+        )
+        by_id = {}
+        roots = {}
+        # Ordered by the tree, so the root and the parent come before the node.
+        for dept in qs:
+            if dept.parent_id is None:
+                roots[dept.tree_id] = dept.id
+            by_id[dept.id] = CachedDepartment(dept, roots.get(dept.tree_id))
+        for cached in by_id.values():
+            parent = by_id.get(cached.parent_id)
+            if parent is not None:
+                parent.children.append(cached)
+        self.by_id = by_id
+        self.by_uuid = {cached.uuid: cached for cached in by_id.values()}
+
+    def _get_maps(self):
+        with self.lock:
+            if self._is_stale():
+                self._load()
+            return self.by_id, self.by_uuid
+
+    def get(self, id):
+        """
+        Return the CachedDepartment with the given id or None if the
+        department is not in the cache.
+        """
+        if id is None:
+            return None
+        by_id, _ = self._get_maps()
+        return by_id.get(id)
+
+    def get_by_uuid(self, uuid):
+        _, by_uuid = self._get_maps()
+        return by_uuid.get(uuid)
+
+    def get_hierarchy(self, id):
+        """
+        Return the ancestors of the department, the department itself and
+        its children, i.e. the same nodes as mptt's drilldown_tree_for_node.
+        """
+        by_id, _ = self._get_maps()
+        dept = by_id[id]
+        ancestors = []
+        node = dept
+        while node is not None:
+            ancestors.append(node)
+            node = by_id.get(node.parent_id)
+        return list(reversed(ancestors)) + dept.children
+
+
+DEPARTMENTS = DepartmentCache()
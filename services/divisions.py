@@ -0,0 +1,108 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+from munigeo.models import AdministrativeDivision, AdministrativeDivisionGeometry
+
+
+class CachedDivision(object):
+    """
+    Lightweight, process-local representation of an administrative division.
+    The boundaries are loaded lazily as they can be large.
+    """
+
+    def __init__(self, id, ocd_id, name, type=None):
+        self.id = id
+        self.ocd_id = ocd_id
+        self.name = name
+        self.type = type
+        self._boundary = None
+        self._extent = None
+        self._boundary_loaded = False
+
+    def _load_boundary(self):
+        if self._boundary_loaded:
+            return
+        geometry = (
+            AdministrativeDivisionGeometry.objects.filter(division_id=self.id)
+            .only("boundary")
+            .first()
+        )
+        if geometry is not None:
+            self._boundary = geometry.boundary
+            self._extent = geometry.boundary.envelope
+        self._boundary_loaded = True
+
+    @property
+    def boundary(self):
+        self._load_boundary()
+        return self._boundary
+
+    @property
+    def extent(self):
+        self._load_boundary()
+        return self._extent
+
+
+class DivisionCache(object):
+    """
+    Caches administrative divisions by their OCD id. Entries expire after
+    `settings.DIVISION_CACHE_TIMEOUT` seconds so that divisions imported
+    by other processes are eventually picked up.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.divisions = {}
+        self.loaded_at = None
+
+    def clear(self):
+        with self.lock:
+            self.divisions = {}
+            self.loaded_at = None
+
+    def is_expired(self):
+        if self.loaded_at is None:
+            return True
+        return time.monotonic() - self.loaded_at > settings.DIVISION_CACHE_TIMEOUT
+
+    def get_many(self, ocd_ids):
+        """
+        Return a dict of OCD id -> CachedDivision for the given OCD ids.
+        Unknown OCD ids are left out of the result. All cache misses are
+        resolved with a single query.
+        """
+        with self.lock:
+            if self.is_expired():
+                self.divisions = {}
+                self.loaded_at = time.monotonic()
+            missing = [x for x in ocd_ids if x not in self.divisions]
+            if missing:
+                qs = AdministrativeDivision.objects.filter(ocd_id__in=missing)
+                for id, ocd_id, name, type in qs.values_list(
+                    "id", "ocd_id", "name", "type__type"
+                ):
+                    self.divisions[ocd_id] = CachedDivision(id, ocd_id, name, type)
+            return {x: self.divisions[x] for x in ocd_ids if x in self.divisions}
+
+
+def within_divisions_filter(divisions, field_name="location"):
+    """
+    Return a Q object matching rows whose `field_name` geometry lies within
+    any of the given divisions. The boundaries are joined in the database
+    instead of being sent as a geometry literal, so the cost of the query
+    does not depend on the complexity of the boundaries.
+    """
+    q = Q()
+    for div in divisions:
+        if div.extent is not None:
+            q |= Q(**{"%s__bboverlaps" % field_name: div.extent})
+    boundaries = AdministrativeDivisionGeometry.objects.filter(
+        division_id__in=[div.id for div in divisions],
+        boundary__contains=OuterRef(field_name),
+    )
+    return q & Q(Exists(boundaries))
+
+
+DIVISIONS = DivisionCache()
@@ -0,0 +1,155 @@
+"""
+Shared HTTP client for outbound calls to upstream APIs.
+
+A client keeps a pool of keep-alive connections, uses connect and read
+timeouts, retries failed connections with a backoff and fails fast with
+a circuit breaker when the upstream is down. Clients are meant to be
+created once per process and shared between requests.
+"""
+
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Opens after `failure_threshold` consecutive failures. While open, the
+    calls fail fast. After `reset_timeout` seconds one trial call is let
+    through, which closes the breaker if it succeeds and opens it again
+    if it fails.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow_request(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial_in_progress:
+                return False
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.trial_in_progress = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_progress or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Circuit of {self.name} opened")
+                self.opened_at = time.monotonic()
+            self.trial_in_progress = False
+
+    def record_other(self):
+        """
+        Record a call that tells nothing about whether the upstream is up,
+        e.g. an invalid request.
+        """
+        with self.lock:
+            self.trial_in_progress = False
+
+
+class HTTPClient(object):
+    """
+    Pooled HTTP client with timeouts, retries and a circuit breaker.
+
+    Only failed connections and 502/503 responses, which mean that the
+    request has not been processed by the upstream, are retried so that
+    e.g. feedback is not submitted twice.
+
+    Only failed connections, timeouts and 502/503/504 responses count as
+    failures of the circuit breaker. Other errors, e.g. a 500 response to
+    a malformed request, do not mean that the upstream is down.
+    """
+
+    RETRY_STATUSES = (502, 503)
+    FAILURE_STATUSES = (502, 503, 504)
+
+    def __init__(
+        self,
+        name,
+        connect_timeout=3.05,
+        read_timeout=10,
+        retries=2,
+        backoff_factor=0.5,
+        pool_maxsize=10,
+        failure_threshold=5,
+        reset_timeout=30,
+    ):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(
+            name, failure_threshold=failure_threshold, reset_timeout=reset_timeout
+        )
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=None,
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def request(self, method, url, **kwargs):
+        """
+        Make a request and return the response. Raise CircuitOpenError
+        without making the request if the upstream is considered to be
+        down, otherwise the exceptions of requests are raised as is.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit of {self.name} is open")
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.breaker.record_failure()
+            raise
+        except requests.RequestException:
+            self.breaker.record_other()
+            raise
+        if response.status_code in self.FAILURE_STATUSES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
@@ -0,0 +1,199 @@
+"""
+Instrumentation of the import commands.
+
+The handle methods of the import commands are decorated with
+@records_import_run, which stores the wall time, the number of database
+queries and the number of handled rows of each run and its phases, and
+the peak memory of the process at the end of the run, in an ImportRun row. The importers mark their phases with
+import_phase and report their handled rows with add_import_rows, which do
+nothing when no run is recorded, e.g. when the importers are used in the
+tests.
+
+Only the queries of the thread running the command are counted. Phases
+with the same name are summed, and the time of a nested phase is also
+included in the time of the enclosing phase.
+"""
+
+import json
+import logging
+import resource
+import threading
+import time
+import traceback
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+
+from django.db import connection
+from django.utils import timezone
+
+from services.models import ImportRun
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_recorder = None
+
+# Options of all the management commands, which are not stored with the runs.
+COMMON_OPTIONS = (
+    "verbosity",
+    "settings",
+    "pythonpath",
+    "traceback",
+    "no_color",
+    "force_color",
+    "skip_checks",
+)
+
+
+def get_peak_memory():
+    """
+    Return the peak resident memory of the process in kilobytes. The peak
+    covers the whole lifetime of the process, so it is not recorded for the
+    phases, and in a long-lived worker it may come from an earlier task.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ImportRunRecorder(object):
+    def __init__(self, name, arguments=None):
+        self.run = ImportRun(name=name, arguments=arguments or {})
+        self.queries = QueryCounter()
+        self.rows = 0
+        self.phases = {}
+        self.local = threading.local()
+        self.started = None
+
+    def start(self):
+        self.run.save()
+        self.started = time.perf_counter()
+
+    def get_phase_stack(self):
+        if not hasattr(self.local, "phases"):
+            self.local.phases = []
+        return self.local.phases
+
+    @contextmanager
+    def phase(self, name):
+        with _lock:
+            phase = self.phases.setdefault(
+                name,
+                {
+                    "name": name,
+                    "duration": 0,
+                    "query_count": 0,
+                    "row_count": 0,
+                },
+            )
+        stack = self.get_phase_stack()
+        stack.append(phase)
+        started = time.perf_counter()
+        query_count = self.queries.count
+        try:
+            yield
+        finally:
+            stack.pop()
+            with _lock:
+                phase["duration"] += time.perf_counter() - started
+                phase["query_count"] += self.queries.count - query_count
+
+    def add_rows(self, count):
+        with _lock:
+            self.rows += count
+            for phase in self.get_phase_stack():
+                phase["row_count"] += count
+
+    def finish(self, error=None):
+        run = self.run
+        run.finished_at = timezone.now()
+        run.duration = time.perf_counter() - self.started
+        run.status = ImportRun.FAILED if error else ImportRun.SUCCEEDED
+        run.error = error or ""
+        run.query_count = self.queries.count
+        run.row_count = self.rows
+        run.peak_memory = get_peak_memory()
+        run.phases = [
+            dict(phase, duration=round(phase["duration"], 3))
+            for phase in self.phases.values()
+        ]
+        run.save()
+
+
+def get_run_arguments(args, options):
+    arguments = {
+        key: value for key, value in options.items() if key not in COMMON_OPTIONS
+    }
+    if args:
+        arguments["args"] = args
+    # The options may contain values that are not JSON serializable.
+    return json.loads(json.dumps(arguments, default=str))
+
+
+def records_import_run(name=None):
+    """
+    Decorator for the handle method of the import commands. The run is
+    named after the command unless a name is given. If a run is already
+    recorded, e.g. when an import command calls another one, the command is
+    recorded as a phase of the current run.
+    """
+
+    def decorator(handle):
+        @wraps(handle)
+        def wrapper(command, *args, **options):
+            global _recorder
+
+            run_name = name or command.__module__.rsplit(".", 1)[-1]
+            if _recorder is not None:
+                with _recorder.phase(run_name):
+                    return handle(command, *args, **options)
+
+            recorder = ImportRunRecorder(run_name, get_run_arguments(args, options))
+            recorder.start()
+            _recorder = recorder
+            try:
+                with connection.execute_wrapper(recorder.queries):
+                    result = handle(command, *args, **options)
+            except BaseException:
+                _recorder = None
+                recorder.finish(error=traceback.format_exc())
+                raise
+            _recorder = None
+            recorder.finish()
+            logger.info(
+                "Import %s finished in %.1f s with %d queries"
+                % (run_name, recorder.run.duration, recorder.run.query_count)
+            )
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def import_phase(name):
+    """
+    Return a context manager that records the enclosed code as a phase of
+    the current run.
+    """
+    recorder = _recorder
+    if recorder is None:
+        return nullcontext()
+    return recorder.phase(name)
+
+
+def add_import_rows(count):
+    """
+    Add the number of rows handled by the current run and its current
+    phases.
+    """
+    recorder = _recorder
+    if recorder is not None:
+        recorder.add_rows(count)
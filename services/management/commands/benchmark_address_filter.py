@@ -0,0 +1,98 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from services.models import Unit
+from services.utils import filter_by_address
+
+
+def filter_by_address_regex(queryset, field_name, address):
+    # The address filter used before the indexed one.
+    address_splitted = address.split(" ")
+    if len(address_splitted) == 1:
+        return queryset.filter(**{field_name + "__startswith": address_splitted[0]})
+    return queryset.filter(
+        **{field_name + "__iregex": address + r"($|\s|,|[a-zA-Z]).*"}
+    )
+
+
+def measure(filter_func, queries, field_name, page_size):
+    timings = []
+    results = []
+    queryset = Unit.objects.filter(public=True, is_active=True).order_by("id")
+    for address in queries:
+        start = time.perf_counter()
+        ids = list(
+            filter_func(queryset, field_name, address).values_list("id", flat=True)[
+                :page_size
+            ]
+        )
+        timings.append(time.perf_counter() - start)
+        results.append(ids)
+    return statistics.median(timings) * 1000, max(timings) * 1000, results
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency and the results of the regular expression and "
+        "the indexed address filters of the units with the street addresses "
+        "of random units."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=100,
+            help="Number of addresses to query with each filter.",
+        )
+        parser.add_argument(
+            "--language",
+            default="fi",
+            help="Language of the street addresses.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=20,
+            help="Number of units fetched by each query.",
+        )
+
+    def handle(self, **options):
+        field_name = "street_address_%s" % options["language"]
+        addresses = list(
+            Unit.objects.filter(**{field_name + "__contains": " "})
+            .order_by("?")
+            .values_list(field_name, flat=True)[: options["queries"]]
+        )
+        # Query with the whole addresses and with the street names only.
+        query_sets = [
+            ("address", addresses),
+            ("street", [address.split(" ")[0] for address in addresses]),
+        ]
+        for query_name, queries in query_sets:
+            timings = {}
+            for name, filter_func in [
+                ("regex", filter_by_address_regex),
+                ("indexed", filter_by_address),
+            ]:
+                timings[name] = measure(
+                    filter_func, queries, field_name, options["page_size"]
+                )
+                median, slowest, _ = timings[name]
+                self.stdout.write(
+                    "{:>7} {:>7}: median {:8.2f} ms, max {:8.2f} ms".format(
+                        query_name, name, median, slowest
+                    )
+                )
+            differing = sum(
+                1
+                for regex_ids, ids in zip(timings["regex"][2], timings["indexed"][2])
+                if regex_ids != ids
+            )
+            self.stdout.write(
+                "{:>7}: {} of {} queries with different results".format(
+                    query_name, differing, len(queries)
+                )
+            )
@@ -0,0 +1,130 @@
+import random
+import statistics
+import time
+
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from services.models import Unit
+from services.utils import order_by_nearest
+
+# Synthetic units are placed in the Turku region.
+MIN_LON, MAX_LON = 21.9, 22.6
+MIN_LAT, MAX_LAT = 60.35, 60.55
+# Offset of the synthetic unit ids, so they do not collide with real units.
+ID_OFFSET = 1_000_000_000
+BATCH_SIZE = 10_000
+
+
+def random_point():
+    return Point(
+        random.uniform(MIN_LON, MAX_LON), random.uniform(MIN_LAT, MAX_LAT), srid=4326
+    )
+
+
+def create_units(start, stop):
+    now = timezone.now()
+    for batch_start in range(start, stop, BATCH_SIZE):
+        Unit.objects.bulk_create(
+            [
+                Unit(
+                    id=ID_OFFSET + i,
+                    name="Benchmark unit %s" % i,
+                    location=random_point(),
+                    last_modified_time=now,
+                )
+                for i in range(batch_start, min(batch_start + BATCH_SIZE, stop))
+            ]
+        )
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE %s" % Unit._meta.db_table)
+
+
+def get_sorted_queryset(point, distance):
+    # The ordering used before the KNN ordering.
+    queryset = Unit.objects.filter(public=True, is_active=True)
+    if distance:
+        queryset = queryset.filter(location__distance_lte=(point, D(m=distance)))
+    return queryset.annotate(distance=Distance("location", point)).order_by("distance")
+
+
+def get_knn_queryset(point, distance):
+    queryset = Unit.objects.filter(public=True, is_active=True)
+    if distance:
+        queryset = queryset.filter(location__distance_lte=(point, D(m=distance)))
+    return order_by_nearest(queryset, "location", point)
+
+
+def measure(get_queryset, points, distance, page_size):
+    timings = []
+    for point in points:
+        start = time.perf_counter()
+        list(get_queryset(point, distance)[:page_size])
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, max(timings) * 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the latency of the nearest first unit queries ordered by the "
+        "computed distance and by the KNN operator. Synthetic units are "
+        "created in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[10_000, 100_000, 1_000_000],
+            help="Numbers of synthetic units to measure with.",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=50,
+            help="Number of queries from random points per measurement.",
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=20,
+            help="Number of units fetched by each query.",
+        )
+        parser.add_argument(
+            "--distance",
+            type=float,
+            default=None,
+            help="Also filter the units within the distance in meters.",
+        )
+
+    def handle(self, **options):
+        random.seed(0)
+        created = 0
+        with transaction.atomic():
+            for size in sorted(options["sizes"]):
+                # The units of the smaller sizes are kept and extended.
+                self.stdout.write("Creating {} synthetic units...".format(size))
+                create_units(created, size)
+                created = max(created, size)
+                points = [random_point() for _ in range(options["queries"])]
+                for name, get_queryset in [
+                    ("sorted", get_sorted_queryset),
+                    ("knn", get_knn_queryset),
+                ]:
+                    median, slowest = measure(
+                        get_queryset,
+                        points,
+                        options["distance"],
+                        options["page_size"],
+                    )
+                    self.stdout.write(
+                        "{:>9} units, {:>6}: median {:8.2f} ms, max {:8.2f} ms".format(
+                            size, name, median, slowest
+                        )
+                    )
+            transaction.set_rollback(True)
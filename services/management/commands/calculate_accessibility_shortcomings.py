@@ -1,8 +1,39 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 from django.core.management.base import BaseCommand
+from django.db import connections
 from tqdm import tqdm
 
-from services.models import AccessibilityVariable, Unit, UnitAccessibilityShortcomings
+from services.models import (
+    AccessibilityVariable,
+    Unit,
+    UnitAccessibilityProperty,
+    UnitAccessibilityShortcomings,
+)
 from services.utils import AccessibilityShortcomingCalculator as Calculator
+from services.utils.accessibility_shortcoming_calculator import get_properties_hash
+
+BATCH_SIZE = 1000
+
+
+def init_worker(rules, messages):
+    # Use the rules of the parent process, they may differ from the rules file.
+    Calculator().rules = rules
+    Calculator().messages = messages
+
+
+def calculate_chunk(chunk):
+    """
+    Calculate the shortcomings for a list of (unit id, properties by
+    variable id) tuples.
+    """
+    calculator = Calculator()
+    return [
+        (unit_id, calculator.get_shortcomings_fields(properties))
+        for unit_id, properties in chunk
+    ]
 
 
 class Command(BaseCommand):
@@ -18,30 +49,128 @@ class Command(BaseCommand):
             dest="progress_bar",
             help="Disable progress bar",
         )
+        parser.add_argument(
+            "--units",
+            type=int,
+            nargs="+",
+            help="Calculate the shortcomings only for the units with the given ids",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of worker processes, 1 calculates in the current process",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of units given to a worker process at a time",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Calculate the shortcomings only for the units whose accessibility "
+            "properties or the rules have changed since the last calculation",
+        )
 
     def handle(self, **options):
         if options["print_rules"]:
             self.print_rules()
             return
 
+        start_time = time.monotonic()
+        units = Unit.objects.all()
+        properties = UnitAccessibilityProperty.objects.all()
+        if options["units"]:
+            units = units.filter(id__in=options["units"])
+            properties = properties.filter(unit_id__in=options["units"])
+        properties_by_unit = {
+            unit_id: {} for unit_id in units.values_list("id", flat=True)
+        }
+        for unit_id, variable_id, value in properties.values_list(
+            "unit_id", "variable_id", "value"
+        ).iterator():
+            if unit_id in properties_by_unit:
+                properties_by_unit[unit_id][variable_id] = value
+
+        items = list(properties_by_unit.items())
+        num_skipped = 0
+        if options["incremental"]:
+            items, num_skipped = self.get_changed(items)
+        chunk_size = max(options["chunk_size"], 1)
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
         progress_bar = (
-            tqdm(desc="Calculating shortcomings", total=Unit.objects.count())
+            tqdm(desc="Calculating shortcomings", total=len(items))
             if options["progress_bar"]
             else None
         )
-        for unit in Unit.objects.all():
-            description, shortcoming_count = Calculator().calculate(unit)
-            UnitAccessibilityShortcomings.objects.update_or_create(
-                unit=unit,
-                defaults={
-                    "accessibility_shortcoming_count": shortcoming_count,
-                    "accessibility_description": description,
-                },
+        if options["workers"] > 1 and len(chunks) > 1:
+            calculator = Calculator()
+            # The forked workers must not share the database connection of
+            # the parent, which reconnects when it writes the results.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                max_workers=options["workers"],
+                initializer=init_worker,
+                initargs=(calculator.rules, calculator.messages),
             )
+            results = executor.map(calculate_chunk, chunks)
+        else:
+            executor = None
+            results = map(calculate_chunk, chunks)
+
+        try:
+            for chunk_results in results:
+                UnitAccessibilityShortcomings.objects.bulk_create(
+                    [
+                        UnitAccessibilityShortcomings(unit_id=unit_id, **fields)
+                        for unit_id, fields in chunk_results
+                    ],
+                    batch_size=BATCH_SIZE,
+                    update_conflicts=True,
+                    unique_fields=["unit"],
+                    update_fields=[
+                        "accessibility_shortcoming_count",
+                        "accessibility_description",
+                        "accessibility_property_hash",
+                        "rules_hash",
+                    ],
+                )
+                if progress_bar:
+                    progress_bar.update(len(chunk_results))
+        finally:
+            if executor:
+                executor.shutdown()
             if progress_bar:
-                progress_bar.update(1)
-        if progress_bar:
-            progress_bar.close()
+                progress_bar.close()
+
+        elapsed = time.monotonic() - start_time
+        self.stdout.write(
+            "Calculated shortcomings for {} units in {:.1f}s ({:.0f} units/s), "
+            "{} unchanged units skipped.".format(
+                len(items), elapsed, len(items) / elapsed if elapsed else 0, num_skipped
+            )
+        )
+
+    def get_changed(self, items):
+        """
+        Return the items of the units whose stored input hashes differ from
+        the current ones and the number of the unchanged units.
+        """
+        rules_hash = Calculator().rules_hash
+        # The stored property hashes of the units calculated with the current rules.
+        stored = dict(
+            UnitAccessibilityShortcomings.objects.filter(
+                rules_hash=rules_hash
+            ).values_list("unit_id", "accessibility_property_hash")
+        )
+        changed = [
+            (unit_id, properties)
+            for unit_id, properties in items
+            if stored.get(unit_id) != get_properties_hash(properties)
+        ]
+        return changed, len(items) - len(changed)
 
     def print_rules(self):
         def print_rule(rule, indent=""):
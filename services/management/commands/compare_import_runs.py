@@ -0,0 +1,154 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.models import ImportRun
+
+
+def format_arguments(arguments):
+    return json.dumps(arguments, sort_keys=True)
+
+
+def format_change(value, baseline):
+    if value is None or not baseline:
+        return "-"
+    return "{:+.0f} %".format((value - baseline) / baseline * 100)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the recorded runs of an import with the same arguments. The "
+        "latest run is compared to the median of the previous successful "
+        "runs, and the phases that slowed down by more than the threshold "
+        "are reported as regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "name",
+            nargs="?",
+            help="Name of the import. Without it, the latest run of each "
+            "import and its arguments is listed.",
+        )
+        parser.add_argument(
+            "--arguments",
+            type=json.loads,
+            help="Arguments of the compared runs as a JSON object, as listed "
+            "without the name. Defaults to the arguments of the latest run.",
+        )
+        parser.add_argument(
+            "--runs",
+            type=int,
+            default=10,
+            help="Number of the latest runs to compare.",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=20,
+            help="Slowdown in percents reported as a regression.",
+        )
+
+    def list_imports(self):
+        imports = (
+            ImportRun.objects.order_by("name")
+            .values_list("name", "arguments")
+            .distinct()
+        )
+        for name, arguments in imports:
+            run = ImportRun.objects.filter(name=name, arguments=arguments).first()
+            self.stdout.write(
+                "{:<40} {:%Y-%m-%d %H:%M} {:<10} {:>10} {}".format(
+                    name,
+                    run.started_at,
+                    run.status,
+                    "-" if run.duration is None else "%.1f s" % run.duration,
+                    format_arguments(arguments),
+                )
+            )
+
+    def handle(self, **options):
+        name = options["name"]
+        if not name:
+            self.list_imports()
+            return
+        arguments = options["arguments"]
+        if arguments is None:
+            latest = ImportRun.objects.filter(name=name).first()
+            if latest is None:
+                raise CommandError("No runs of import %s" % name)
+            arguments = latest.arguments
+        # The runs with other arguments, e.g. importing other data, are not
+        # comparable. The arguments are compared as JSON, so the order of
+        # the options does not matter.
+        runs = list(
+            ImportRun.objects.filter(name=name, arguments=arguments)[: options["runs"]]
+        )
+        if not runs:
+            raise CommandError(
+                "No runs of import %s with arguments %s"
+                % (name, format_arguments(arguments))
+            )
+        runs.reverse()
+        self.stdout.write("Arguments: %s\n" % format_arguments(arguments))
+
+        phase_names = []
+        for run in runs:
+            for phase in run.phases:
+                if phase["name"] not in phase_names:
+                    phase_names.append(phase["name"])
+
+        columns = ["total", "queries", "rows", "memory MB"] + phase_names
+        self.stdout.write(
+            "{:<17} {:<10} ".format("started", "status")
+            + " ".join("{:>12}".format(column[:12]) for column in columns)
+        )
+        for run in runs:
+            values = [
+                "-" if run.duration is None else "%.1f s" % run.duration,
+                "-" if run.query_count is None else str(run.query_count),
+                "-" if run.row_count is None else str(run.row_count),
+                "-" if run.peak_memory is None else "%.0f" % (run.peak_memory / 1024),
+            ]
+            for phase_name in phase_names:
+                phase = run.get_phase(phase_name)
+                values.append("-" if phase is None else "%.1f s" % phase["duration"])
+            self.stdout.write(
+                "{:%Y-%m-%d %H:%M} {:<10} ".format(run.started_at, run.status)
+                + " ".join("{:>12}".format(value) for value in values)
+            )
+
+        latest = runs[-1]
+        previous = [run for run in runs[:-1] if run.status == ImportRun.SUCCEEDED]
+        if not previous:
+            return
+        self.stdout.write(
+            "\nLatest run compared to the median of %d previous runs:" % len(previous)
+        )
+        comparisons = [("total", latest.duration, [run.duration for run in previous])]
+        for phase_name in phase_names:
+            phase = latest.get_phase(phase_name)
+            durations = [
+                run.get_phase(phase_name)["duration"]
+                for run in previous
+                if run.get_phase(phase_name)
+            ]
+            comparisons.append((phase_name, phase and phase["duration"], durations))
+        for label, duration, durations in comparisons:
+            if duration is None or not durations:
+                continue
+            baseline = statistics.median(durations)
+            regression = (
+                baseline
+                and (duration - baseline) / baseline * 100 > options["threshold"]
+            )
+            self.stdout.write(
+                "{:<30} {:>10.1f} s {:>10.1f} s {:>8} {}".format(
+                    label,
+                    duration,
+                    baseline,
+                    format_change(duration, baseline),
+                    "REGRESSION" if regression else "",
+                )
+            )
@@ -4,6 +4,7 @@ from django.core.management.base import BaseCommand
 from munigeo.models import Address, AdministrativeDivision
 
 from services.models import Service, ServiceNode, Unit
+from services.response_cache import invalidates_cache
 
 logger = logging.getLogger("search")
 
@@ -11,6 +12,7 @@ MODELS = [Address, AdministrativeDivision, Unit, Service, ServiceNode]
 
 
 class Command(BaseCommand):
+    @invalidates_cache("search")
     def handle(self, *args, **kwargs):
         logger.info("Emptying search columns...")
         for model in MODELS:
@@ -0,0 +1,36 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from services.snapshot_export import export_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the public units, services, service nodes, departments and "
+        "divisions as compressed NDJSON and GeoJSON files with a manifest"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            default=None,
+            help="Directory to export to, settings.SNAPSHOT_EXPORT_DIR by default.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Number of rows fetched at a time from the database.",
+        )
+
+    def handle(self, **options):
+        manifest = export_snapshot(
+            directory=options["directory"],
+            chunk_size=options["chunk_size"],
+            logger=logger,
+        )
+        for entry in manifest["files"]:
+            self.stdout.write("{name}: {count} rows, {size} bytes".format(**entry))
@@ -7,6 +7,7 @@ from django.utils import timezone
 from munigeo.models import Address, AdministrativeDivision
 
 from services.models import Service, ServiceNode, Unit
+from services.response_cache import invalidates_cache
 from services.search.constants import HYPHENATE_ADDRESSES_MODIFIED_WITHIN_DAYS
 from services.search.utils import get_foreign_key_attr, hyphenate
 
@@ -117,6 +118,7 @@ class Command(BaseCommand):
             help="Hyphenate all addresses",
         )
 
+    @invalidates_cache("search")
     def handle(self, *args, **options):
         hyphenate_all_addresses = options.get("hyphenate_all_addresses", None)
         hyphenate_addresses_from = options.get("hyphenate_addresses_from", None)
@@ -6,7 +6,9 @@ from django.contrib.gis.gdal.error import GDALException
 from django.contrib.gis.geos import LineString, MultiLineString, MultiPolygon, Polygon
 from django.core.management.base import BaseCommand
 
+from services.import_runs import add_import_rows, import_phase, records_import_run
 from services.models.unit_identifier import UnitIdentifier
+from services.response_cache import invalidates_cache
 
 TYPES = {"paths": "lipas:lipas_kaikki_reitit", "areas": "lipas:lipas_kaikki_alueet"}
 
@@ -77,6 +79,8 @@ class Command(BaseCommand):
             help="Filter results by municipality. ",
         )
 
+    @invalidates_cache("search")
+    @records_import_run()
     def handle(self, *args, **options):
         logger.info("Retrieving all external unit identifiers from the database...")
 
@@ -102,13 +106,14 @@ class Command(BaseCommand):
                 ["kuntanumero = '{}'".format(id_) for id_ in muni_filter]
             )
 
-        layers = {}
-        for key, val in TYPES.items():
-            url = wfs.get_feature(
-                type_name=val, max_features=max_features, cql_filter=muni_filter
-            )
+        with import_phase("fetch"):
+            layers = {}
+            for key, val in TYPES.items():
+                url = wfs.get_feature(
+                    type_name=val, max_features=max_features, cql_filter=muni_filter
+                )
 
-            layers[key] = DataSource(url)[0]
+                layers[key] = DataSource(url)[0]
 
         logger.info(
             "Retrieved {} path and {} area features.".format(
@@ -116,6 +121,25 @@ class Command(BaseCommand):
             )
         )
 
+        logger.info("Processing Lipas geodata...")
+        with import_phase("geometry"):
+            geometries = self.get_geometries(layers, units_by_lipas_id)
+
+        logger.info("Found {} matches.".format(len(geometries)))
+
+        # Add all geometries we found to the db
+        logger.info("Updating geometries in the database...")
+        with import_phase("write"):
+            for lipas_id, geometry in geometries.items():
+                unit = units_by_lipas_id[lipas_id]
+                # FIXME: make sports map UI support simplified
+                # geometries and bring back simplification
+                # from commit 6cff46e0399fedbbc8266efa5230cd4ccb8a8485
+                unit.geometry = geometry
+                unit.save()
+            add_import_rows(len(geometries))
+
+    def get_geometries(self, layers, units_by_lipas_id):
         # The Lipas database stores paths and areas as different features
         # which have a common id. We want to store the paths as one
         # multi-collection which includes all the small subpaths or areas.
@@ -125,7 +149,6 @@ class Command(BaseCommand):
         geometries = {}
 
         # Iterate through Lipas layers and features
-        logger.info("Processing Lipas geodata...")
         for layer in layers.values():
             for feature in layer:
                 logger.debug(feature.fid)
@@ -179,14 +202,4 @@ class Command(BaseCommand):
                     # One example is a CurvePolygon as defined here http://www.gdal.org/ogr__core_8h.html
                     logger.error("Error while processing a geometry: {}".format(err))
 
-        logger.info("Found {} matches.".format(len(geometries)))
-
-        # Add all geometries we found to the db
-        logger.info("Updating geometries in the database...")
-        for lipas_id, geometry in geometries.items():
-            unit = units_by_lipas_id[lipas_id]
-            # FIXME: make sports map UI support simplified
-            # geometries and bring back simplification
-            # from commit 6cff46e0399fedbbc8266efa5230cd4ccb8a8485
-            unit.geometry = geometry
-            unit.save()
+        return geometries
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from services.models import UnitChange
+
+
+class Command(BaseCommand):
+    help = "Delete the unit changes older than settings.UNIT_CHANGE_RETENTION_DAYS"
+
+    def handle(self, **options):
+        count = UnitChange.prune()
+        self.stdout.write("Deleted {} unit changes.".format(count))
@@ -0,0 +1,238 @@
+"""
+Batched writes of the imported units.
+
+The importers diff the incoming units against the current rows in memory
+and register the changed units and their replaced related rows with a
+UnitBulkWriter. The writer upserts the units and replaces the related
+rows with a few statements per table and batch instead of saving every
+row separately. Bulk writes send no signals, so the writer records the
+unit changes and updates the search columns of the written units itself.
+
+The importers also store a hash of the source data of each unit and skip
+the units whose source data has not changed since the previous import.
+"""
+
+import hashlib
+import json
+import time
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.utils import DataError
+
+from services.import_runs import add_import_rows, import_phase
+from services.models import ServiceNode, Unit, UnitAccessibilityShortcomings, UnitChange
+from services.signals import get_syllables, populate_search_columns
+
+BATCH_SIZE = 1000
+# Change to import all units again after the importers have changed.
+SOURCE_HASH_VERSION = 1
+# Unit fields maintained by the search indexing instead of the importers.
+SEARCH_FIELDS = ("search_column_fi", "search_column_sv", "search_column_en")
+
+
+def get_unit_update_fields():
+    return [
+        f.name
+        for f in Unit._meta.concrete_fields
+        if not f.primary_key and f.name not in SEARCH_FIELDS
+    ]
+
+
+def get_source_hash(*data):
+    """
+    Return a hash of the JSON serializable source data of a unit, which
+    does not depend on the order of the keys of the data.
+    """
+    data_json = json.dumps(
+        [SOURCE_HASH_VERSION, data], ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha1(data_json.encode("utf8")).hexdigest()
+
+
+class UnitBulkWriter(object):
+    def __init__(self, batch_size=BATCH_SIZE, logger=None):
+        self.batch_size = batch_size
+        self.logger = logger
+        self.update_fields = get_unit_update_fields()
+        self.root_service_node_ids = None
+        self.started_at = time.monotonic()
+        self.handled_count = 0
+        self.skipped_count = 0
+        self.written_count = 0
+        self._reset()
+
+    def _reset(self):
+        self.units = {}
+        self.created_ids = set()
+        # (model, filters) -> (unit ids, new objects)
+        self.related = {}
+        # m2m field name -> {unit id: related ids}
+        self.m2m = defaultdict(dict)
+        self.shortcomings = {}
+        # unit id -> source hash of the units, which are otherwise unchanged
+        self.source_hashes = {}
+
+    def save_unit(self, obj, created=False):
+        """
+        Write the unit on the next flush. The related rows of the unit are
+        written after the unit, so new units can have related rows.
+        """
+        self.units[obj.id] = obj
+        if created:
+            self.created_ids.add(obj.id)
+
+    def replace_related(self, model, unit_id, objects, **filters):
+        """
+        Replace the rows of the model related to the unit, or only the rows
+        matching the filters, with the given unsaved objects.
+        """
+        key = (model, tuple(sorted(filters.items())))
+        unit_ids, new_objects = self.related.setdefault(key, (set(), []))
+        unit_ids.add(unit_id)
+        new_objects.extend(objects)
+
+    def set_m2m(self, field_name, unit_id, ids):
+        self.m2m[field_name][unit_id] = set(ids)
+
+    def set_shortcomings(self, unit_id, fields):
+        self.shortcomings[unit_id] = fields
+
+    def set_source_hash(self, obj, source_hash):
+        """
+        Store the source hash of the unit. Only the hash is written for the
+        units that are not otherwise saved, so their modification times and
+        search columns are not touched.
+        """
+        obj.source_hash = source_hash
+        self.source_hashes[obj.id] = source_hash
+
+    def get_root_service_nodes(self, service_node_ids):
+        """
+        Return the sorted ids of the root service nodes of the given
+        service nodes, like Unit.get_root_service_nodes without queries.
+        """
+        if self.root_service_node_ids is None:
+            nodes = list(ServiceNode.objects.values_list("id", "tree_id", "level"))
+            roots_by_tree = {tree_id: id for id, tree_id, level in nodes if level == 0}
+            self.root_service_node_ids = {
+                id: roots_by_tree.get(tree_id) for id, tree_id, _ in nodes
+            }
+        roots = {self.root_service_node_ids.get(id) for id in service_node_ids}
+        return sorted(root for root in roots if root is not None)
+
+    def unit_handled(self, skipped=False):
+        """
+        Count a handled unit and flush the changes if the batch is full.
+        Skipped units had the same source data as in the previous import.
+        """
+        self.handled_count += 1
+        add_import_rows(1)
+        if skipped:
+            self.skipped_count += 1
+        if len(self.units) + len(self.source_hashes) >= self.batch_size:
+            self.flush()
+
+    def _write_units(self, units):
+        try:
+            Unit.objects.bulk_create(
+                units,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=self.update_fields,
+            )
+        except DataError:
+            if self.logger:
+                self.logger.error(
+                    "Importing failed for units {}".format(
+                        ", ".join(str(obj.id) for obj in units)
+                    )
+                )
+            raise
+
+    def _write_m2m(self, field_name, ids_by_unit):
+        field = Unit._meta.get_field(field_name)
+        through = field.remote_field.through
+        source = "%s_id" % field.m2m_field_name()
+        target = "%s_id" % field.m2m_reverse_field_name()
+        through.objects.filter(**{source + "__in": list(ids_by_unit)}).delete()
+        through.objects.bulk_create(
+            [
+                through(**{source: unit_id, target: id})
+                for unit_id, ids in ids_by_unit.items()
+                for id in ids
+            ],
+            batch_size=self.batch_size,
+        )
+
+    def _write_shortcomings(self):
+        objects = [
+            UnitAccessibilityShortcomings(unit_id=unit_id, **fields)
+            for unit_id, fields in self.shortcomings.items()
+        ]
+        UnitAccessibilityShortcomings.objects.bulk_create(
+            objects,
+            batch_size=self.batch_size,
+            update_conflicts=True,
+            unique_fields=["unit"],
+            update_fields=list(next(iter(self.shortcomings.values())).keys()),
+        )
+
+    def flush(self):
+        with import_phase("write units"):
+            self._write()
+
+    @transaction.atomic
+    def _write(self):
+        units = list(self.units.values())
+        for obj in units:
+            obj.syllables_fi = get_syllables(obj)
+        if units:
+            self._write_units(units)
+        for (model, filters), (unit_ids, objects) in self.related.items():
+            model.objects.filter(unit_id__in=unit_ids, **dict(filters)).delete()
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+        for field_name, ids_by_unit in self.m2m.items():
+            self._write_m2m(field_name, ids_by_unit)
+        if self.shortcomings:
+            self._write_shortcomings()
+        hash_only_ids = set(self.source_hashes) - set(self.units)
+        if hash_only_ids:
+            Unit.objects.bulk_update(
+                [
+                    Unit(id=id, source_hash=self.source_hashes[id])
+                    for id in hash_only_ids
+                ],
+                ["source_hash"],
+                batch_size=self.batch_size,
+            )
+
+        changed_ids = defaultdict(list)
+        for unit in units:
+            change_type = UnitChange.get_change_type(
+                unit, created=unit.id in self.created_ids
+            )
+            changed_ids[change_type].append(unit.id)
+        for change_type, unit_ids in changed_ids.items():
+            UnitChange.record(unit_ids, change_type)
+        if units:
+            transaction.on_commit(populate_search_columns(Unit, self.units))
+        self.written_count += len(units)
+        self._reset()
+
+    def log_throughput(self, name="units"):
+        elapsed = time.monotonic() - self.started_at
+        if self.logger:
+            self.logger.info(
+                "Imported {} {} ({} unchanged, {} written) in {:.1f} s, "
+                "{:.1f} {}/s".format(
+                    self.handled_count,
+                    name,
+                    self.skipped_count,
+                    self.written_count,
+                    elapsed,
+                    self.handled_count / elapsed if elapsed else 0,
+                    name,
+                )
+            )
@@ -0,0 +1,169 @@
+"""
+Fetching of the resources of the services registry API.
+
+The resources are fetched through a pooled session, which retries the
+failed requests with a backoff. Optionally the responses are stored in a
+cache directory and revalidated with conditional requests, so unchanged
+resources are not downloaded again, and the import can be run offline
+from the cached responses, e.g. from responses recorded for tests.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRIES = 3
+BACKOFF_FACTOR = 1
+RETRY_STATUSES = (500, 502, 503, 504)
+TIMEOUT = (10, 300)
+
+
+class FetchError(Exception):
+    pass
+
+
+class ResourceFetcher(object):
+    def __init__(
+        self,
+        cache_dir=None,
+        offline=False,
+        retries=RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+    ):
+        if offline and not cache_dir:
+            raise ValueError("The cache directory is required in the offline mode")
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.lock = threading.Lock()
+        self.prefetched = {}
+        retry = Retry(
+            total=retries,
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=backoff_factor,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_maxsize=settings.SERVICES_IMPORT_FETCH_WORKERS, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_cache_paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        path = os.path.join(self.cache_dir, key)
+        return path + ".json", path + ".headers.json"
+
+    def read_cache(self, url):
+        """
+        Return a tuple of the cached validators and content of the URL or
+        None if the URL is not cached.
+        """
+        if not self.cache_dir:
+            return None
+        content_path, headers_path = self.get_cache_paths(url)
+        try:
+            with open(headers_path, "r") as f:
+                headers = json.load(f)
+            with open(content_path, "rb") as f:
+                return headers, f.read()
+        except FileNotFoundError:
+            return None
+
+    def write_file(self, path, content):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def write_cache(self, url, response):
+        content_path, headers_path = self.get_cache_paths(url)
+        headers = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # The content is written first, so the validators never refer to
+        # a missing or an older content.
+        self.write_file(content_path, response.content)
+        self.write_file(headers_path, json.dumps(headers).encode("utf-8"))
+
+    def fetch(self, url):
+        cached = self.read_cache(url)
+        if self.offline:
+            if cached is None:
+                raise FetchError("%s is not in the cache" % url)
+            return json.loads(cached[1])
+
+        request_headers = {}
+        if cached is not None:
+            headers, _ = cached
+            if headers.get("etag"):
+                request_headers["If-None-Match"] = headers["etag"]
+            if headers.get("last_modified"):
+                request_headers["If-Modified-Since"] = headers["last_modified"]
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=TIMEOUT)
+        except requests.RequestException as e:
+            raise FetchError("Fetching %s failed: %s" % (url, e))
+        if response.status_code == 304 and cached is not None:
+            logger.info(f"{url} has not changed")
+            return json.loads(cached[1])
+        if response.status_code != 200:
+            raise FetchError("%s returned status code %s" % (url, response.status_code))
+        if self.cache_dir:
+            self.write_cache(url, response)
+        return response.json()
+
+    def get_json(self, url):
+        """
+        Return the decoded JSON resource of the URL. The prefetched
+        resources are returned without requests.
+        """
+        with self.lock:
+            if url in self.prefetched:
+                return self.prefetched[url]
+        return self.fetch(url)
+
+    def prefetch(self, urls):
+        """
+        Fetch the URLs concurrently and keep the resources in memory until
+        clear() is called.
+        """
+        urls = [url for url in urls if url not in self.prefetched]
+        results = fetch_concurrently(*[partial(self.fetch, url) for url in urls])
+        with self.lock:
+            self.prefetched.update(zip(urls, results))
+
+    def clear(self):
+        with self.lock:
+            self.prefetched = {}
+
+
+def fetch_concurrently(*funcs):
+    """
+    Call the given functions, which fetch independent resources, in a
+    thread pool of at most `settings.SERVICES_IMPORT_FETCH_WORKERS` threads
+    and return their results in the same order.
+    """
+    if len(funcs) < 2:
+        return [func() for func in funcs]
+    workers = min(len(funcs), settings.SERVICES_IMPORT_FETCH_WORKERS)
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="fetch"
+    ) as executor:
+        futures = [executor.submit(func) for func in funcs]
+        return [future.result() for future in futures]
@@ -40,14 +40,19 @@ class KeywordHandler:
                 new_kw_set.add(kw_obj.pk)
         return new_kw_set
 
-    def sync_searchwords(self, obj, info, obj_changed):
+    def get_changed_searchwords(self, obj, info):
+        """
+        Return the ids of the new keywords of the object or None if the
+        keywords have not changed.
+        """
         new_keywords = set()
         for lang in self.supported_languages:
             new_keywords |= self._save_searchwords(obj, info, lang)
 
-        old_kw_set = set(obj.keywords.all().values_list("pk", flat=True))
+        # Iterate instead of values_list, so prefetched keywords are used.
+        old_kw_set = {kw.pk for kw in obj.keywords.all()}
         if old_kw_set == new_keywords:
-            return obj_changed
+            return None
 
         if self.verbosity and self.logger:
             old_kw_str = ", ".join([self.keywords_by_id[x].name for x in old_kw_set])
@@ -55,5 +60,11 @@ class KeywordHandler:
             self.logger.info(
                 "%s keyword set changed: %s -> %s" % (obj, old_kw_str, new_kw_str)
             )
+        return new_keywords
+
+    def sync_searchwords(self, obj, info, obj_changed):
+        new_keywords = self.get_changed_searchwords(obj, info)
+        if new_keywords is None:
+            return obj_changed
         obj.keywords.set(new_keywords)
         return True
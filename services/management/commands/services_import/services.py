@@ -1,36 +1,106 @@
 import re
 import sys
+from collections import defaultdict
 from datetime import datetime
-from functools import lru_cache
+from functools import lru_cache, partial
 
 import pytz
 from django import db
+from django.conf import settings
 from munigeo.importer.sync import ModelSyncher
-from munigeo.models import AdministrativeDivision, AdministrativeDivisionType
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    AdministrativeDivisionType,
+)
 
 from services.management.commands.services_import.keyword import KeywordHandler
 from services.models import (
     Service,
+    ServiceDivisionUnitCount,
     ServiceNode,
+    ServiceNodeDivisionUnitCount,
     ServiceNodeUnitCount,
     ServiceUnitCount,
     Unit,
+    UnitServiceDetails,
 )
 
+from .fetcher import fetch_concurrently
 from .utils import pk_get, save_translated_field
 
 UTC_TIMEZONE = pytz.timezone("UTC")
 SERVICE_REFERENCE_SEPARATOR = re.compile("[^0-9]+")
 
+# The spatial join of units and division boundaries is done once into a
+# temporary table, the counts of services and service nodes are then
+# aggregated from it.
+UNIT_DIVISIONS_SQL = """
+    CREATE TEMPORARY TABLE unit_divisions ON COMMIT DROP AS
+    SELECT u.id AS unit_id, g.division_id, d.type_id
+    FROM {unit} u
+    JOIN {geometry} g ON ST_Contains(g.boundary, u.location)
+    JOIN {division} d ON d.id = g.division_id
+    WHERE u.public AND u.is_active AND d.type_id = ANY(%s)
+"""
+SERVICE_DIVISION_COUNTS_SQL = """
+    SELECT usd.service_id, ud.division_id, ud.type_id, COUNT(DISTINCT ud.unit_id)
+    FROM unit_divisions ud
+    JOIN {service_details} usd ON usd.unit_id = ud.unit_id
+    GROUP BY usd.service_id, ud.division_id, ud.type_id
+"""
+# A unit is counted for a service node if it belongs to the node or
+# to any of its descendants, i.e. to a node within the lft/rght range.
+SERVICE_NODE_DIVISION_COUNTS_SQL = """
+    SELECT n.id, ud.division_id, ud.type_id, COUNT(DISTINCT ud.unit_id)
+    FROM unit_divisions ud
+    JOIN {unit_service_nodes} usn ON usn.unit_id = ud.unit_id
+    JOIN {service_node} c ON c.id = usn.servicenode_id
+    JOIN {service_node} n
+        ON n.tree_id = c.tree_id AND c.lft BETWEEN n.lft AND n.rght
+    GROUP BY n.id, ud.division_id, ud.type_id
+"""
+# Apply the deltas of (service node id, division id, count) to the service
+# node unit counts in one statement. Division id may be NULL, which the
+# unique constraint does not cover, so the existing rows are updated and
+# the rest inserted instead of using ON CONFLICT.
+SERVICE_NODE_COUNT_DELTAS_SQL = """
+    WITH delta (service_node_id, division_id, count) AS (
+        VALUES {values}
+    ),
+    updated AS (
+        UPDATE {table} t SET count = GREATEST(t.count + d.count, 0)
+        FROM delta d
+        WHERE t.id = (
+            SELECT min(x.id) FROM {table} x
+            WHERE x.service_node_id = d.service_node_id
+                AND x.division_id IS NOT DISTINCT FROM d.division_id
+        )
+        RETURNING t.service_node_id, t.division_id
+    )
+    INSERT INTO {table} (service_node_id, division_id, division_type_id, count)
+    SELECT d.service_node_id, d.division_id, %s, d.count
+    FROM delta d
+    WHERE d.count > 0 AND NOT EXISTS (
+        SELECT 1 FROM updated u
+        WHERE u.service_node_id = d.service_node_id
+            AND u.division_id IS NOT DISTINCT FROM d.division_id
+    )
+"""
+
 
 def import_services(
     syncher=None,
     noop=False,
     logger=None,
     importer=None,
-    ontologytrees=pk_get("ontologytree"),
-    ontologywords=pk_get("ontologyword"),
+    ontologytrees=None,
+    ontologywords=None,
 ):
+    if ontologytrees is None or ontologywords is None:
+        ontologytrees, ontologywords = fetch_concurrently(
+            partial(pk_get, "ontologytree"), partial(pk_get, "ontologyword")
+        )
 
     nodesyncher = ModelSyncher(ServiceNode.objects.all(), lambda obj: obj.id)
     servicesyncher = ModelSyncher(Service.objects.all(), lambda obj: obj.id)
@@ -171,35 +241,107 @@ def get_divisions_by_muni():
         )
 
 
-def update_count_objects(service_node_unit_count_objects, node):
+@db.transaction.atomic
+def save_objects(objects):
+    for o in objects:
+        o.save()
+
+
+def get_unit_count_state():
     """
-    This is a generator which yields all the objects that need to be saved.
-    (Objects that didn't exist or whose count field was updated.)
+    Return the state the service node unit counts are computed from, i.e.
+    a tuple of the parents of the service nodes and a dict of unit id ->
+    (municipality id, set of service node ids) of the public and active
+    units. Pass the state to update_service_node_counts to update only the
+    counts the changes made after getting the state affect.
+    """
+    parents = dict(ServiceNode.objects.values_list("id", "parent_id"))
+    units = {}
+    through_values = Unit.service_nodes.through.objects.filter(
+        unit__public=True, unit__is_active=True
+    ).values_list("unit_id", "unit__municipality", "servicenode_id")
+    for unit_id, municipality, service_node_id in through_values:
+        units.setdefault(unit_id, (municipality, set()))[1].add(service_node_id)
+    return parents, units
+
+
+def get_service_node_count_deltas(parents, previous_units, units):
+    """
+    Return a dict of (service node id, municipality id) -> change of the
+    unit count for the units whose municipality or service nodes have
+    changed. A unit is counted once for every node it belongs to and for
+    all of their ancestors.
     """
-    for muni, count in node._unit_count.items():
-        obj = service_node_unit_count_objects.get((node.id, muni))
-        if obj is None:
-            obj = ServiceNodeUnitCount(
-                service_node=node,
-                division_type=get_municipality_division_type(),
-                division=get_divisions_by_muni().get(muni),
-                count=count,
-            )
-            yield obj
-        elif obj.count != count:
-            obj.count = count
-            yield obj
-    for node in node.get_children():
-        yield from update_count_objects(service_node_unit_count_objects, node)
+
+    def get_counted_nodes(service_node_ids):
+        nodes = set()
+        for node_id in service_node_ids:
+            while node_id is not None and node_id not in nodes:
+                nodes.add(node_id)
+                node_id = parents.get(node_id)
+        return nodes
+
+    deltas = defaultdict(int)
+    for unit_id in previous_units.keys() | units.keys():
+        previous = previous_units.get(unit_id)
+        current = units.get(unit_id)
+        if previous == current:
+            continue
+        for state, sign in ((previous, -1), (current, 1)):
+            if state is None:
+                continue
+            municipality, service_node_ids = state
+            for node_id in get_counted_nodes(service_node_ids):
+                deltas[(node_id, municipality)] += sign
+    return {key: delta for key, delta in deltas.items() if delta}
 
 
 @db.transaction.atomic
-def save_objects(objects):
-    for o in objects:
-        o.save()
+def apply_service_node_count_deltas(deltas):
+    divisions_by_muni = get_divisions_by_muni()
+    division_deltas = defaultdict(int)
+    for (node_id, municipality), delta in deltas.items():
+        division = divisions_by_muni.get(municipality)
+        division_deltas[(node_id, division and division.id)] += delta
+    if not division_deltas:
+        return
+    params = []
+    for (node_id, division_id), delta in division_deltas.items():
+        params.extend([node_id, division_id, delta])
+    sql = SERVICE_NODE_COUNT_DELTAS_SQL.format(
+        table=ServiceNodeUnitCount._meta.db_table,
+        values=", ".join(
+            ["(%s::integer, %s::integer, %s::integer)"] * len(division_deltas)
+        ),
+    )
+    with db.connection.cursor() as cursor:
+        cursor.execute(sql, params + [get_municipality_division_type().id])
+    ServiceNodeUnitCount.objects.filter(count=0).delete()
+
+
+def update_service_node_counts(previous_state=None):
+    """
+    Update the unit counts of the service nodes. If the state returned by
+    get_unit_count_state before the units were changed is given, only the
+    counts of the service nodes of the changed units are updated, unless
+    the service node tree has changed too.
+    """
+    if previous_state is not None and get_municipality_division_type() is not None:
+        previous_parents, previous_units = previous_state
+        parents, units = get_unit_count_state()
+        if parents == previous_parents:
+            apply_service_node_count_deltas(
+                get_service_node_count_deltas(parents, previous_units, units)
+            )
+            return None
+    return recount_service_node_units()
 
 
-def update_service_node_counts():
+def count_service_node_units():
+    """
+    Count the units of all the service nodes. Return the service node trees
+    with the counts by municipality id in the `_unit_count` of the nodes.
+    """
     units_by_service = {}
     through_values = (
         Unit.service_nodes.through.objects.filter(
@@ -215,37 +357,76 @@ def update_service_node_counts():
         unit_set.add(unit_id)
         units_by_service[service_node_id][municipality] = unit_set
 
-    unit_counts_to_be_updated = set(
-        (
-            (service_node_id, municipality)
-            for service_node_id, municipality, _ in through_values
-        )
-    )
-
-    for c in ServiceNodeUnitCount.objects.select_related("division").all():
-        div_name = c.division and c.division.name_fi.lower()
-        if (c.service_node_id, div_name) not in unit_counts_to_be_updated:
-            c.delete()
-
     tree = ServiceNode.tree_objects.all().get_cached_trees()
     for node in tree:
         update_service_node(node, units_by_service)
+    return tree
 
-    def count_object_pair(x):
-        div = x.division.name_fi.lower() if x.division is not None else None
-        return ((x.service_node_id, div), x)
 
-    service_node_unit_count_objects = dict(
-        (
-            count_object_pair(x)
-            for x in ServiceNodeUnitCount.objects.select_related("division").all()
-        )
-    )
-    objects_to_save = []
+def get_service_node_unit_counts(tree):
+    """
+    Return a dict of (service node id, municipality id) -> unit count of
+    the trees returned by count_service_node_units.
+    """
+    counts = {}
+
+    def add_counts(node):
+        for municipality, count in node._unit_count.items():
+            counts[(node.id, municipality)] = count
+        for child in node.get_children():
+            add_counts(child)
+
     for node in tree:
-        objects_to_save.extend(
-            update_count_objects(service_node_unit_count_objects, node)
-        )
+        add_counts(node)
+    return counts
+
+
+def get_service_node_division_counts(tree):
+    """
+    Return a dict of (service node id, division id) -> unit count of the
+    trees returned by count_service_node_units. The counts of the units in
+    municipalities without a division and of the units without a
+    municipality are summed under the division id None, so that there is a
+    single count object per service node and division.
+    """
+    divisions_by_muni = get_divisions_by_muni()
+    counts = defaultdict(int)
+    for (node_id, municipality), count in get_service_node_unit_counts(tree).items():
+        division = divisions_by_muni.get(municipality)
+        counts[(node_id, division and division.id)] += count
+    return counts
+
+
+def recount_service_node_units():
+    tree = count_service_node_units()
+    unit_counts = get_service_node_division_counts(tree)
+
+    count_objects = {}
+    ids_to_delete = []
+    for c in ServiceNodeUnitCount.objects.all():
+        key = (c.service_node_id, c.division_id)
+        # Duplicates of the same service node and division are removed too.
+        if key not in unit_counts or key in count_objects:
+            ids_to_delete.append(c.id)
+        else:
+            count_objects[key] = c
+    ServiceNodeUnitCount.objects.filter(id__in=ids_to_delete).delete()
+
+    objects_to_save = []
+    for (node_id, division_id), count in unit_counts.items():
+        obj = count_objects.get((node_id, division_id))
+        if obj is None:
+            objects_to_save.append(
+                ServiceNodeUnitCount(
+                    service_node_id=node_id,
+                    division_type=get_municipality_division_type(),
+                    division_id=division_id,
+                    count=count,
+                )
+            )
+        elif obj.count != count:
+            obj.count = count
+            objects_to_save.append(obj)
     save_objects(objects_to_save)
     return tree
 
@@ -293,6 +474,76 @@ def update_service_counts():
     return
 
 
+def get_unit_count_division_types():
+    types = AdministrativeDivisionType.objects.all()
+    if settings.UNIT_COUNT_DIVISION_TYPES:
+        types = types.filter(type__in=settings.UNIT_COUNT_DIVISION_TYPES)
+    return list(types.values_list("id", flat=True))
+
+
+def sync_division_unit_counts(model, owner_field, rows):
+    """
+    Synchronize the division unit count objects of the given model with
+    the rows of (owner id, division id, division type id, count).
+    """
+    owner_key = "{}_id".format(owner_field)
+    existing_objects = dict(
+        ((getattr(o, owner_key), o.division_id), o) for o in model.objects.all()
+    )
+    objects_to_create = []
+    objects_to_update = []
+    for owner_id, division_id, division_type_id, count in rows:
+        o = existing_objects.pop((owner_id, division_id), None)
+        if o is None:
+            objects_to_create.append(
+                model(
+                    division_id=division_id,
+                    division_type_id=division_type_id,
+                    count=count,
+                    **{owner_key: owner_id},
+                )
+            )
+        elif o.count != count or o.division_type_id != division_type_id:
+            o.count = count
+            o.division_type_id = division_type_id
+            objects_to_update.append(o)
+    model.objects.filter(id__in=[o.id for o in existing_objects.values()]).delete()
+    model.objects.bulk_create(objects_to_create, batch_size=1000)
+    model.objects.bulk_update(
+        objects_to_update, ["count", "division_type"], batch_size=1000
+    )
+
+
+@db.transaction.atomic
+def update_division_unit_counts():
+    """
+    Update the unit counts of services and service nodes in administrative
+    divisions of the types in settings.UNIT_COUNT_DIVISION_TYPES (all types
+    if empty), using a single spatial join of units and division boundaries.
+    """
+    tables = {
+        "unit": Unit._meta.db_table,
+        "geometry": AdministrativeDivisionGeometry._meta.db_table,
+        "division": AdministrativeDivision._meta.db_table,
+        "service_details": UnitServiceDetails._meta.db_table,
+        "unit_service_nodes": Unit.service_nodes.through._meta.db_table,
+        "service_node": ServiceNode._meta.db_table,
+    }
+    with db.connection.cursor() as cursor:
+        cursor.execute(
+            UNIT_DIVISIONS_SQL.format(**tables), [get_unit_count_division_types()]
+        )
+        cursor.execute(SERVICE_DIVISION_COUNTS_SQL.format(**tables))
+        service_rows = cursor.fetchall()
+        cursor.execute(SERVICE_NODE_DIVISION_COUNTS_SQL.format(**tables))
+        service_node_rows = cursor.fetchall()
+
+    sync_division_unit_counts(ServiceDivisionUnitCount, "service", service_rows)
+    sync_division_unit_counts(
+        ServiceNodeDivisionUnitCount, "service_node", service_node_rows
+    )
+
+
 @db.transaction.atomic
 def update_service_root_service_nodes():
     tree_roots = dict(ServiceNode.objects.filter(level=0).values_list("tree_id", "id"))
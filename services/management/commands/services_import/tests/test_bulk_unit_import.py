@@ -0,0 +1,163 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from services.management.commands.services_import.bulk import (
+    get_source_hash,
+    UnitBulkWriter,
+)
+from services.models import (
+    ServiceNode,
+    Unit,
+    UnitAccessibilityShortcomings,
+    UnitChange,
+    UnitConnection,
+)
+from services.tests.utils import MOD_TIME
+
+
+@pytest.fixture
+def service_nodes():
+    root = ServiceNode.objects.create(id=1, name="root", last_modified_time=MOD_TIME)
+    child = ServiceNode.objects.create(
+        id=2, name="child", parent=root, last_modified_time=MOD_TIME
+    )
+    return root, child
+
+
+@pytest.fixture
+def unit():
+    unit = Unit.objects.create(id=1, name_fi="unit", last_modified_time=MOD_TIME)
+    for i, section_type in enumerate([1, 1, 5]):
+        UnitConnection.objects.create(
+            unit=unit, section_type=section_type, order=i, name_fi="old %s" % i
+        )
+    return unit
+
+
+def get_connections(unit_id):
+    return list(
+        UnitConnection.objects.filter(unit_id=unit_id)
+        .order_by("section_type", "order")
+        .values_list("section_type", "name_fi")
+    )
+
+
+def write_units(unit_ids, service_node, capture_on_commit_callbacks):
+    """
+    Write new units with related rows and return the number of queries.
+    """
+    writer = UnitBulkWriter(batch_size=100)
+    for unit_id in unit_ids:
+        writer.save_unit(
+            Unit(
+                id=unit_id,
+                name_fi="yksikkö %s" % unit_id,
+                service_names_fi=["uimahalli"],
+                last_modified_time=timezone.now(),
+            ),
+            created=True,
+        )
+        writer.replace_related(
+            UnitConnection,
+            unit_id,
+            [UnitConnection(unit_id=unit_id, section_type=1, name_fi="new")],
+        )
+        writer.set_m2m("service_nodes", unit_id, [service_node.id])
+        writer.set_shortcomings(
+            unit_id,
+            {"accessibility_shortcoming_count": {}, "accessibility_description": []},
+        )
+        writer.unit_handled()
+    with CaptureQueriesContext(connection) as queries:
+        with capture_on_commit_callbacks(execute=True):
+            writer.flush()
+    return len(queries)
+
+
+@pytest.mark.django_db
+def test_bulk_write_statements(service_nodes, django_capture_on_commit_callbacks):
+    root, child = service_nodes
+    # The statements, including the syllables and the search columns, do
+    # not depend on the number of units.
+    assert write_units(
+        range(10, 12), child, django_capture_on_commit_callbacks
+    ) == write_units(range(20, 30), child, django_capture_on_commit_callbacks)
+    unit = Unit.objects.get(id=20)
+    assert unit.syllables_fi
+    assert unit.search_column_fi
+
+
+@pytest.mark.django_db
+def test_bulk_writes(unit, service_nodes):
+    root, child = service_nodes
+    writer = UnitBulkWriter(batch_size=10)
+    assert writer.get_root_service_nodes([child.id]) == [root.id]
+
+    unit.name_fi = "renamed"
+    unit.last_modified_time = timezone.now()
+    writer.save_unit(unit)
+    new_unit = Unit(id=2, name_fi="new unit", last_modified_time=timezone.now())
+    writer.save_unit(new_unit, created=True)
+    writer.unit_handled()
+    writer.unit_handled()
+    for unit_id in [unit.id, new_unit.id]:
+        writer.replace_related(
+            UnitConnection,
+            unit_id,
+            [UnitConnection(unit_id=unit_id, section_type=1, name_fi="new")],
+            section_type=1,
+        )
+        writer.set_m2m("service_nodes", unit_id, [child.id])
+        writer.set_shortcomings(
+            unit_id,
+            {"accessibility_shortcoming_count": {}, "accessibility_description": []},
+        )
+    since = timezone.now()
+    writer.flush()
+
+    assert Unit.objects.get(id=1).name_fi == "renamed"
+    assert Unit.objects.get(id=2).name_fi == "new unit"
+    # Only the connections of the section type are replaced.
+    assert get_connections(1) == [(1, "new"), (5, "old 2")]
+    assert get_connections(2) == [(1, "new")]
+    assert list(Unit.objects.get(id=2).service_nodes.all()) == [child]
+    assert UnitAccessibilityShortcomings.objects.count() == 2
+    assert set(
+        UnitChange.objects.filter(time__gte=since).values_list("unit_id", "change_type")
+    ) == {(1, UnitChange.UPDATED), (2, UnitChange.CREATED)}
+    assert writer.handled_count == 2
+    assert writer.written_count == 2
+
+
+@pytest.mark.django_db
+def test_unchanged_units_are_not_written(unit):
+    writer = UnitBulkWriter()
+    writer.unit_handled()
+    since = timezone.now()
+    writer.flush()
+    assert not UnitChange.objects.filter(time__gte=since).exists()
+    assert writer.written_count == 0
+
+
+def test_source_hash():
+    assert get_source_hash({"a": 1, "b": [1, 2]}) == get_source_hash(
+        {"b": [1, 2], "a": 1}
+    )
+    assert get_source_hash({"a": 1}) != get_source_hash({"a": 2})
+
+
+@pytest.mark.django_db
+def test_only_source_hash_is_written(unit):
+    writer = UnitBulkWriter()
+    writer.set_source_hash(unit, "abc")
+    writer.unit_handled()
+    since = timezone.now()
+    writer.flush()
+
+    unit = Unit.objects.get(id=unit.id)
+    assert unit.source_hash == "abc"
+    assert unit.last_modified_time == MOD_TIME
+    assert not UnitChange.objects.filter(time__gte=since).exists()
+    assert writer.written_count == 0
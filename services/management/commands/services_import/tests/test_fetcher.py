@@ -0,0 +1,95 @@
+import json
+import time
+
+import pytest
+
+from services.management.commands.services_import.fetcher import (
+    fetch_concurrently,
+    FetchError,
+    ResourceFetcher,
+)
+from services.tests.utils import stub_http_server, StubRequestHandler
+
+ETAG = '"v1"'
+
+
+class StubHandler(StubRequestHandler):
+    def do_GET(self):  # noqa: N802
+        server = self.server
+        server.requests.append((self.path, self.headers.get("If-None-Match")))
+        status = server.statuses.pop(0) if server.statuses else 200
+        if status == 200 and self.headers.get("If-None-Match") == ETAG:
+            status = 304
+        body = json.dumps([{"id": 1, "path": self.path}]).encode("utf-8")
+        if status != 200:
+            body = b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server():
+    with stub_http_server(StubHandler) as server:
+        server.requests = []
+        server.statuses = []
+        yield server
+
+
+def test_conditional_requests(stub_server, tmp_path):
+    url = stub_server.url + "unit/"
+    fetcher = ResourceFetcher(cache_dir=str(tmp_path))
+    assert fetcher.get_json(url) == [{"id": 1, "path": "/unit/"}]
+    # The cached response is revalidated with its ETag.
+    assert fetcher.get_json(url) == [{"id": 1, "path": "/unit/"}]
+    assert stub_server.requests == [("/unit/", None), ("/unit/", ETAG)]
+
+
+def test_offline(stub_server, tmp_path):
+    url = stub_server.url + "unit/"
+    ResourceFetcher(cache_dir=str(tmp_path)).get_json(url)
+    fetcher = ResourceFetcher(cache_dir=str(tmp_path), offline=True)
+    assert fetcher.get_json(url) == [{"id": 1, "path": "/unit/"}]
+    with pytest.raises(FetchError):
+        fetcher.get_json(stub_server.url + "connection/")
+    assert len(stub_server.requests) == 1
+
+
+def test_failed_requests_are_retried(stub_server):
+    stub_server.statuses = [503, 500]
+    fetcher = ResourceFetcher(retries=2, backoff_factor=0)
+    assert fetcher.get_json(stub_server.url + "unit/") == [{"id": 1, "path": "/unit/"}]
+    assert len(stub_server.requests) == 3
+
+    stub_server.statuses = [503, 503, 503]
+    with pytest.raises(FetchError):
+        fetcher.get_json(stub_server.url + "unit/")
+
+
+def test_prefetch(stub_server):
+    fetcher = ResourceFetcher()
+    urls = [stub_server.url + name + "/" for name in ["unit", "connection"]]
+    fetcher.prefetch(urls)
+    assert len(stub_server.requests) == 2
+    assert fetcher.get_json(urls[1]) == [{"id": 1, "path": "/connection/"}]
+    assert len(stub_server.requests) == 2
+
+    fetcher.clear()
+    fetcher.get_json(urls[1])
+    assert len(stub_server.requests) == 3
+
+
+def test_fetch_concurrently(settings):
+    settings.SERVICES_IMPORT_FETCH_WORKERS = 3
+
+    def fetch(i):
+        time.sleep(0.2)
+        return i
+
+    start = time.monotonic()
+    results = fetch_concurrently(*[lambda i=i: fetch(i) for i in range(3)])
+    assert results == [0, 1, 2]
+    assert time.monotonic() - start < 0.5
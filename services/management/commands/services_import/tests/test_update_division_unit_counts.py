@@ -0,0 +1,102 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.utils.timezone import now
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    AdministrativeDivisionType,
+)
+
+from services.management.commands.services_import.services import (
+    update_division_unit_counts,
+)
+from services.models import (
+    Service,
+    ServiceDivisionUnitCount,
+    ServiceNode,
+    ServiceNodeDivisionUnitCount,
+    Unit,
+    UnitServiceDetails,
+)
+
+
+def make_square(x, y, size):
+    return MultiPolygon(
+        Polygon(
+            ((x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)),
+            srid=3067,
+        ),
+        srid=3067,
+    )
+
+
+@pytest.fixture
+def divisions():
+    district_type = AdministrativeDivisionType.objects.create(type="district")
+    divisions = []
+    for i in range(0, 2):
+        division = AdministrativeDivision.objects.create(
+            type=district_type, name="district{}".format(i)
+        )
+        AdministrativeDivisionGeometry.objects.create(
+            division=division, boundary=make_square(i * 1000, 0, 1000)
+        )
+        divisions.append(division)
+    return divisions
+
+
+@pytest.fixture
+def service_nodes():
+    parent = ServiceNode.objects.create(id=1, name="parent", last_modified_time=now())
+    child = ServiceNode.objects.create(
+        id=2, name="child", parent=parent, last_modified_time=now()
+    )
+    return parent, child
+
+
+@pytest.fixture
+def units(divisions, service_nodes):
+    service = Service.objects.create(id=1, name="service", last_modified_time=now())
+    parent, child = service_nodes
+    # Two units in the first district, one in the second and one outside both.
+    units = []
+    for i, x in enumerate([100, 200, 1100, 5000]):
+        unit = Unit.objects.create(
+            id=i,
+            name="unit{}".format(i),
+            location=Point(x, 500, srid=3067),
+            last_modified_time=now(),
+        )
+        UnitServiceDetails.objects.create(unit=unit, service=service)
+        unit.service_nodes.add(child if i % 2 else parent)
+        units.append(unit)
+    return units
+
+
+@pytest.mark.django_db
+def test_update_division_unit_counts(divisions, service_nodes, units):
+    update_division_unit_counts()
+    first, second = divisions
+    parent, child = service_nodes
+
+    service_counts = dict(
+        ServiceDivisionUnitCount.objects.values_list("division_id", "count")
+    )
+    assert service_counts == {first.id: 2, second.id: 1}
+
+    node_counts = dict(
+        ((o.service_node_id, o.division_id), o.count)
+        for o in ServiceNodeDivisionUnitCount.objects.all()
+    )
+    assert node_counts == {
+        (parent.id, first.id): 2,
+        (parent.id, second.id): 1,
+        (child.id, first.id): 1,
+    }
+
+    units[0].delete()
+    update_division_unit_counts()
+    service_counts = dict(
+        ServiceDivisionUnitCount.objects.values_list("division_id", "count")
+    )
+    assert service_counts == {first.id: 1, second.id: 1}
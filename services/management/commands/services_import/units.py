@@ -4,10 +4,10 @@ import json
 import logging
 import os
 from collections import defaultdict
+from functools import partial
 from operator import itemgetter
 
 import pytz
-from django import db
 from django.conf import settings
 from django.contrib.gis.gdal import CoordTransform, SpatialReference
 from django.contrib.gis.geos import Point, Polygon
@@ -23,7 +23,6 @@ from services.models import (
     ServiceNode,
     Unit,
     UnitAccessibilityProperty,
-    UnitAccessibilityShortcomings,
     UnitConnection,
     UnitIdentifier,
     UnitServiceDetails,
@@ -36,6 +35,8 @@ from services.models.unit import (
 )
 from services.utils import AccessibilityShortcomingCalculator
 
+from .bulk import get_source_hash, UnitBulkWriter
+from .fetcher import fetch_concurrently
 from .utils import clean_text, pk_get, postcodes, save_translated_field
 
 UTC_TIMEZONE = pytz.timezone("UTC")
@@ -203,26 +204,36 @@ def import_units(
         ((k, str(v)) for k, v in Department.objects.all().values_list("id", "uuid"))
     )
 
-    VERBOSITY and LOGGER.info("Fetching unit connections %s" % dept_syncher)
+    VERBOSITY and LOGGER.info(
+        "Fetching units, unit connections, accessibility properties and "
+        "ontologyword details"
+    )
+
+    if fetch_only_id:
+
+        def fetch_obj_list():
+            return [fetch_resource("unit", fetch_only_id, params={"official": "yes"})]
+
+    else:
+        fetch_obj_list = fetch_units
+    # acc_properties = self.fetch_resource('accessibility_property', v3=True)
+    connections, acc_properties, details, obj_list = fetch_concurrently(
+        partial(fetch_resource, "connection"),
+        partial(fetch_resource, "accessibility_property"),
+        partial(fetch_resource, "ontologyword_details"),
+        fetch_obj_list,
+    )
 
-    connections = fetch_resource("connection")
     conn_by_unit = defaultdict(list)
     for conn in connections:
         unit_id = conn["unit_id"]
         conn_by_unit[unit_id].append(conn)
 
-    VERBOSITY and LOGGER.info("Fetching accessibility properties")
-
-    # acc_properties = self.fetch_resource('accessibility_property', v3=True)
-    acc_properties = fetch_resource("accessibility_property")
     acc_by_unit = defaultdict(list)
     for ap in acc_properties:
         unit_id = ap["unit_id"]
         acc_by_unit[unit_id].append(ap)
 
-    VERBOSITY and LOGGER.info("Fetching ontologyword details")
-
-    details = fetch_resource("ontologyword_details")
     ontologyword_details_by_unit = defaultdict(list)
     for detail in details:
         unit_id = detail["unit_id"]
@@ -238,23 +249,22 @@ def import_units(
     gps_to_target_ct = CoordTransform(gps_srs, target_srs)
 
     if fetch_only_id:
-        obj_id = fetch_only_id
-        obj_list = [fetch_resource("unit", obj_id, params={"official": "yes"})]
-        queryset = Unit.objects.filter(id=obj_id)
+        queryset = Unit.objects.filter(id=fetch_only_id)
     else:
-        obj_list = fetch_units()
         queryset = Unit.objects.all().prefetch_related(
-            "services", "keywords", "service_details"
+            "services", "keywords", "service_details", "service_nodes"
         )
 
     syncher = ModelSyncher(queryset, lambda obj: obj.id)
+    writer = UnitBulkWriter(logger=LOGGER)
     for idx, info in enumerate(obj_list):
         uid = info["id"]
         info["connections"] = conn_by_unit.get(uid, [])
         info["accessibility_properties"] = acc_by_unit.get(uid, [])
         info["service_details"] = ontologyword_details_by_unit.get(uid, [])
-        _import_unit(
+        skipped = _import_unit(
             syncher,
+            writer,
             keyword_handler,
             info.copy(),
             dept_syncher,
@@ -264,7 +274,11 @@ def import_units(
             target_srid,
             department_id_to_uuid,
         )
+        writer.unit_handled(skipped=skipped)
 
+    writer.flush()
+    if VERBOSITY:
+        writer.log_throughput()
     syncher.finish()
     return dept_syncher, syncher
 
@@ -291,9 +305,9 @@ def _get_department_root_from_syncher(syncher, department, department_id_to_uuid
     return _get_department_root_from_syncher(syncher, parent, department_id_to_uuid)
 
 
-@db.transaction.atomic
 def _import_unit(
     syncher,
+    writer,
     keyword_handler,
     info,
     dept_syncher,
@@ -303,8 +317,16 @@ def _import_unit(
     target_srid,
     department_id_to_uuid,
 ):
-
+    """
+    Import the unit and return True if it was skipped, because its source
+    data had not changed.
+    """
     obj = syncher.get(info["id"])
+    source_hash = _get_unit_source_hash(info, dept_syncher, department_id_to_uuid)
+    if obj and obj.source_hash == source_hash:
+        syncher.mark(obj)
+        return True
+
     obj_changed = False
     obj_created = False
     if not obj:
@@ -535,6 +557,23 @@ def _import_unit(
         obj_changed = True
         obj.extensions["maintenance_group"] = "kaikki"
 
+    # The related rows are compared in memory and the changes are written
+    # in batches by the writer with the unit.
+    if _import_unit_service_nodes(writer, obj, info):
+        obj_changed = True
+    if _import_unit_services(writer, obj, info):
+        obj_changed = True
+    new_keywords = keyword_handler.get_changed_searchwords(obj, info)
+    if new_keywords is not None:
+        writer.set_m2m("keywords", obj.id, new_keywords)
+        obj_changed = True
+    if _import_unit_accessibility_variables(writer, obj, info):
+        obj_changed = True
+    if _import_unit_connections(writer, obj, info):
+        obj_changed = True
+    if _import_unit_sources(writer, obj, info):
+        obj_changed = True
+
     if obj_changed:
         if obj_created:
             verb = "created"
@@ -543,41 +582,35 @@ def _import_unit(
         if VERBOSITY:
             LOGGER.info("%s %s" % (obj, verb))
         obj.last_modified_time = datetime.datetime.now(UTC_TIMEZONE)
-        obj_changed = False
-        try:
-            obj.save()
-        except db.utils.DataError as e:
-            LOGGER.error("Importing failed for unit {}".format(str(obj)))
-            raise e
+        writer.save_unit(obj, created=obj_created)
+    writer.set_source_hash(obj, source_hash)
 
-    update_fields = ["last_modified_time"]
+    syncher.mark(obj)
+    return False
 
-    obj_changed, update_fields = _import_unit_service_nodes(
-        obj, info, obj_changed, update_fields
-    )
-    obj_changed, update_fields = _import_unit_services(
-        obj, info, obj_changed, update_fields
-    )
-    obj_changed = keyword_handler.sync_searchwords(obj, info, obj_changed)
 
-    obj_changed, update_fields = _import_unit_accessibility_variables(
-        obj, info, obj_changed, update_fields
+def _get_unit_source_hash(info, dept_syncher, department_id_to_uuid):
+    """
+    Return a hash of the source data of the unit, including the data of
+    other resources that the import of the unit depends on.
+    """
+    source = dict(info)
+    source["accessibility_properties"] = sorted(
+        info["accessibility_properties"], key=itemgetter("variable_id")
     )
-    obj_changed, update_fields = _import_unit_connections(
-        obj, info, obj_changed, update_fields
+    source["service_details"] = sorted(info["service_details"], key=_service_key)
+    root_department = _get_department_root_from_syncher(
+        dept_syncher, dept_syncher.get(info.get("dept_id")), department_id_to_uuid
     )
-    obj_changed, update_fields = _import_unit_sources(
-        obj, info, obj_changed, update_fields
+    service_node_ids = sorted(
+        set(info.get("ontologytree_ids", [])) & get_service_node_ids()
+    )
+    return get_source_hash(
+        source, root_department and root_department.id, service_node_ids
     )
-
-    if obj_changed:
-        obj.last_modified_time = datetime.datetime.now(UTC_TIMEZONE)
-        obj.save(update_fields=update_fields)
-
-    syncher.mark(obj)
 
 
-def _import_unit_service_nodes(obj, info, obj_changed, update_fields):
+def _import_unit_service_nodes(writer, obj, info):
     service_node_ids = sorted(
         [
             sid
@@ -586,19 +619,19 @@ def _import_unit_service_nodes(obj, info, obj_changed, update_fields):
         ]
     )
 
-    obj_service_node_ids = sorted(obj.service_nodes.values_list("id", flat=True))
+    obj_service_node_ids = sorted(node.id for node in obj.service_nodes.all())
 
-    if obj_service_node_ids != service_node_ids:
-        # if not obj_created and VERBOSITY:
-        #     LOGGER.warning("%s service set changed: %s -> %s" % (obj, obj_service_node_ids, service_node_ids))
-        obj.service_nodes.set(service_node_ids)
-
-        # Update root service cache
-        obj.root_service_nodes = ",".join(str(x) for x in obj.get_root_service_nodes())
-        update_fields.append("root_service_nodes")
-        obj_changed = True
+    if obj_service_node_ids == service_node_ids:
+        return False
+    # if not obj_created and VERBOSITY:
+    #     LOGGER.warning("%s service set changed: %s -> %s" % (obj, obj_service_node_ids, service_node_ids))
+    writer.set_m2m("service_nodes", obj.id, service_node_ids)
 
-    return obj_changed, update_fields
+    # Update root service cache
+    obj.root_service_nodes = ",".join(
+        str(x) for x in writer.get_root_service_nodes(service_node_ids)
+    )
+    return True
 
 
 def _clean_service_details(info_dict):
@@ -621,7 +654,7 @@ def _service_key(info):
     return itemgetter(*keys)(info)
 
 
-def _import_unit_services(obj, info, obj_changed, update_fields):
+def _import_unit_services(writer, obj, info):
     if info["service_details"]:
         owd = sorted(info["service_details"], key=_service_key)
         owd_json = json.dumps(owd, ensure_ascii=False, sort_keys=True).encode("utf8")
@@ -629,78 +662,73 @@ def _import_unit_services(obj, info, obj_changed, update_fields):
     else:
         owd_hash = None
 
-    if obj.service_details_hash != owd_hash:
-        if VERBOSITY:
-            LOGGER.info(
-                "%s service details set changed (%s vs. %s)"
-                % (obj, obj.service_details_hash, owd_hash)
-            )
-        obj.service_details.all().delete()
-        for owd in info["service_details"]:
-            d = _clean_service_details(owd)
-            unit_owd = UnitServiceDetails(unit=obj, service_id=d["ontologyword_id"])
-            if "period_begin_year" in d:
-                unit_owd.period_begin_year = d["period_begin_year"]
-                unit_owd.period_end_year = d["period_end_year"]
-
-            save_translated_field(
-                unit_owd, "clarification", d, "clarification", max_length=200
-            )
-            unit_owd.save()
-
-        obj.service_details_hash = owd_hash
-        obj_changed = True
-        update_fields.append("service_details_hash")
+    if obj.service_details_hash == owd_hash:
+        return False
+    if VERBOSITY:
+        LOGGER.info(
+            "%s service details set changed (%s vs. %s)"
+            % (obj, obj.service_details_hash, owd_hash)
+        )
+    details = []
+    for owd in info["service_details"]:
+        d = _clean_service_details(owd)
+        unit_owd = UnitServiceDetails(unit_id=obj.id, service_id=d["ontologyword_id"])
+        if "period_begin_year" in d:
+            unit_owd.period_begin_year = d["period_begin_year"]
+            unit_owd.period_end_year = d["period_end_year"]
+
+        save_translated_field(
+            unit_owd, "clarification", d, "clarification", max_length=200
+        )
+        details.append(unit_owd)
+    writer.replace_related(UnitServiceDetails, obj.id, details)
 
-    return obj_changed, update_fields
+    obj.service_details_hash = owd_hash
+    return True
 
 
-def _import_unit_accessibility_variables(obj, info, obj_changed, update_fields):
+def _import_unit_accessibility_variables(writer, obj, info):
     if info["accessibility_properties"]:
         acp = sorted(info["accessibility_properties"], key=itemgetter("variable_id"))
         acp_json = json.dumps(acp, ensure_ascii=False, sort_keys=True).encode("utf8")
         acp_hash = hashlib.sha1(acp_json).hexdigest()
     else:
         acp_hash = None
-    if obj.accessibility_property_hash != acp_hash:
-        if VERBOSITY:
-            LOGGER.info(
-                "%s accessibility property set changed (%s vs. %s)"
-                % (obj, obj.accessibility_property_hash, acp_hash)
-            )
-        obj.accessibility_properties.all().delete()
-        for acp in info["accessibility_properties"]:
-            uap = UnitAccessibilityProperty(unit=obj)
-            var_id = acp["variable_id"]
-            if var_id not in get_accessibility_variables():
-                var = AccessibilityVariable(id=var_id, name=acp["variable_name"])
-                var.save()
-            else:
-                var = get_accessibility_variables()[var_id]
-            uap.variable = var
-            uap.value = acp["value"]
-            uap.save()
-
-        obj.accessibility_property_hash = acp_hash
-        obj_changed = True
-        update_fields.append("accessibility_property_hash")
-
-        # Recalculate accessibility shortcomings
-        description, shortcoming_count = AccessibilityShortcomingCalculator().calculate(
-            obj
+    if obj.accessibility_property_hash == acp_hash:
+        return False
+    if VERBOSITY:
+        LOGGER.info(
+            "%s accessibility property set changed (%s vs. %s)"
+            % (obj, obj.accessibility_property_hash, acp_hash)
         )
-        UnitAccessibilityShortcomings.objects.update_or_create(
-            unit=obj,
-            defaults={
-                "accessibility_shortcoming_count": shortcoming_count,
-                "accessibility_description": description,
-            },
+    properties = []
+    for acp in info["accessibility_properties"]:
+        var_id = acp["variable_id"]
+        if var_id not in get_accessibility_variables():
+            var = AccessibilityVariable(id=var_id, name=acp["variable_name"])
+            var.save()
+            get_accessibility_variables()[var_id] = var
+        properties.append(
+            UnitAccessibilityProperty(
+                unit_id=obj.id, variable_id=var_id, value=acp["value"]
+            )
         )
+    writer.replace_related(UnitAccessibilityProperty, obj.id, properties)
 
-    return obj_changed, update_fields
+    obj.accessibility_property_hash = acp_hash
+
+    # Recalculate accessibility shortcomings from the new properties.
+    calculator = AccessibilityShortcomingCalculator()
+    writer.set_shortcomings(
+        obj.id,
+        calculator.get_shortcomings_fields(
+            {uap.variable_id: uap.value for uap in properties}
+        ),
+    )
+    return True
 
 
-def _import_unit_connections(obj, info, obj_changed, update_fields):
+def _import_unit_connections(writer, obj, info):
     if info["connections"]:
         conn_json = json.dumps(
             info["connections"], ensure_ascii=False, sort_keys=True
@@ -709,48 +737,46 @@ def _import_unit_connections(obj, info, obj_changed, update_fields):
     else:
         conn_hash = None
 
-    if obj.connection_hash != conn_hash:
-        if VERBOSITY:
-            LOGGER.info(
-                "%s connection set changed (%s vs. %s)"
-                % (obj, obj.connection_hash, conn_hash)
-            )
-        obj.connections.all().delete()
-
-        for i, conn in enumerate(info["connections"]):
-            c = UnitConnection(unit=obj)
-            save_translated_field(c, "name", conn, "name", max_length=600)
-            save_translated_field(c, "www", conn, "www")
-            section_type = [
-                val
-                for val, str_val in UnitConnection.SECTION_TYPES
-                if str_val == conn["section_type"]
-            ][0]
-            assert section_type
-            c.section_type = section_type
-
-            c.order = i
-            fields = ["email", "phone", "contact_person"]
-            for field in fields:
-                val = conn.get(field, None)
-                if val and len(val) > UnitConnection._meta.get_field(field).max_length:
-                    LOGGER.info(
-                        "Ignoring too long value of field {} in unit {} connections".format(
-                            field, obj.pk
-                        )
+    if obj.connection_hash == conn_hash:
+        return False
+    if VERBOSITY:
+        LOGGER.info(
+            "%s connection set changed (%s vs. %s)"
+            % (obj, obj.connection_hash, conn_hash)
+        )
+    connections = []
+    for i, conn in enumerate(info["connections"]):
+        c = UnitConnection(unit_id=obj.id)
+        save_translated_field(c, "name", conn, "name", max_length=600)
+        save_translated_field(c, "www", conn, "www")
+        section_type = [
+            val
+            for val, str_val in UnitConnection.SECTION_TYPES
+            if str_val == conn["section_type"]
+        ][0]
+        assert section_type
+        c.section_type = section_type
+
+        c.order = i
+        fields = ["email", "phone", "contact_person"]
+        for field in fields:
+            val = conn.get(field, None)
+            if val and len(val) > UnitConnection._meta.get_field(field).max_length:
+                LOGGER.info(
+                    "Ignoring too long value of field {} in unit {} connections".format(
+                        field, obj.pk
                     )
-                    continue
-                if getattr(c, field) != val:
-                    setattr(c, field, val)
-                    c._changed = True
-            c.save()
-        obj.connection_hash = conn_hash
-        obj_changed = True
-        update_fields.append("connection_hash")
-    return obj_changed, update_fields
+                )
+                continue
+            if getattr(c, field) != val:
+                setattr(c, field, val)
+        connections.append(c)
+    writer.replace_related(UnitConnection, obj.id, connections)
+    obj.connection_hash = conn_hash
+    return True
 
 
-def _import_unit_sources(obj, info, obj_changed, update_fields):
+def _import_unit_sources(writer, obj, info):
     if "sources" in info:
         id_json = json.dumps(
             info["sources"], ensure_ascii=False, sort_keys=True
@@ -758,25 +784,25 @@ def _import_unit_sources(obj, info, obj_changed, update_fields):
         id_hash = hashlib.sha1(id_json).hexdigest()
     else:
         id_hash = None
-    if obj.identifier_hash != id_hash:
-        if VERBOSITY:
-            LOGGER.info(
-                "%s identifier set changed (%s vs. %s)"
-                % (obj, obj.identifier_hash, id_hash)
+    if obj.identifier_hash == id_hash:
+        return False
+    if VERBOSITY:
+        LOGGER.info(
+            "%s identifier set changed (%s vs. %s)"
+            % (obj, obj.identifier_hash, id_hash)
+        )
+    identifiers = []
+    if id_hash is not None:
+        for uid in info["sources"]:
+            identifiers.append(
+                UnitIdentifier(
+                    unit_id=obj.id, namespace=uid.get("source"), value=uid.get("id")
+                )
             )
-        obj.identifiers.all().delete()
-        if id_hash is not None:
-            for uid in info["sources"]:
-                ui = UnitIdentifier(unit=obj)
-                ui.namespace = uid.get("source")
-                ui.value = uid.get("id")
-                ui.save()
-
-        obj.identifier_hash = id_hash
-        obj_changed = True
-        update_fields.append("identifier_hash")
+    writer.replace_related(UnitIdentifier, obj.id, identifiers)
 
-    return obj_changed, update_fields
+    obj.identifier_hash = id_hash
+    return True
 
 
 def _parse_accessibility_viewpoints(acc_viewpoints_str, drop_unknowns=False):
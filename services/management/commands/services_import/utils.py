@@ -1,23 +1,55 @@
 import os
 import re
 
-import requests
 from django.conf import settings
 from django.utils.http import urlencode
 
+from .fetcher import ResourceFetcher
+
 URL_BASE = "http://www.hel.fi/palvelukarttaws/rest/v4/"
+FETCHER = None
 
 
-def pk_get(resource_name, res_id=None, params=None):
+def get_fetcher():
+    global FETCHER
+    if FETCHER is None:
+        FETCHER = ResourceFetcher()
+    return FETCHER
+
+
+def configure_fetcher(cache_dir=None, offline=False):
+    """
+    Cache the fetched resources in the cache directory, or only read them
+    from the cache in the offline mode.
+    """
+    global FETCHER
+    FETCHER = ResourceFetcher(cache_dir=cache_dir, offline=offline)
+    return FETCHER
+
+
+def get_url(resource_name, res_id=None, params=None):
     url = "%s%s/" % (URL_BASE, resource_name)
     if res_id is not None:
         url = "%s%s/" % (url, res_id)
     if params:
         url += "?" + urlencode(params)
+    return url
+
+
+def pk_get(resource_name, res_id=None, params=None):
+    url = get_url(resource_name, res_id=res_id, params=params)
     print("CALLING URL >>> ", url)
-    resp = requests.get(url, timeout=300)
-    assert resp.status_code == 200, "fuu status code {}".format(resp.status_code)
-    return resp.json()
+    return get_fetcher().get_json(url)
+
+
+def prefetch_resources(resources):
+    """
+    Fetch the resources, given as tuples of the resource name and the query
+    parameters, concurrently for the later pk_get calls.
+    """
+    get_fetcher().prefetch(
+        [get_url(resource_name, params=params) for resource_name, params in resources]
+    )
 
 
 def save_translated_field(obj, obj_field_name, info, info_field_name, max_length=None):
@@ -10,23 +10,47 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils.translation import activate, get_language
 
+from services.import_runs import import_phase, records_import_run
 from services.management.commands.services_import.aliases import import_aliases
 from services.management.commands.services_import.departments import import_departments
 from services.management.commands.services_import.entrances import import_entrances
 from services.management.commands.services_import.services import (
+    get_unit_count_state,
     import_services,
     remove_empty_service_nodes,
+    update_division_unit_counts,
     update_service_counts,
     update_service_node_counts,
     update_service_root_service_nodes,
 )
 from services.management.commands.services_import.units import import_units
+from services.management.commands.services_import.utils import (
+    configure_fetcher,
+    get_fetcher,
+    prefetch_resources,
+)
+from services.response_cache import invalidates_cache
 
 URL_BASE = "http://www.hel.fi/palvelukarttaws/rest/v4/"
 GK25_SRID = 3879
 
 UTC_TIMEZONE = pytz.timezone("UTC")
 
+# The resources fetched by the importers, as tuples of the resource name and
+# the query parameters.
+IMPORT_RESOURCES = {
+    "departments": [("department", None)],
+    "services": [("ontologytree", None), ("ontologyword", None)],
+    "units": [
+        ("department", None),
+        ("connection", None),
+        ("accessibility_property", None),
+        ("ontologyword_details", None),
+        ("unit", {"official": "yes"}),
+    ],
+    "entrances": [("entrance", None)],
+}
+
 
 class Command(BaseCommand):
     help = "Import services from Palvelukartta REST API"
@@ -52,6 +76,13 @@ class Command(BaseCommand):
             default=False,
             help="cache HTTP requests",
         )
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            dest="offline",
+            default=False,
+            help="use only the responses cached with --cached",
+        )
         parser.add_argument(
             "--single",
             action="store",
@@ -137,24 +168,44 @@ class Command(BaseCommand):
             import_units(fetch_only_id=pk)
             return
         import_units()
-        update_service_node_counts()
+        update_service_node_counts(self.unit_count_state)
         remove_empty_service_nodes(self.logger)
         update_service_counts()
+        update_division_unit_counts()
 
     @db.transaction.atomic
     def import_services(self):
         import_services(logger=self.logger, noop=False, importer=self)
         update_service_root_service_nodes()
 
+    @invalidates_cache("search", "departments", "service_node_tree")
+    @records_import_run()
     def handle(self, **options):
         self.options = options
         self.verbosity = int(options.get("verbosity", 1))
         self.dept_syncher = None
         self.logger = logging.getLogger(__name__)
         self.services_changed = False
-
-        # if options['cached']:
-        #     requests_cache.install_cache('services_import')
+        # The state before the import, for updating the unit counts of only
+        # the service nodes of the changed units.
+        self.unit_count_state = None
+        if "units" in options["import_types"]:
+            self.unit_count_state = get_unit_count_state()
+
+        if options["cached"] or options["offline"]:
+            configure_fetcher(
+                cache_dir=settings.SERVICES_IMPORT_CACHE_DIR,
+                offline=options["offline"],
+            )
+        if not options.get("id"):
+            # The resources of all the importers are fetched concurrently.
+            resources = []
+            for imp in self.options["import_types"]:
+                for resource in IMPORT_RESOURCES.get(imp, []):
+                    if resource not in resources:
+                        resources.append(resource)
+            with import_phase("fetch"):
+                prefetch_resources(resources)
 
         # Activate the default language for the duration of the import
         # to make sure translated fields are populated correctly.
@@ -168,15 +219,17 @@ class Command(BaseCommand):
             method = getattr(self, "import_%s" % imp)
             if self.verbosity:
                 print("Importing %s..." % imp)
-            if "id" in options and options.get("id"):
-                method(pk=options["id"])
-            else:
-                method()
+            with import_phase(imp):
+                if "id" in options and options.get("id"):
+                    method(pk=options["id"])
+                else:
+                    method()
             import_count += 1
 
         # if self.services_changed:
         #     self.update_root_services()
 
+        get_fetcher().clear()
         if not import_count:
             sys.stderr.write("Nothing to import.\n")
         activate(old_lang)
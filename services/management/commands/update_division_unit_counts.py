@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from services.management.commands.services_import.services import (
+    update_division_unit_counts,
+)
+from services.models import ServiceDivisionUnitCount, ServiceNodeDivisionUnitCount
+
+
+class Command(BaseCommand):
+    help = "Update the unit counts of services and service nodes per administrative division"
+
+    def handle(self, **options):
+        update_division_unit_counts()
+        self.stdout.write(
+            "Stored {} service and {} service node division unit counts.".format(
+                ServiceDivisionUnitCount.objects.count(),
+                ServiceNodeDivisionUnitCount.objects.count(),
+            )
+        )
@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from services.management.commands.services_import.services import (
+    count_service_node_units,
+    get_service_node_division_counts,
+    recount_service_node_units,
+)
+from services.models import ServiceNodeUnitCount
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the stored unit counts of the service nodes, which the "
+        "importers update incrementally, against a full recount"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Replace the stored counts with the full recount if they differ.",
+        )
+
+    def handle(self, **options):
+        expected = get_service_node_division_counts(count_service_node_units())
+
+        stored = {}
+        for c in ServiceNodeUnitCount.objects.all():
+            key = (c.service_node_id, c.division_id)
+            if key in stored:
+                # Duplicate count objects are counted as a difference.
+                stored[key] = None
+            else:
+                stored[key] = c.count
+
+        differences = []
+        for key in sorted(expected.keys() | stored.keys(), key=str):
+            if expected.get(key, 0) != stored.get(key, 0):
+                differences.append((key, stored.get(key, 0), expected.get(key, 0)))
+        for (service_node_id, division_id), stored_count, count in differences:
+            self.stdout.write(
+                "Service node {}, division {}: stored {}, recounted {}".format(
+                    service_node_id, division_id, stored_count, count
+                )
+            )
+        if not differences:
+            self.stdout.write("The service node unit counts are up to date.")
+            return
+        if not options["fix"]:
+            raise CommandError(
+                "{} service node unit counts differ.".format(len(differences))
+            )
+        recount_service_node_units()
+        self.stdout.write("Fixed {} service node unit counts.".format(len(differences)))
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from services.response_cache import warm_cache
+
+
+class Command(BaseCommand):
+    help = "Warm the response cache of a domain by replaying the most requested URLs"
+
+    def add_arguments(self, parser):
+        parser.add_argument("domain", help="E.g. search or mobility_data")
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=settings.RESPONSE_CACHE_WARMING_URLS,
+            help="Number of the most requested URLs to replay.",
+        )
+        parser.add_argument(
+            "--generation",
+            type=int,
+            default=None,
+            help="Warm only if the cache generation of the domain is still this.",
+        )
+
+    def handle(self, **options):
+        num_warmed = warm_cache(
+            options["domain"], options["limit"], generation=options["generation"]
+        )
+        self.stdout.write(
+            "Warmed {} responses of {}.".format(num_warmed, options["domain"])
+        )
@@ -0,0 +1,97 @@
+# Generated by Django 4.1.13 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("munigeo", "0004_building"),
+        ("services", "0101_exclusionword"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ServiceNodeDivisionUnitCount",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField()),
+                (
+                    "division",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="munigeo.administrativedivision",
+                    ),
+                ),
+                (
+                    "division_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="munigeo.administrativedivisiontype",
+                    ),
+                ),
+                (
+                    "service_node",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="division_unit_counts",
+                        to="services.servicenode",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("service_node", "division")},
+            },
+        ),
+        migrations.CreateModel(
+            name="ServiceDivisionUnitCount",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField()),
+                (
+                    "division",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="munigeo.administrativedivision",
+                    ),
+                ),
+                (
+                    "division_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="munigeo.administrativedivisiontype",
+                    ),
+                ),
+                (
+                    "service",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="division_unit_counts",
+                        to="services.service",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("service", "division")},
+            },
+        ),
+    ]
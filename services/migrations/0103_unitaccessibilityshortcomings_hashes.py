@@ -0,0 +1,23 @@
+# Generated by Django 4.1.13 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0102_division_unit_counts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="unitaccessibilityshortcomings",
+            name="accessibility_property_hash",
+            field=models.CharField(max_length=40, null=True),
+        ),
+        migrations.AddField(
+            model_name="unitaccessibilityshortcomings",
+            name="rules_hash",
+            field=models.CharField(max_length=64, null=True),
+        ),
+    ]
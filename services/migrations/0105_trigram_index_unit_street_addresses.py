@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0104_unitchange"),
+    ]
+    operations = [
+        # Indexes for the address filter of the units, which matches the
+        # lowercased street addresses by prefix or regular expression.
+        migrations.RunSQL(
+            sql="""
+            CREATE INDEX unit_street_address_fi_trgm_idx ON services_unit USING GIN (lower(street_address_fi) gin_trgm_ops);
+            CREATE INDEX unit_street_address_sv_trgm_idx ON services_unit USING GIN (lower(street_address_sv) gin_trgm_ops);
+            CREATE INDEX unit_street_address_en_trgm_idx ON services_unit USING GIN (lower(street_address_en) gin_trgm_ops);
+            """,
+            reverse_sql="""
+            DROP INDEX unit_street_address_fi_trgm_idx;
+            DROP INDEX unit_street_address_sv_trgm_idx;
+            DROP INDEX unit_street_address_en_trgm_idx;
+            """,
+        ),
+    ]
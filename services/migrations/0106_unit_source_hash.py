@@ -0,0 +1,22 @@
+# Generated by Django 4.1.13 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0105_trigram_index_unit_street_addresses"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="unit",
+            name="source_hash",
+            field=models.CharField(
+                help_text="Automatically generated hash of the imported source data",
+                max_length=40,
+                null=True,
+            ),
+        ),
+    ]
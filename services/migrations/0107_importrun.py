@@ -0,0 +1,67 @@
+# Generated by Django 4.1.13 on 2026-10-19 12:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("services", "0106_unit_source_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImportRun",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(db_index=True, max_length=100)),
+                ("arguments", models.JSONField(default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("running", "running"),
+                            ("succeeded", "succeeded"),
+                            ("failed", "failed"),
+                        ],
+                        default="running",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                ("finished_at", models.DateTimeField(null=True)),
+                (
+                    "duration",
+                    models.FloatField(help_text="Wall time in seconds", null=True),
+                ),
+                ("query_count", models.IntegerField(null=True)),
+                ("row_count", models.IntegerField(null=True)),
+                (
+                    "peak_memory",
+                    models.IntegerField(
+                        help_text="Peak resident memory of the process in kilobytes",
+                        null=True,
+                    ),
+                ),
+                ("phases", models.JSONField(default=list)),
+                ("error", models.TextField(blank=True)),
+            ],
+            options={
+                "ordering": ["-started_at"],
+            },
+        ),
+    ]
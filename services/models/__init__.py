@@ -1,5 +1,6 @@
 from .accessibility_variable import AccessibilityVariable
 from .department import Department
+from .import_run import ImportRun
 from .keyword import Keyword
 from .notification import Announcement, ErrorMessage
 from .search_rule import ExclusionRule, ExclusionWord
@@ -10,7 +11,13 @@ from .unit import Unit
 from .unit_accessibility_property import UnitAccessibilityProperty
 from .unit_accessibility_shortcomings import UnitAccessibilityShortcomings
 from .unit_alias import UnitAlias
+from .unit_change import UnitChange
 from .unit_connection import UnitConnection
-from .unit_count import ServiceNodeUnitCount, ServiceUnitCount
+from .unit_count import (
+    ServiceDivisionUnitCount,
+    ServiceNodeDivisionUnitCount,
+    ServiceNodeUnitCount,
+    ServiceUnitCount,
+)
 from .unit_entrance import UnitEntrance
 from .unit_identifier import UnitIdentifier
@@ -0,0 +1,44 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ImportRun(models.Model):
+    """
+    Run of an import command with the wall time, the database queries and
+    the handled rows of the run and each of its phases, for finding the slow
+    phases of the imports and their regressions.
+    """
+
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUSES = (
+        (RUNNING, "running"),
+        (SUCCEEDED, "succeeded"),
+        (FAILED, "failed"),
+    )
+
+    name = models.CharField(max_length=100, db_index=True)
+    arguments = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUSES, default=RUNNING)
+    started_at = models.DateTimeField(db_index=True, default=timezone.now)
+    finished_at = models.DateTimeField(null=True)
+    duration = models.FloatField(null=True, help_text="Wall time in seconds")
+    query_count = models.IntegerField(null=True)
+    row_count = models.IntegerField(null=True)
+    peak_memory = models.IntegerField(
+        null=True, help_text="Peak resident memory of the process in kilobytes"
+    )
+    # List of dicts with the name, duration, query_count and row_count of
+    # each phase in the order the phases were started.
+    phases = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return "%s at %s (%s)" % (self.name, self.started_at, self.status)
+
+    def get_phase(self, name):
+        return next((phase for phase in self.phases if phase["name"] == name), None)
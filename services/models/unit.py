@@ -208,6 +208,11 @@ class Unit(SoftDeleteModel):
         help_text="Automatically generated hash of other identifiers",
     )
     service_details_hash = models.CharField(max_length=40, null=True)
+    source_hash = models.CharField(
+        max_length=40,
+        null=True,
+        help_text="Automatically generated hash of the imported source data",
+    )
 
     accessibility_viewpoints = JSONField(default=dict, null=True)
 
@@ -12,3 +12,7 @@ class UnitAccessibilityShortcomings(models.Model):
     )
     accessibility_shortcoming_count = models.JSONField(default=dict, null=True)
     accessibility_description = models.JSONField(default=list, null=True)
+    # Hashes of the inputs of the calculation, used to recalculate only the
+    # shortcomings of the units whose properties or rules have changed.
+    accessibility_property_hash = models.CharField(max_length=40, null=True)
+    rules_hash = models.CharField(max_length=64, null=True)
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class UnitChange(models.Model):
+    """
+    Log of created, updated and deleted units, which lets the API clients
+    fetch only the units changed since their previous sync. Units that are
+    not public or active are logged as deleted, as the API does not show
+    them. The log is kept for settings.UNIT_CHANGE_RETENTION_DAYS.
+    """
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    CHANGE_TYPES = (
+        (CREATED, "created"),
+        (UPDATED, "updated"),
+        (DELETED, "deleted"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    # Not a foreign key, the changes of deleted units are kept.
+    unit_id = models.IntegerField(db_index=True)
+    change_type = models.CharField(max_length=10, choices=CHANGE_TYPES)
+    time = models.DateTimeField(db_index=True, default=timezone.now)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return "Unit %s %s at %s" % (self.unit_id, self.change_type, self.time)
+
+    @classmethod
+    def get_change_type(cls, unit, created=False):
+        if not (unit.public and unit.is_active):
+            return cls.DELETED
+        return cls.CREATED if created else cls.UPDATED
+
+    @classmethod
+    def get_retention_start(cls):
+        """
+        Return the time of the oldest changes that are kept.
+        """
+        return timezone.now() - timedelta(days=settings.UNIT_CHANGE_RETENTION_DAYS)
+
+    @classmethod
+    def prune(cls):
+        """
+        Delete the changes older than the retention period and return the
+        number of the deleted changes.
+        """
+        count, _ = cls.objects.filter(time__lt=cls.get_retention_start()).delete()
+        return count
+
+    @classmethod
+    def record(cls, unit_ids, change_type):
+        """
+        Log the same change of many units, e.g. after bulk operations that
+        do not send the model signals.
+        """
+        now = timezone.now()
+        cls.objects.bulk_create(
+            [
+                cls(unit_id=unit_id, change_type=change_type, time=now)
+                for unit_id in unit_ids
+            ],
+            batch_size=1000,
+        )
@@ -41,3 +41,39 @@ class ServiceUnitCount(BaseUnitCount):
 
     class Meta:
         unique_together = (("service", "division"),)
+
+
+class ServiceNodeDivisionUnitCount(BaseUnitCount):
+    """
+    Unit counts of service nodes in administrative divisions of any type,
+    computed from the unit locations and the division boundaries.
+    """
+
+    service_node = models.ForeignKey(
+        ServiceNode,
+        null=False,
+        db_index=True,
+        related_name="division_unit_counts",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        unique_together = (("service_node", "division"),)
+
+
+class ServiceDivisionUnitCount(BaseUnitCount):
+    """
+    Unit counts of services in administrative divisions of any type,
+    computed from the unit locations and the division boundaries.
+    """
+
+    service = models.ForeignKey(
+        Service,
+        null=False,
+        db_index=True,
+        related_name="division_unit_counts",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        unique_together = (("service", "division"),)
@@ -0,0 +1,93 @@
+import threading
+import time
+
+from django.conf import settings
+from munigeo.models import Municipality
+
+from services.response_cache import get_cache_generation
+
+# Cache domain whose generation is bumped when the municipalities change.
+MUNICIPALITIES_DOMAIN = "municipalities"
+
+
+class CachedMunicipality(object):
+    def __init__(self, id, ocd_id, names):
+        self.id = id
+        self.ocd_id = ocd_id
+        self.names = names
+
+    def get_name(self, lang):
+        return self.names.get(lang)
+
+
+class MunicipalityCache(object):
+    """
+    Caches the municipalities by their id and the OCD id of their division,
+    so the municipality filters can be parsed without queries. The table is
+    tiny and nearly static, so it is loaded with a single query and reloaded
+    when the generation of the municipalities changes. The generation is
+    checked at most once per `settings.MUNICIPALITY_CACHE_CHECK_INTERVAL`
+    seconds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_id = None
+        self.by_ocd_id = None
+        self.generation = None
+        self.checked_at = None
+
+    def clear(self):
+        with self.lock:
+            self.by_id = None
+            self.by_ocd_id = None
+            self.generation = None
+            self.checked_at = None
+
+    def _is_stale(self):
+        if self.by_id is None:
+            return True
+        now = time.monotonic()
+        if now - self.checked_at < settings.MUNICIPALITY_CACHE_CHECK_INTERVAL:
+            return False
+        self.checked_at = now
+        return get_cache_generation(MUNICIPALITIES_DOMAIN) != self.generation
+
+    def _load(self):
+        self.generation = get_cache_generation(MUNICIPALITIES_DOMAIN)
+        self.checked_at = time.monotonic()
+        languages = [x[0] for x in settings.LANGUAGES]
+        name_fields = ["name_%s" % lang for lang in languages]
+        qs = Municipality.objects.values_list("id", "division__ocd_id", *name_fields)
+        by_id = {}
+        by_ocd_id = {}
+        for id, ocd_id, *names in qs:
+            cached = CachedMunicipality(id, ocd_id, dict(zip(languages, names)))
+            by_id[id] = cached
+            if ocd_id:
+                by_ocd_id[ocd_id] = cached
+        self.by_id = by_id
+        self.by_ocd_id = by_ocd_id
+
+    def _get_maps(self):
+        with self.lock:
+            if self._is_stale():
+                self._load()
+            return self.by_id, self.by_ocd_id
+
+    def get(self, id):
+        """
+        Return the CachedMunicipality with the given id or None if there is
+        no such municipality.
+        """
+        if id is None:
+            return None
+        by_id, _ = self._get_maps()
+        return by_id.get(id)
+
+    def get_by_ocd_id(self, ocd_id):
+        _, by_ocd_id = self._get_maps()
+        return by_ocd_id.get(ocd_id)
+
+
+MUNICIPALITIES = MunicipalityCache()
@@ -0,0 +1,214 @@
+"""
+Import-aware caching of API responses.
+
+Cached responses are grouped by domain, e.g. "search" or "mobility_data".
+Every domain has a generation counter in the cache and the generation is
+part of the cache keys of the responses of the domain. The importers bump
+the generation of the domains they change, which makes the previously
+cached responses unreachable at once.
+
+The most requested URLs of every domain are recorded so that the caches of
+a new generation can be warmed by replaying them before users arrive.
+"""
+
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.redis import RedisCache
+from django.test import Client
+from django.utils import timezone
+from django.views.decorators.cache import cache_page
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = "response_cache:generation:%s"
+TRAFFIC_KEY = "response_cache:traffic:%s:%s"
+# Traffic is recorded per day, the keys of yesterday and today are used.
+TRAFFIC_KEY_TIMEOUT = 60 * 60 * 48
+# The recorded traffic may grow to this many times the traffic size before
+# it is trimmed, so that new URLs have room to become the most requested.
+TRAFFIC_TRIM_FACTOR = 10
+# Request header sent by the cache warming, such requests are not recorded.
+WARMING_HEADER = "HTTP_X_CACHE_WARMING"
+# Request headers the cached responses may vary on, these are recorded
+# and replayed so that the warmed cache keys match the ones of the users.
+RECORDED_HEADERS = (
+    "HTTP_ACCEPT",
+    "HTTP_ACCEPT_ENCODING",
+    "HTTP_ACCEPT_LANGUAGE",
+    "HTTP_ORIGIN",
+)
+
+
+def get_cache_generation(domain):
+    return cache.get(GENERATION_KEY % domain, 0)
+
+
+def bump_cache_generation(domain):
+    """
+    Bump the generation of the domain and return the new generation.
+    """
+    key = GENERATION_KEY % domain
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The key can not be set with e.g. the dummy cache.
+        return 0
+
+
+def get_redis_client():
+    """
+    Return the client of the Redis cache or None if the cache is not a
+    Redis cache. The sorted sets used for recording the traffic are not
+    available through the cache API.
+    """
+    default_cache = caches[DEFAULT_CACHE_ALIAS]
+    if not isinstance(default_cache, RedisCache):
+        return None
+    return default_cache._cache.get_client(write=True)
+
+
+def get_traffic_key(domain, days_ago=0):
+    date = timezone.localdate() - timedelta(days=days_ago)
+    return TRAFFIC_KEY % (domain, date.isoformat())
+
+
+def record_request(domain, request):
+    """
+    Count a request of the domain in the traffic of today.
+    """
+    if request.method != "GET" or WARMING_HEADER in request.META:
+        return
+    client = get_redis_client()
+    if client is None:
+        return
+    member = json.dumps(
+        {
+            "path": request.get_full_path(),
+            "host": request.get_host(),
+            "secure": request.is_secure(),
+            "headers": {
+                header: request.META[header]
+                for header in RECORDED_HEADERS
+                if header in request.META
+            },
+        },
+        sort_keys=True,
+    )
+    key = get_traffic_key(domain)
+    pipeline = client.pipeline()
+    pipeline.zincrby(key, 1, member)
+    pipeline.expire(key, TRAFFIC_KEY_TIMEOUT)
+    pipeline.zcard(key)
+    num_entries = pipeline.execute()[-1]
+    size = settings.RESPONSE_CACHE_TRAFFIC_SIZE
+    if num_entries > size * TRAFFIC_TRIM_FACTOR:
+        # Keep only the most requested entries.
+        client.zremrangebyrank(key, 0, -size - 1)
+
+
+def get_most_requested(domain, limit):
+    """
+    Return the `limit` most requested requests of the domain during
+    yesterday and today, most requested first.
+    """
+    client = get_redis_client()
+    if client is None or limit <= 0:
+        return []
+    counts = {}
+    for days_ago in (0, 1):
+        key = get_traffic_key(domain, days_ago)
+        for member, score in client.zrevrange(key, 0, limit - 1, withscores=True):
+            counts[member] = counts.get(member, 0) + score
+    members = sorted(counts, key=lambda x: counts[x], reverse=True)[:limit]
+    return [json.loads(member) for member in members]
+
+
+def generation_cache_page(timeout, domain):
+    """
+    Like django.views.decorators.cache.cache_page, but the cache keys
+    contain the current generation of the domain. The requests are
+    recorded for the cache warming.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            key_prefix = "%s.%s" % (domain, get_cache_generation(domain))
+            response = cache_page(timeout, key_prefix=key_prefix)(view_func)(
+                request, *args, **kwargs
+            )
+            if response.status_code == 200:
+                record_request(domain, request)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def schedule_cache_warming(domain, generation):
+    if not settings.CELERY_BROKER_URL or not settings.RESPONSE_CACHE_WARMING_URLS:
+        return
+    from services.tasks import warm_response_cache
+
+    try:
+        warm_response_cache.apply_async(
+            args=(domain, generation),
+            countdown=settings.RESPONSE_CACHE_WARMING_DELAY,
+            retry=False,
+        )
+    except Exception:
+        logger.exception(f"Could not schedule the cache warming of {domain}")
+
+
+def invalidates_cache(*domains):
+    """
+    Decorator for the handle method of management commands that change the
+    data of the given domains. The generations of the domains are bumped
+    when the command finishes, also when it fails as the data may have been
+    partially changed, and the warming of the caches is scheduled.
+    """
+
+    def decorator(handle):
+        @wraps(handle)
+        def wrapper(*args, **kwargs):
+            try:
+                return handle(*args, **kwargs)
+            finally:
+                for domain in domains:
+                    generation = bump_cache_generation(domain)
+                    schedule_cache_warming(domain, generation)
+
+        return wrapper
+
+    return decorator
+
+
+def warm_cache(domain, limit, generation=None):
+    """
+    Replay the `limit` most requested requests of the domain. Nothing is
+    done if the domain has been bumped to a newer generation than the
+    given one in the meantime. Return the number of the replayed requests.
+    """
+    if generation is not None and get_cache_generation(domain) != generation:
+        logger.info(f"Generation of {domain} has changed, skipping cache warming.")
+        return 0
+    num_warmed = 0
+    for entry in get_most_requested(domain, limit):
+        client = Client(HTTP_HOST=entry["host"], **entry["headers"])
+        try:
+            response = client.get(
+                entry["path"], secure=entry["secure"], **{WARMING_HEADER: "1"}
+            )
+        except Exception:
+            logger.exception(f"Cache warming request {entry['path']} failed")
+            continue
+        if response.status_code == 200:
+            num_warmed += 1
+    return num_warmed
@@ -25,7 +25,6 @@ from itertools import chain
 from django.db import connection, reset_queries
 from django.db.models import Count
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 from munigeo import api as munigeo_api
 from munigeo.models import Address, AdministrativeDivision
@@ -39,6 +38,7 @@ from services.api import (
     UnitConnectionSerializer,
     UnitSerializer,
 )
+from services.departments import DEPARTMENTS
 from services.models import (
     Department,
     Service,
@@ -46,7 +46,8 @@ from services.models import (
     Unit,
     UnitAccessibilityShortcomings,
 )
-from services.utils import strtobool
+from services.response_cache import generation_cache_page
+from services.utils import run_concurrently, strtobool
 
 from .constants import (
     DEFAULT_MODEL_LIMIT_VALUE,
@@ -140,7 +141,13 @@ class SearchSerializer(serializers.Serializer):
             representation["contract_type"] = UnitSerializer.get_contract_type(
                 self, obj
             )
-            representation["department"] = DepartmentSerializer(obj.department).data
+            cached_department = DEPARTMENTS.get(obj.department_id)
+            if cached_department is not None:
+                representation["department"] = cached_department.serialize(
+                    DepartmentSerializer
+                )
+            else:
+                representation["department"] = DepartmentSerializer(obj.department).data
             if self.context["geometry"]:
                 if obj.geometry:
                     representation["geometry"] = munigeo_api.geom_to_json(
@@ -322,10 +329,9 @@ class SearchSerializer(serializers.Serializer):
 class SearchViewSet(GenericAPIView):
     queryset = Unit.objects.all()
 
-    @method_decorator(cache_page(60 * 60))
+    @method_decorator(generation_cache_page(60 * 60, "search"))
     def get(self, request):
         model_limits = {}
-        show_only_address = False
         units_order_list = []
         for model in list(QUERY_PARAM_TYPE_NAMES):
             model_limits[model] = DEFAULT_MODEL_LIMIT_VALUE
@@ -490,7 +496,14 @@ class SearchViewSet(GenericAPIView):
         administrative_division_ids = all_ids["AdministrativeDivision"]
         address_ids = all_ids["Address"]
 
-        if "service" in types:
+        if "municipality" in params:
+            municipalities = params["municipality"].lower().strip().split(",")
+        else:
+            municipalities = []
+
+        def get_services():
+            if "service" not in types:
+                return []
             preserved = get_preserved_order(service_ids)
             services_qs = Service.objects.filter(id__in=service_ids).order_by(preserved)
             if not services_qs and "service" in use_trigram:
@@ -513,11 +526,16 @@ class SearchViewSet(GenericAPIView):
             ids = list(dict.fromkeys(ids))
             preserved = get_preserved_order(ids)
             services_qs = Service.objects.filter(id__in=ids).order_by(preserved)
-            services_qs = services_qs[: model_limits["service"]]
-        else:
-            services_qs = Service.objects.none()
-
-        if "unit" in types:
+            return list(services_qs[: model_limits["service"]])
+
+        def get_units():
+            """
+            Return the units and whether only addresses should be shown
+            if addresses are found.
+            """
+            if "unit" not in types:
+                return [], False
+            show_only_address = False
             if unit_ids:
                 preserved = get_preserved_order(unit_ids)
                 units_qs = Unit.objects.filter(id__in=unit_ids).order_by(preserved)
@@ -535,14 +553,10 @@ class SearchViewSet(GenericAPIView):
                 )
 
             units_qs = units_qs.all().distinct()
-            if "municipality" in self.request.query_params:
-                municipalities = (
-                    self.request.query_params["municipality"].lower().strip().split(",")
-                )
-                if len(municipalities) > 0:
-                    units_qs = units_qs.filter(municipality_id__in=municipalities)
-            if "service" in self.request.query_params:
-                services = self.request.query_params["service"].strip().split(",")
+            if municipalities:
+                units_qs = units_qs.filter(municipality_id__in=municipalities)
+            if "service" in params:
+                services = params["service"].strip().split(",")
                 if services[0]:
                     units_qs = units_qs.filter(services__in=services)
 
@@ -551,11 +565,11 @@ class SearchViewSet(GenericAPIView):
                     *units_order_list
                 )
 
-            units_qs = units_qs[: model_limits["unit"]]
-        else:
-            units_qs = Unit.objects.none()
+            return list(units_qs[: model_limits["unit"]]), show_only_address
 
-        if "administrativedivision" in types:
+        def get_administrative_divisions():
+            if "administrativedivision" not in types:
+                return []
             administrative_divisions_qs = AdministrativeDivision.objects.filter(
                 id__in=administrative_division_ids
             )
@@ -570,12 +584,13 @@ class SearchViewSet(GenericAPIView):
                     q_val,
                     threshold=trigram_threshold,
                 )
-            administrative_divisions_qs = administrative_divisions_qs[
-                : model_limits["administrativedivision"]
-            ]
-        else:
-            administrative_divisions_qs = AdministrativeDivision.objects.none()
-        if "servicenode" in types:
+            return list(
+                administrative_divisions_qs[: model_limits["administrativedivision"]]
+            )
+
+        def get_service_nodes():
+            if "servicenode" not in types:
+                return []
             query_ids = [id[0] for id in service_node_ids.values()]
             service_nodes_qs = ServiceNode.objects.filter(id__in=query_ids)
             if not service_nodes_qs and "servicenode" in use_trigram:
@@ -587,10 +602,11 @@ class SearchViewSet(GenericAPIView):
                     threshold=trigram_threshold,
                 )
                 service_nodes_qs = service_nodes_qs[: model_limits["servicenode"]]
-        else:
-            service_nodes_qs = ServiceNode.objects.none()
+            return list(service_nodes_qs)
 
-        if "address" in types:
+        def get_addresses():
+            if "address" not in types:
+                return []
             addresses_qs = Address.objects.filter(id__in=address_ids)
             if not addresses_qs and "address" in use_trigram:
                 addresses_qs = get_trigram_results(
@@ -600,41 +616,49 @@ class SearchViewSet(GenericAPIView):
                     q_val,
                     threshold=trigram_threshold,
                 )
-            if "municipality" in self.request.query_params:
-                municipalities = (
-                    self.request.query_params["municipality"].lower().strip().split(",")
-                )
-                if len(municipalities) > 0:
-                    addresses_qs = addresses_qs.filter(
-                        municipality_id__in=municipalities
-                    )
+            if municipalities:
+                addresses_qs = addresses_qs.filter(municipality_id__in=municipalities)
 
             addresses_qs = addresses_qs[: model_limits["address"]]
             # Use naturalsort function that is migrated to munigeo to
             # sort the addresses.
-            if len(addresses_qs) > 0:
-                ids = [str(addr.id) for addr in addresses_qs]
-                # create string containing ids in format (1,4,2)
-                ids_str = ",".join(ids)
-                ids_str = f"({ids_str})"
-                sql = f"""
-                    select id from munigeo_address where id in {ids_str}
-                    order by naturalsort(full_name_{language_short}) asc;
-                """
-                cursor = connection.cursor()
+            if len(addresses_qs) == 0:
+                return []
+            ids = [str(addr.id) for addr in addresses_qs]
+            # create string containing ids in format (1,4,2)
+            ids_str = ",".join(ids)
+            ids_str = f"({ids_str})"
+            sql = f"""
+                select id from munigeo_address where id in {ids_str}
+                order by naturalsort(full_name_{language_short}) asc;
+            """
+            with connection.cursor() as cursor:
                 cursor.execute(sql)
                 addresses = cursor.fetchall()
-                # addresses are in format e.g. [(12755,), (4067,)], remove comma and parenthesis
-                ids = [re.sub(r"[(,)]", "", str(a)) for a in addresses]
-                preserved = get_preserved_order(ids)
-                addresses_qs = Address.objects.filter(id__in=ids).order_by(preserved)
-                # if no units has been found without trigram search and addresses are found,
-                # do not return any units, thus they might confuse in the results.
-                if addresses_qs.exists() and show_only_address:
-                    units_qs = Unit.objects.none()
-
-        else:
-            addresses_qs = Address.objects.none()
+            # addresses are in format e.g. [(12755,), (4067,)], remove comma and parenthesis
+            ids = [re.sub(r"[(,)]", "", str(a)) for a in addresses]
+            preserved = get_preserved_order(ids)
+            return list(Address.objects.filter(id__in=ids).order_by(preserved))
+
+        # The queries of the types are independent of each other and are run
+        # concurrently if settings.CONCURRENT_QUERIES is set.
+        (
+            services,
+            (units, show_only_address),
+            administrative_divisions,
+            service_nodes,
+            addresses,
+        ) = run_concurrently(
+            get_services,
+            get_units,
+            get_administrative_divisions,
+            get_service_nodes,
+            get_addresses,
+        )
+        # if no units has been found without trigram search and addresses are found,
+        # do not return any units, thus they might confuse in the results.
+        if addresses and show_only_address:
+            units = []
 
         if logger.level <= logging.DEBUG:
             logger.debug(connection.queries)
@@ -646,11 +670,11 @@ class SearchViewSet(GenericAPIView):
 
         queryset = list(
             chain(
-                units_qs,
-                services_qs,
-                service_nodes_qs,
-                administrative_divisions_qs,
-                addresses_qs,
+                units,
+                services,
+                service_nodes,
+                administrative_divisions,
+                addresses,
             )
         )
         page = self.paginate_queryset(queryset)
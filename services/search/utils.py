@@ -13,6 +13,7 @@ from services.models import (
     ServiceNodeUnitCount,
     Unit,
 )
+from services.municipalities import MUNICIPALITIES
 from services.search.constants import (
     DEFAULT_TRIGRAM_THRESHOLD,
     SEARCHABLE_MODEL_TYPE_NAMES,
@@ -135,8 +136,10 @@ def set_address_fields(obj, representation):
         "id": getattr(obj.street, "municipality_id", ""),
         "name": {},
     }
-    municipality["name"]["fi"] = getattr(obj.street.municipality, "name_fi", "")
-    municipality["name"]["sv"] = getattr(obj.street.municipality, "name_sv", "")
+    # The names are read from the cache to avoid a query per address.
+    cached_muni = MUNICIPALITIES.get(obj.street.municipality_id)
+    municipality["name"]["fi"] = cached_muni.get_name("fi") if cached_muni else ""
+    municipality["name"]["sv"] = cached_muni.get_name("sv") if cached_muni else ""
     representation["municipality"] = municipality
     street = {"name": {}}
     street["name"]["fi"] = getattr(obj.street, "name_fi", "")
@@ -0,0 +1,156 @@
+"""
+Prebuilt document of the whole service node tree.
+
+The tree changes only on import, so it is built once per import generation
+of the "service_node_tree" cache domain and kept in the shared cache, on
+disk and in the memory of every process. A new generation is built on the
+first request, which the cache warming makes after the import.
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from services.models import ServiceNode, ServiceNodeUnitCount
+from services.response_cache import get_cache_generation
+
+logger = logging.getLogger(__name__)
+
+TREE_DOMAIN = "service_node_tree"
+CACHE_KEY = "service_node_tree:%s"
+FILE_NAME = "service_node_tree.%s.json"
+# The trees are read from the disk if they have expired from the cache.
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+LANGUAGES = [x[0] for x in settings.LANGUAGES]
+
+
+def build_tree():
+    """
+    Return the service node tree as a list of nested root nodes. The nodes
+    are read in the MPTT order, so the parent of a node is always read
+    before the node itself.
+    """
+    unit_counts = {}
+    counts_qs = ServiceNodeUnitCount.objects.values_list(
+        "service_node_id", "division__name_fi", "count"
+    )
+    for service_node_id, division_name, count in counts_qs:
+        municipality = division_name.lower() if division_name else "_unknown"
+        unit_counts.setdefault(service_node_id, {})[municipality] = count
+
+    period_enabled = set(
+        ServiceNode.related_services.through.objects.filter(
+            service__period_enabled=True
+        ).values_list("servicenode_id", flat=True)
+    )
+
+    name_fields = ["name_%s" % lang for lang in LANGUAGES]
+    nodes = ServiceNode.objects.order_by("tree_id", "lft").values_list(
+        "id", "parent_id", "level", *name_fields
+    )
+    roots = []
+    nodes_by_id = {}
+    for id, parent_id, level, *names in nodes:
+        counts = unit_counts.get(id, {})
+        node = {
+            "id": id,
+            "name": {lang: name for lang, name in zip(LANGUAGES, names) if name},
+            "parent": parent_id,
+            "level": level,
+            "root": id,
+            "period_enabled": id in period_enabled,
+            "unit_count": {"municipality": counts, "total": sum(counts.values())},
+            "children": [],
+        }
+        parent = nodes_by_id.get(parent_id)
+        if parent is None:
+            roots.append(node)
+        else:
+            node["root"] = parent["root"]
+            parent["children"].append(node)
+        nodes_by_id[id] = node
+    return roots
+
+
+def get_etag(content):
+    return '"%s"' % hashlib.sha256(content).hexdigest()
+
+
+class ServiceNodeTree(object):
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.generation = None
+        self.content = None
+        self.etag = None
+
+    def clear(self):
+        with self.lock:
+            self.generation = None
+            self.content = None
+            self.etag = None
+
+    def get_path(self, generation):
+        return os.path.join(settings.SERVICE_NODE_TREE_DIR, FILE_NAME % generation)
+
+    def read_file(self, generation):
+        try:
+            with open(self.get_path(generation), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write_file(self, generation, content):
+        """
+        Write the tree of the generation atomically and remove the trees
+        of the other generations.
+        """
+        directory = settings.SERVICE_NODE_TREE_DIR
+        path = self.get_path(generation)
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            for old_path in glob.glob(os.path.join(directory, FILE_NAME % "*")):
+                if old_path != path:
+                    os.remove(old_path)
+        except OSError:
+            logger.exception(f"Could not write the service node tree to {path}")
+
+    def build(self, generation):
+        content = json.dumps(
+            build_tree(), ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+        self.write_file(generation, content)
+        return content
+
+    def get(self):
+        """
+        Return a tuple of the JSON document of the tree and its ETag.
+        """
+        generation = get_cache_generation(TREE_DOMAIN)
+        with self.lock:
+            if self.generation != generation:
+                key = CACHE_KEY % generation
+                content = cache.get(key)
+                if content is None:
+                    content = self.read_file(generation)
+                    if content is None:
+                        content = self.build(generation)
+                    cache.set(key, content, timeout=CACHE_TIMEOUT)
+                self.generation = generation
+                self.content = content
+                self.etag = get_etag(content)
+            return self.content, self.etag
+
+
+SERVICE_NODE_TREE = ServiceNodeTree()
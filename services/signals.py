@@ -3,22 +3,42 @@ from functools import reduce
 
 from django.contrib.postgres.search import SearchVector
 from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from munigeo.models import Address, AdministrativeDivision
-
-from services.models import Service, ServiceNode, Unit
+from munigeo.models import (
+    Address,
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    Municipality,
+)
+
+from services.departments import DEPARTMENTS
+from services.divisions import DIVISIONS
+from services.models import Department, Service, ServiceNode, Unit, UnitChange
+from services.municipalities import MUNICIPALITIES, MUNICIPALITIES_DOMAIN
+from services.response_cache import bump_cache_generation
 from services.search.utils import hyphenate
 
 
 @receiver(post_save, sender=Unit)
 def unit_on_save(sender, **kwargs):
     obj = kwargs["instance"]
+    UnitChange.objects.create(
+        unit_id=obj.id,
+        change_type=UnitChange.get_change_type(obj, created=kwargs["created"]),
+    )
     generate_syllables(obj)
     # Do transaction after successfull commit.
     transaction.on_commit(populate_search_column(obj))
 
 
+@receiver(post_delete, sender=Unit)
+def unit_on_delete(sender, **kwargs):
+    UnitChange.objects.create(
+        unit_id=kwargs["instance"].id, change_type=UnitChange.DELETED
+    )
+
+
 @receiver(post_save, sender=Service)
 def service_on_save(sender, **kwargs):
     obj = kwargs["instance"]
@@ -41,14 +61,35 @@ def address_on_save(sender, **kwargs):
     transaction.on_commit(populate_search_column(obj))
 
 
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def department_on_change(sender, **kwargs):
+    DEPARTMENTS.clear()
+
+
+@receiver(post_save, sender=Municipality)
+@receiver(post_delete, sender=Municipality)
+def municipality_on_change(sender, **kwargs):
+    MUNICIPALITIES.clear()
+    # Municipalities are also saved by the munigeo importers, which do not
+    # invalidate the caches of the other processes themselves.
+    transaction.on_commit(lambda: bump_cache_generation(MUNICIPALITIES_DOMAIN))
+
+
 @receiver(post_save, sender=AdministrativeDivision)
 def administrative_division_on_save(sender, **kwargs):
     obj = kwargs["instance"]
+    DIVISIONS.clear()
+    MUNICIPALITIES.clear()
     transaction.on_commit(populate_search_column(obj))
 
 
-def generate_syllables(obj):
-    model = obj._meta.model
+@receiver(post_save, sender=AdministrativeDivisionGeometry)
+def administrative_division_geometry_on_save(sender, **kwargs):
+    DIVISIONS.clear()
+
+
+def get_syllables(obj):
     syllables_fi = []
     for column in obj.get_syllable_fi_columns():
         row_content = getattr(obj, column, None)
@@ -59,31 +100,49 @@ def generate_syllables(obj):
                 syllables = hyphenate(word)
                 for s in syllables:
                     syllables_fi.append(s)
+    return syllables_fi
+
+
+def generate_syllables(obj):
+    model = obj._meta.model
     # Use update instead of save. Save triggers the post_save signal and MPTT building.
-    model.objects.filter(id=obj.id).update(syllables_fi=syllables_fi)
+    model.objects.filter(id=obj.id).update(syllables_fi=get_syllables(obj))
+
+
+def get_search_vectors(model):
+    """
+    Return the search column expressions of the model by the column names.
+    """
+    search_vectors = {}
+    for lang in ["fi", "sv", "en"]:
+        # Get the information of columns and weights to be added to search from the model
+        vectors = [
+            SearchVector(column[0], config=column[1], weight=column[2])
+            for column in model.get_search_column_indexing(lang)
+        ]
+        # Add all SearchVectors to search_column.
+        search_vectors["search_column_%s" % lang] = reduce(operator.add, vectors)
+    return search_vectors
 
 
 def populate_search_column(obj):
-    # Get the information of columns and weights to be added to sear from the model
-    columns = {}
-    columns["fi"] = obj.get_search_column_indexing("fi")
-    columns["sv"] = obj.get_search_column_indexing("sv")
-    columns["en"] = obj.get_search_column_indexing("en")
+    model = obj.__class__
     id = obj.id
 
     def on_commit():
-        search_vectors = {}
-        for lang in ["fi", "sv", "en"]:
-            search_vectors[lang] = []
-            for column in columns[lang]:
-                search_vectors[lang].append(
-                    SearchVector(column[0], config=column[1], weight=column[2])
-                )
-
-            # Add all SearchVectors in search_vectors list to search_column.
-            key = "search_column_%s" % lang
-            obj.__class__.objects.filter(id=id).update(
-                **{key: reduce(operator.add, search_vectors[lang])}
-            )
+        for key, search_vector in get_search_vectors(model).items():
+            model.objects.filter(id=id).update(**{key: search_vector})
+
+    return on_commit
+
+
+def populate_search_columns(model, ids):
+    """
+    Like populate_search_column, but for many rows with one statement.
+    """
+    ids = list(ids)
+
+    def on_commit():
+        model.objects.filter(id__in=ids).update(**get_search_vectors(model))
 
     return on_commit
@@ -0,0 +1,196 @@
+"""
+Export of the public dataset as compressed NDJSON and GeoJSON files.
+
+The rows are streamed from server-side cursors and written one at a time,
+so the memory used does not depend on the size of the dataset. The files
+are written to a temporary directory first and moved in place together
+with a manifest of their sizes, row counts and SHA-256 checksums, so the
+downloads are always from a complete export.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.utils import timezone
+from munigeo.models import AdministrativeDivision
+from rest_framework.utils.encoders import JSONEncoder
+
+from services.api import DepartmentSerializer, ServiceSerializer, UnitSerializer
+from services.models import Department, Service, Unit
+from services.service_node_tree import build_tree
+
+MANIFEST_FILE = "manifest.json"
+CHECKSUMS_FILE = "SHA256SUMS"
+GEOJSON_SRID = 4326
+LANGUAGES = [x[0] for x in settings.LANGUAGES]
+
+
+def to_json(obj):
+    return json.dumps(obj, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def iterate_units(chunk_size):
+    queryset = (
+        Unit.objects.filter(public=True, is_active=True)
+        .prefetch_related(
+            "connections",
+            "accessibility_properties",
+            "entrances",
+            "identifiers",
+            "keywords",
+            "service_nodes",
+            "services",
+            "accessibility_shortcomings",
+        )
+        .order_by("id")
+    )
+    serializer = UnitSerializer(context={})
+    for unit in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(unit)
+
+
+def iterate_services(chunk_size):
+    queryset = Service.objects.prefetch_related("keywords").order_by("id")
+    serializer = ServiceSerializer(context={})
+    for service in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(service)
+
+
+def iterate_service_nodes(chunk_size):
+    """
+    The service nodes in the MPTT order with the ids of their children. The
+    tree is built in memory, but it is small compared to the units.
+    """
+    stack = list(reversed(build_tree()))
+    while stack:
+        node = stack.pop()
+        children = node["children"]
+        yield dict(node, children=[child["id"] for child in children])
+        stack.extend(reversed(children))
+
+
+def iterate_departments(chunk_size):
+    queryset = Department.objects.select_related("parent").order_by("tree_id", "lft")
+    serializer = DepartmentSerializer(context={})
+    for department in queryset.iterator(chunk_size=chunk_size):
+        yield serializer.to_representation(department)
+
+
+def iterate_divisions(chunk_size):
+    queryset = AdministrativeDivision.objects.select_related(
+        "type", "parent", "geometry"
+    ).order_by("id")
+    # The boundaries can be large, so fewer of them are fetched at a time.
+    for division in queryset.iterator(chunk_size=max(chunk_size // 10, 1)):
+        geometry = getattr(division, "geometry", None)
+        boundary = geometry.boundary if geometry else None
+        if boundary is not None:
+            boundary = json.loads(boundary.transform(GEOJSON_SRID, clone=True).json)
+        yield {
+            "type": "Feature",
+            "id": division.id,
+            "geometry": boundary,
+            "properties": {
+                "ocd_id": division.ocd_id,
+                "origin_id": division.origin_id,
+                "type": division.type.type,
+                "name": {
+                    lang: getattr(division, "name_%s" % lang, None)
+                    for lang in LANGUAGES
+                },
+                "parent": division.parent.ocd_id if division.parent else None,
+                "municipality": division.municipality_id,
+                "start": division.start,
+                "end": division.end,
+            },
+        }
+
+
+# File name, format and the function yielding the rows of every file.
+EXPORTS = [
+    ("units.ndjson.gz", "ndjson", iterate_units),
+    ("services.ndjson.gz", "ndjson", iterate_services),
+    ("service_nodes.ndjson.gz", "ndjson", iterate_service_nodes),
+    ("departments.ndjson.gz", "ndjson", iterate_departments),
+    ("divisions.geojson.gz", "geojson", iterate_divisions),
+]
+
+
+def write_ndjson(f, rows):
+    count = 0
+    for row in rows:
+        f.write(to_json(row))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_geojson(f, features):
+    count = 0
+    f.write('{"type":"FeatureCollection","features":[\n')
+    for feature in features:
+        if count:
+            f.write(",\n")
+        f.write(to_json(feature))
+        count += 1
+    f.write("\n]}\n")
+    return count
+
+
+def get_checksum(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def export_snapshot(directory=None, chunk_size=None, logger=None):
+    """
+    Export the dataset to the directory and return the manifest.
+    """
+    directory = directory or settings.SNAPSHOT_EXPORT_DIR
+    chunk_size = chunk_size or settings.SNAPSHOT_EXPORT_CHUNK_SIZE
+    os.makedirs(directory, exist_ok=True)
+    manifest = {"generated_at": timezone.now().isoformat(), "files": []}
+    tmp_dir = tempfile.mkdtemp(dir=directory, prefix=".export-")
+    try:
+        for name, file_format, iterate in EXPORTS:
+            path = os.path.join(tmp_dir, name)
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                if file_format == "geojson":
+                    count = write_geojson(f, iterate(chunk_size))
+                else:
+                    count = write_ndjson(f, iterate(chunk_size))
+            manifest["files"].append(
+                {
+                    "name": name,
+                    "format": file_format,
+                    "count": count,
+                    "size": os.path.getsize(path),
+                    "sha256": get_checksum(path),
+                }
+            )
+            if logger:
+                logger.info(f"Exported {count} rows to {name}")
+
+        with open(os.path.join(tmp_dir, CHECKSUMS_FILE), "w") as f:
+            for entry in manifest["files"]:
+                f.write("%s  %s\n" % (entry["sha256"], entry["name"]))
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        # The manifest is moved last, so it never refers to missing files.
+        for name in [entry["name"] for entry in manifest["files"]] + [
+            CHECKSUMS_FILE,
+            MANIFEST_FILE,
+        ]:
+            os.replace(os.path.join(tmp_dir, name), os.path.join(directory, name))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return manifest
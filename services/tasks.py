@@ -0,0 +1,21 @@
+from django.core import management
+
+from smbackend.utils import shared_task_email
+
+
+@shared_task_email
+def warm_response_cache(domain, generation=None, name="warm_response_cache"):
+    args = [domain]
+    if generation is not None:
+        args += ["--generation", generation]
+    management.call_command("warm_response_cache", *args)
+
+
+@shared_task_email
+def export_snapshot(name="export_snapshot"):
+    management.call_command("export_snapshot")
+
+
+@shared_task_email
+def prune_unit_changes(name="prune_unit_changes"):
+    management.call_command("prune_unit_changes")
@@ -0,0 +1,40 @@
+import pytest
+from rest_framework.reverse import reverse
+
+from services.accessibility import CompiledRules, EQ, OR, RULES
+
+
+def test_compiled_rules():
+    rules = {
+        "1A": {
+            "id": "1A",
+            "requirement_id": "1A",
+            "operator": "OR",
+            "operands": [
+                {"id": "2", "operator": "EQ", "operands": ["10", "x"], "msg": 0},
+                {"id": "3", "operator": "EQ", "operands": ["11", "y"], "msg": 5},
+            ],
+            "path": ["entrance"],
+            "msg": None,
+        },
+    }
+    compiled = CompiledRules(rules, ["message"])
+    assert compiled.operators == [OR, EQ, EQ]
+    assert compiled.operands == [(1, 2), ("10", "x"), ("11", "y")]
+    assert compiled.message_ids == [None, 0, None]
+    assert compiled.property_ids == {"10", "11"}
+    assert compiled.profile_roots == {"1": [0]}
+    assert compiled.hash == CompiledRules(dict(rules), ["message"]).hash
+    assert compiled.hash != CompiledRules(rules, ["other message"]).hash
+
+
+@pytest.mark.django_db
+def test_accessibility_rule_etag(api_client):
+    url = reverse("accessibility_rule-list")
+    response = api_client.get(url)
+    assert response.status_code == 200
+    assert response["ETag"] == '"%s"' % RULES.get_compiled().hash
+    assert set(response.json().keys()) == {"rules", "messages"}
+
+    response = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+    assert response.status_code == 304
@@ -0,0 +1,22 @@
+import threading
+
+from django.test import override_settings
+
+from services.utils import run_concurrently
+
+
+def get_thread_name():
+    return threading.current_thread().name
+
+
+def test_run_concurrently_sequential():
+    with override_settings(CONCURRENT_QUERIES=False):
+        results = run_concurrently(get_thread_name, lambda: 1)
+    assert results == [threading.current_thread().name, 1]
+
+
+def test_run_concurrently():
+    with override_settings(CONCURRENT_QUERIES=True, CONCURRENT_QUERY_WORKERS=2):
+        results = run_concurrently(get_thread_name, lambda: 1, lambda: 2)
+    assert results[0].startswith("query")
+    assert results[1:] == [1, 2]
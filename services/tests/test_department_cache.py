@@ -0,0 +1,129 @@
+import uuid
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.reverse import reverse
+
+from services.api import DepartmentSerializer
+from services.departments import DEPARTMENTS, SERIALIZED_CACHE_SIZE
+from services.models import Department, Unit
+from services.response_cache import bump_cache_generation
+
+from .utils import get, MOD_TIME
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+@pytest.fixture
+def departments():
+    root = Department.objects.create(uuid=uuid.uuid4(), name_fi="Kaupunki")
+    child = Department.objects.create(
+        uuid=uuid.uuid4(), name_fi="Sivistystoimiala", parent=root
+    )
+    grandchild = Department.objects.create(
+        uuid=uuid.uuid4(), name_fi="Kirjastot", parent=child
+    )
+    return root, child, grandchild
+
+
+@pytest.fixture
+def units(departments):
+    root, child, grandchild = departments
+    for i in range(5):
+        Unit.objects.create(
+            id=i + 1,
+            name_fi="unit %s" % i,
+            department=grandchild,
+            root_department=root,
+            last_modified_time=MOD_TIME,
+        )
+    return Unit.objects.all().order_by("pk")
+
+
+def get_department_queries(queries):
+    return [q for q in queries if "services_department" in q["sql"]]
+
+
+@pytest.mark.django_db
+def test_unit_departments_from_cache(api_client, departments, units):
+    root, child, grandchild = departments
+    DEPARTMENTS.clear()
+    with CaptureQueriesContext(connection) as context:
+        response = get(
+            api_client,
+            reverse("unit-list"),
+            data={"include": "department,root_department"},
+        )
+    # The tree is loaded once, no queries are made per unit.
+    assert len(get_department_queries(context.captured_queries)) == 1
+    for unit in response.data["results"]:
+        assert unit["department"]["id"] == grandchild.uuid
+        assert unit["department"]["parent"] == child.uuid
+        assert unit["department"]["name"]["fi"] == "Kirjastot"
+        assert unit["root_department"]["id"] == root.uuid
+
+    with CaptureQueriesContext(connection) as context:
+        response = get(api_client, reverse("unit-list"))
+    assert get_department_queries(context.captured_queries) == []
+    assert response.data["results"][0]["department"] == grandchild.uuid
+
+
+@pytest.mark.django_db
+def test_department_hierarchy(api_client, departments):
+    root, child, grandchild = departments
+    response = get(
+        api_client,
+        reverse("department-detail", kwargs={"pk": child.uuid}),
+        data={"include_hierarchy": "true"},
+    )
+    assert [d["id"] for d in response.data["hierarchy"]] == [
+        root.uuid,
+        child.uuid,
+        grandchild.uuid,
+    ]
+
+
+@pytest.mark.django_db
+def test_department_cache_generation(departments):
+    root, child, grandchild = departments
+    with override_settings(CACHES=LOCMEM_CACHES, DEPARTMENT_CACHE_CHECK_INTERVAL=0):
+        cache.clear()
+        DEPARTMENTS.clear()
+        assert DEPARTMENTS.get(child.id).root_id == root.id
+        assert DEPARTMENTS.get(grandchild.id).parent_id == child.id
+        assert DEPARTMENTS.get_by_uuid(child.uuid).id == child.id
+
+        # Updates made without signals, e.g. by the importers of other
+        # processes, are picked up when the generation is bumped.
+        Department.objects.filter(id=child.id).update(name_fi="Opetus")
+        assert DEPARTMENTS.get(child.id).instance.name_fi == "Sivistystoimiala"
+        bump_cache_generation("departments")
+        assert DEPARTMENTS.get(child.id).instance.name_fi == "Opetus"
+        cache.clear()
+
+
+@pytest.mark.django_db
+def test_department_serialize_memo(departments):
+    root, child, grandchild = departments
+    DEPARTMENTS.clear()
+    cached = DEPARTMENTS.get(child.id)
+    data = cached.serialize(DepartmentSerializer, {"only": ["name", "foo"]})
+    # Mutating the returned data does not change the memoized data.
+    data["name"]["fi"] = "Opetus"
+    data = cached.serialize(DepartmentSerializer, {"only": ["name"]})
+    assert data["name"]["fi"] == "Sivistystoimiala"
+    # Unknown field names in `only` do not add entries.
+    assert len(cached._serialized) == 1
+
+    fields = ["name", "parent", "municipality", "street_address", "phone"]
+    for i in range(2 ** len(fields)):
+        only = [field for j, field in enumerate(fields) if i & (1 << j)]
+        cached.serialize(DepartmentSerializer, {"only": only})
+    assert len(cached._serialized) <= SERIALIZED_CACHE_SIZE
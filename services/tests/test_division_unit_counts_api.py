@@ -0,0 +1,111 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    AdministrativeDivisionType,
+)
+from rest_framework.reverse import reverse
+
+from services.divisions import DIVISIONS
+from services.management.commands.services_import.services import (
+    update_division_unit_counts,
+)
+from services.models import Service, ServiceNode, Unit, UnitServiceDetails
+
+from .utils import get, MOD_TIME
+
+DIVISION_PARAM = "turku/district:north,turku/district:south"
+
+
+def make_square(x, y, size):
+    return MultiPolygon(
+        Polygon(
+            ((x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)),
+            srid=3067,
+        ),
+        srid=3067,
+    )
+
+
+@pytest.fixture
+def counts():
+    DIVISIONS.clear()
+    district_type = AdministrativeDivisionType.objects.create(type="district")
+    for i, name in enumerate(["north", "south"]):
+        division = AdministrativeDivision.objects.create(
+            type=district_type,
+            name_fi=name,
+            ocd_id="ocd-division/country:fi/kunta:turku/district:%s" % name,
+        )
+        AdministrativeDivisionGeometry.objects.create(
+            division=division, boundary=make_square(0, i * 1000, 1000)
+        )
+    service = Service.objects.create(id=1, name="service", last_modified_time=MOD_TIME)
+    service_node = ServiceNode.objects.create(
+        id=1, name="service node", last_modified_time=MOD_TIME
+    )
+    # Two units in the north district and none in the south one.
+    for i in range(0, 2):
+        unit = Unit.objects.create(
+            id=i + 1,
+            name_fi="unit %s" % i,
+            location=Point(500, 500, srid=3067),
+            last_modified_time=MOD_TIME,
+        )
+        UnitServiceDetails.objects.create(unit=unit, service=service)
+        unit.service_nodes.add(service_node)
+    update_division_unit_counts()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["service-list", "servicenode-list"])
+def test_unit_count_per_division(api_client, counts, url_name):
+    response = get(
+        api_client,
+        reverse(url_name),
+        data={"include": "unit_count_per_division", "division": DIVISION_PARAM},
+    )
+    assert response.data["results"][0]["unit_count_per_division"] == {
+        "north": 2,
+        "south": 0,
+    }
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["service-list", "servicenode-list"])
+def test_unit_count_per_division_unsupported_type(
+    api_client, counts, url_name, settings
+):
+    settings.UNIT_COUNT_DIVISION_TYPES = ["muni"]
+    response = api_client.get(
+        reverse(url_name),
+        data={"include": "unit_count_per_division", "division": DIVISION_PARAM},
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("url_name", ["service-list", "servicenode-list"])
+def test_unit_count_per_division_not_recounted(api_client, counts, url_name):
+    # A division imported after the counts were last updated is counted live.
+    division = AdministrativeDivision.objects.create(
+        type=AdministrativeDivisionType.objects.get(type="district"),
+        name_fi="center",
+        ocd_id="ocd-division/country:fi/kunta:turku/district:center",
+    )
+    AdministrativeDivisionGeometry.objects.create(
+        division=division, boundary=make_square(0, 0, 2000)
+    )
+    response = get(
+        api_client,
+        reverse(url_name),
+        data={
+            "include": "unit_count_per_division",
+            "division": "turku/district:north,turku/district:center",
+        },
+    )
+    assert response.data["results"][0]["unit_count_per_division"] == {
+        "north": 2,
+        "center": 2,
+    }
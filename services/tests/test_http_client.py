@@ -0,0 +1,90 @@
+import time
+
+import pytest
+import requests
+
+from services.http_client import CircuitOpenError, HTTPClient
+
+from .utils import stub_http_server, StubRequestHandler
+
+
+class StubHandler(StubRequestHandler):
+    def do_POST(self):  # noqa: N802
+        server = self.server
+        server.requests.append(self.client_address)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = b'{"ok": true}'
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server():
+    with stub_http_server(StubHandler) as server:
+        server.requests = []
+        server.statuses = []
+        yield server
+
+
+def make_client(**kwargs):
+    kwargs.setdefault("backoff_factor", 0)
+    return HTTPClient("test", **kwargs)
+
+
+def test_connections_are_kept_alive(stub_server):
+    client = make_client()
+    for i in range(3):
+        assert client.post(stub_server.url, data={"i": i}).status_code == 200
+    # All the requests are made through the same connection.
+    assert len(set(stub_server.requests)) == 1
+
+
+def test_unavailable_is_retried(stub_server):
+    stub_server.statuses = [503, 503]
+    client = make_client(retries=2)
+    assert client.post(stub_server.url).status_code == 200
+    assert len(stub_server.requests) == 3
+
+
+def test_server_error_is_not_retried(stub_server):
+    stub_server.statuses = [500]
+    client = make_client(retries=2)
+    assert client.post(stub_server.url).status_code == 500
+    assert len(stub_server.requests) == 1
+
+
+def test_circuit_breaker(stub_server):
+    stub_server.statuses = [504, 504]
+    client = make_client(failure_threshold=2, reset_timeout=0.2)
+    client.post(stub_server.url)
+    client.post(stub_server.url)
+    with pytest.raises(CircuitOpenError):
+        client.post(stub_server.url)
+    assert len(stub_server.requests) == 2
+
+    # A trial request is let through after the reset timeout.
+    time.sleep(0.3)
+    assert client.post(stub_server.url).status_code == 200
+    assert not client.breaker.is_open
+
+
+def test_server_error_does_not_open_circuit(stub_server):
+    stub_server.statuses = [500, 500]
+    client = make_client(failure_threshold=2)
+    client.post(stub_server.url)
+    client.post(stub_server.url)
+    assert not client.breaker.is_open
+    assert client.post(stub_server.url).status_code == 200
+
+
+def test_circuit_breaker_connection_error():
+    client = make_client(retries=0, failure_threshold=1, connect_timeout=0.5)
+    # Nothing listens on the port.
+    with pytest.raises(requests.ConnectionError):
+        client.post("http://127.0.0.1:1/")
+    with pytest.raises(CircuitOpenError):
+        client.post("http://127.0.0.1:1/")
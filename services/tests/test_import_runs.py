@@ -0,0 +1,146 @@
+import datetime
+from io import StringIO
+
+import pytest
+from django.contrib.admin import site
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from services.admin import ImportRunAdmin
+from services.import_runs import add_import_rows, import_phase, records_import_run
+from services.models import ImportRun, Unit
+
+
+class ImportCommand(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument("--fail", action="store_true")
+
+    @records_import_run("test_import")
+    def handle(self, **options):
+        with import_phase("fetch"):
+            Unit.objects.count()
+        with import_phase("write"):
+            for i in range(2):
+                Unit.objects.create(
+                    id=i + 1, name_fi="unit %s" % i, last_modified_time=timezone.now()
+                )
+                add_import_rows(1)
+        with import_phase("fetch"):
+            Unit.objects.count()
+        if options["fail"]:
+            raise ValueError("Import failed")
+
+
+@pytest.mark.django_db
+def test_import_run_is_recorded():
+    # The phases do nothing outside of a recorded run.
+    with import_phase("fetch"):
+        add_import_rows(1)
+
+    call_command(ImportCommand())
+
+    run = ImportRun.objects.get()
+    assert run.name == "test_import"
+    assert run.arguments == {"fail": False}
+    assert run.status == ImportRun.SUCCEEDED
+    assert run.row_count == 2
+    assert run.query_count >= 4
+    assert run.duration > 0
+    assert run.peak_memory > 0
+    assert [phase["name"] for phase in run.phases] == ["fetch", "write"]
+    assert run.get_phase("fetch")["query_count"] == 2
+    assert run.get_phase("write")["row_count"] == 2
+
+
+@pytest.mark.django_db
+def test_failed_import_run_is_recorded():
+    with pytest.raises(ValueError):
+        call_command(ImportCommand(), fail=True)
+
+    run = ImportRun.objects.get()
+    assert run.status == ImportRun.FAILED
+    assert "Import failed" in run.error
+
+
+@pytest.mark.django_db
+def test_compare_import_runs():
+    started_at = timezone.now() - datetime.timedelta(days=10)
+    # The quick runs importing other data are not compared against.
+    for i, (arguments, duration) in enumerate(
+        [
+            ({"import_types": ["units"]}, 10),
+            ({"import_types": ["addresses"]}, 6),
+            ({"import_types": ["units"]}, 11),
+            ({"import_types": ["addresses"]}, 6),
+            ({"import_types": ["units"]}, 9),
+            ({"import_types": ["units"]}, 20),
+        ]
+    ):
+        ImportRun.objects.create(
+            name="test_import",
+            arguments=arguments,
+            status=ImportRun.SUCCEEDED,
+            started_at=started_at + datetime.timedelta(days=i),
+            duration=duration,
+            phases=[
+                {"name": "fetch", "duration": 5},
+                {"name": "write", "duration": duration - 5},
+            ],
+        )
+
+    out = StringIO()
+    call_command("compare_import_runs", "test_import", stdout=out)
+    lines = out.getvalue().splitlines()
+    assert "median of 3 previous runs" in out.getvalue()
+    total = next(line for line in lines if line.startswith("total"))
+    assert "+100 %" in total
+    assert "REGRESSION" in total
+    fetch = next(line for line in lines if line.startswith("fetch"))
+    assert "REGRESSION" not in fetch
+
+    out = StringIO()
+    call_command(
+        "compare_import_runs",
+        "test_import",
+        "--arguments",
+        '{"import_types": ["addresses"]}',
+        stdout=out,
+    )
+    total = next(
+        line for line in out.getvalue().splitlines() if line.startswith("total")
+    )
+    assert "+0 %" in total
+    assert "REGRESSION" not in total
+
+    out = StringIO()
+    call_command("compare_import_runs", stdout=out)
+    assert len(out.getvalue().splitlines()) == 2
+
+
+@pytest.mark.django_db
+def test_import_run_admin_duration_change(rf, django_assert_num_queries):
+    started_at = timezone.now() - datetime.timedelta(days=10)
+    for i, (status, duration) in enumerate(
+        [
+            (ImportRun.SUCCEEDED, 10),
+            (ImportRun.FAILED, 1),
+            (ImportRun.SUCCEEDED, 15),
+        ]
+    ):
+        ImportRun.objects.create(
+            name="test_import",
+            status=status,
+            started_at=started_at + datetime.timedelta(days=i),
+            duration=duration,
+        )
+
+    model_admin = ImportRunAdmin(ImportRun, site)
+    # The durations of the previous runs are read with the runs.
+    with django_assert_num_queries(1):
+        changes = [
+            model_admin.get_duration_change(run)
+            for run in model_admin.get_queryset(rf.get("/"))
+        ]
+    # The failed runs are not compared against.
+    assert changes == ["+50 %", "-90 %", None]
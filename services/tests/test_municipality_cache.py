@@ -0,0 +1,146 @@
+import uuid
+
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionType,
+    Municipality,
+)
+from rest_framework.reverse import reverse
+
+from services.departments import DEPARTMENTS
+from services.models import Department, Unit
+from services.municipalities import MUNICIPALITIES, MUNICIPALITIES_DOMAIN
+from services.response_cache import bump_cache_generation
+
+from .utils import MOD_TIME
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+@pytest.fixture
+def municipalities():
+    t, _ = AdministrativeDivisionType.objects.get_or_create(
+        type="muni", defaults={"name": "Municipality"}
+    )
+    munis = []
+    for i, (id, name_fi, name_sv) in enumerate(
+        [("turku", "Turku", "Åbo"), ("kaarina", "Kaarina", "S:t Karins")]
+    ):
+        division = AdministrativeDivision.objects.create(
+            type=t,
+            id=i + 1,
+            name_fi=name_fi,
+            ocd_id="ocd-division/country:fi/kunta:%s" % id,
+        )
+        munis.append(
+            Municipality.objects.create(
+                id=id, name_fi=name_fi, name_sv=name_sv, division=division
+            )
+        )
+    return munis
+
+
+@pytest.fixture
+def units(municipalities):
+    turku, kaarina = municipalities
+    department = Department.objects.create(
+        uuid=uuid.uuid4(), name_fi="Turun kaupunki", municipality=turku
+    )
+    Unit.objects.create(
+        id=1, name_fi="Turun yksikkö", municipality=turku, last_modified_time=MOD_TIME
+    )
+    Unit.objects.create(
+        id=2,
+        name_fi="Kaarinan yksikkö",
+        municipality=kaarina,
+        last_modified_time=MOD_TIME,
+    )
+    Unit.objects.create(
+        id=3,
+        name_fi="Turun palvelu Kaarinassa",
+        municipality=kaarina,
+        root_department=department,
+        last_modified_time=MOD_TIME,
+    )
+    return department
+
+
+def get_unit_ids(api_client, **data):
+    response = api_client.get(reverse("unit-list"), data=data)
+    assert response.status_code == 200, response.content
+    return sorted(unit["id"] for unit in response.data["results"])
+
+
+def get_lookup_queries(queries):
+    return [
+        q
+        for q in queries
+        if "munigeo_municipality" in q["sql"] or "services_department" in q["sql"]
+    ]
+
+
+@pytest.mark.django_db
+def test_municipality_filter(api_client, units):
+    MUNICIPALITIES.clear()
+    assert get_unit_ids(api_client, municipality="turku") == [1]
+    assert get_unit_ids(api_client, municipality="turku,Kaarina") == [1, 2, 3]
+    assert get_unit_ids(
+        api_client, municipality="ocd-division/country:fi/kunta:kaarina"
+    ) == [2, 3]
+
+    # The municipalities are parsed from the cache.
+    with CaptureQueriesContext(connection) as context:
+        get_unit_ids(api_client, municipality="turku")
+    assert get_lookup_queries(context.captured_queries) == []
+
+    response = api_client.get(reverse("unit-list"), data={"municipality": "espoo"})
+    assert response.status_code == 400
+    assert "ocd-division/country:fi/kunta:espoo" in response.data["detail"]
+
+
+@pytest.mark.django_db
+def test_city_as_department_filter(api_client, units):
+    department = units
+    DEPARTMENTS.clear()
+    assert get_unit_ids(api_client, city_as_department=str(department.uuid)) == [
+        1,
+        3,
+    ]
+    assert get_unit_ids(api_client, city_as_department=str(uuid.uuid4())) == []
+
+    with CaptureQueriesContext(connection) as context:
+        get_unit_ids(api_client, city_as_department=str(department.uuid))
+    assert get_lookup_queries(context.captured_queries) == []
+
+    response = api_client.get(
+        reverse("unit-list"), data={"city_as_department": "not-a-uuid"}
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_municipality_cache_generation(municipalities):
+    turku, kaarina = municipalities
+    with override_settings(CACHES=LOCMEM_CACHES, MUNICIPALITY_CACHE_CHECK_INTERVAL=0):
+        cache.clear()
+        MUNICIPALITIES.clear()
+        cached = MUNICIPALITIES.get_by_ocd_id("ocd-division/country:fi/kunta:turku")
+        assert cached.id == "turku"
+        assert MUNICIPALITIES.get("kaarina").get_name("sv") == "S:t Karins"
+
+        # Updates made without signals are picked up when the generation
+        # is bumped.
+        Municipality.objects.filter(id="turku").update(name_sv="Turku")
+        assert MUNICIPALITIES.get("turku").get_name("sv") == "Åbo"
+        bump_cache_generation(MUNICIPALITIES_DOMAIN)
+        assert MUNICIPALITIES.get("turku").get_name("sv") == "Turku"
+        cache.clear()
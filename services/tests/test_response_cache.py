@@ -0,0 +1,155 @@
+import pytest
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import override_settings, RequestFactory
+
+from services import response_cache
+from services.response_cache import (
+    bump_cache_generation,
+    generation_cache_page,
+    get_cache_generation,
+    get_most_requested,
+    invalidates_cache,
+    record_request,
+)
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+@pytest.fixture
+def locmem_cache():
+    with override_settings(CACHES=LOCMEM_CACHES, RESPONSE_CACHE_WARMING_URLS=0):
+        cache.clear()
+        yield cache
+        cache.clear()
+
+
+class FakeRedis:
+    """
+    The sorted set commands of Redis used for recording the traffic.
+    """
+
+    def __init__(self):
+        self.sets = {}
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    def zincrby(self, key, amount, member):
+        values = self.sets.setdefault(key, {})
+        values[member] = values.get(member, 0) + amount
+        return values[member]
+
+    def zcard(self, key):
+        return len(self.sets.get(key, {}))
+
+    def expire(self, key, timeout):
+        return True
+
+    def _ranked(self, key):
+        values = self.sets.get(key, {})
+        return sorted(values.items(), key=lambda x: (x[1], x[0]))
+
+    def zremrangebyrank(self, key, start, end):
+        ranked = self._ranked(key)
+        removed = ranked[start : len(ranked) + end + 1 if end < 0 else end + 1]
+        for member, _ in removed:
+            del self.sets[key][member]
+        return len(removed)
+
+    def zrevrange(self, key, start, end, withscores=False):
+        return list(reversed(self._ranked(key)))[start : end + 1]
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def command(*args):
+            self.commands.append((name, args))
+
+        return command
+
+    def execute(self):
+        return [getattr(self.client, name)(*args) for name, args in self.commands]
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    monkeypatch.setattr(response_cache, "get_redis_client", lambda: client)
+    return client
+
+
+def test_bump_cache_generation(locmem_cache):
+    assert get_cache_generation("search") == 0
+    assert bump_cache_generation("search") == 1
+    assert bump_cache_generation("search") == 2
+    assert get_cache_generation("search") == 2
+    assert get_cache_generation("mobility_data") == 0
+
+
+def test_generation_cache_page(locmem_cache):
+    calls = []
+
+    @generation_cache_page(60, "search")
+    def view(request):
+        calls.append(request)
+        return HttpResponse(str(len(calls)))
+
+    factory = RequestFactory()
+    assert view(factory.get("/search/?q=uimahalli")).content == b"1"
+    assert view(factory.get("/search/?q=uimahalli")).content == b"1"
+    assert len(calls) == 1
+
+    bump_cache_generation("mobility_data")
+    assert view(factory.get("/search/?q=uimahalli")).content == b"1"
+
+    bump_cache_generation("search")
+    assert view(factory.get("/search/?q=uimahalli")).content == b"2"
+    assert len(calls) == 2
+
+
+def test_invalidates_cache(locmem_cache):
+    class Command:
+        @invalidates_cache("search", "mobility_data")
+        def handle(self, fail=False):
+            if fail:
+                raise ValueError
+
+    Command().handle()
+    assert get_cache_generation("search") == 1
+    assert get_cache_generation("mobility_data") == 1
+
+    with pytest.raises(ValueError):
+        Command().handle(fail=True)
+    assert get_cache_generation("search") == 2
+
+
+@override_settings(RESPONSE_CACHE_TRAFFIC_SIZE=2)
+def test_record_request_new_url_reaches_top(fake_redis):
+    factory = RequestFactory()
+    for path in ["/search/?q=a", "/search/?q=b"] * 3:
+        record_request("search", factory.get(path))
+    # A URL first requested after the traffic is full is not evicted.
+    for i in range(4):
+        record_request("search", factory.get("/search/?q=c"))
+    paths = [entry["path"] for entry in get_most_requested("search", 2)]
+    assert paths[0] == "/search/?q=c"
+
+
+@override_settings(RESPONSE_CACHE_TRAFFIC_SIZE=2)
+def test_record_request_trims_traffic(fake_redis):
+    factory = RequestFactory()
+    for i in range(2 * response_cache.TRAFFIC_TRIM_FACTOR):
+        record_request("search", factory.get("/search/?q=%s" % i))
+    key = response_cache.get_traffic_key("search")
+    assert fake_redis.zcard(key) == 2 * response_cache.TRAFFIC_TRIM_FACTOR
+    record_request("search", factory.get("/search/?q=new"))
+    assert fake_redis.zcard(key) == 2
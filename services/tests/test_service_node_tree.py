@@ -0,0 +1,123 @@
+import json
+
+import pytest
+from django.core.cache import cache
+from django.test import override_settings
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionType,
+    Municipality,
+)
+from rest_framework.reverse import reverse
+
+from services.management.commands.services_import.services import (
+    update_service_node_counts,
+)
+from services.models import ServiceNode, Unit
+from services.response_cache import bump_cache_generation
+from services.service_node_tree import SERVICE_NODE_TREE, TREE_DOMAIN
+
+from .utils import get, MOD_TIME
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+@pytest.fixture
+def tree_settings(tmp_path):
+    with override_settings(
+        CACHES=LOCMEM_CACHES,
+        RESPONSE_CACHE_WARMING_URLS=0,
+        SERVICE_NODE_TREE_DIR=str(tmp_path),
+    ):
+        cache.clear()
+        SERVICE_NODE_TREE.clear()
+        yield tmp_path
+        SERVICE_NODE_TREE.clear()
+        cache.clear()
+
+
+@pytest.fixture
+def service_nodes():
+    root = ServiceNode.objects.create(
+        id=1, name_fi="Kulttuuri", name_en="Culture", last_modified_time=MOD_TIME
+    )
+    child = ServiceNode.objects.create(
+        id=2, name_fi="Kirjastot", parent=root, last_modified_time=MOD_TIME
+    )
+    ServiceNode.objects.create(id=3, name_fi="Liikunta", last_modified_time=MOD_TIME)
+    t, _ = AdministrativeDivisionType.objects.get_or_create(
+        id=1, type="muni", defaults={"name": "Municipality"}
+    )
+    division = AdministrativeDivision.objects.create(type=t, id=1, name_fi="Turku")
+    municipality = Municipality.objects.create(
+        id="turku", name_fi="Turku", division=division
+    )
+    unit = Unit.objects.create(
+        id=1,
+        name_fi="Pääkirjasto",
+        municipality=municipality,
+        last_modified_time=MOD_TIME,
+    )
+    unit.service_nodes.add(child)
+    update_service_node_counts()
+    return ServiceNode.objects.all().order_by("pk")
+
+
+def get_tree(api_client, **extra):
+    return api_client.get(reverse("servicenode-tree"), **extra)
+
+
+@pytest.mark.django_db
+def test_service_node_tree(api_client, tree_settings, service_nodes):
+    response = get_tree(api_client)
+    assert response.status_code == 200
+    tree = json.loads(response.content)
+    assert [node["id"] for node in tree] == [1, 3]
+    root = tree[0]
+    assert root["name"] == {"fi": "Kulttuuri", "en": "Culture"}
+    assert [node["id"] for node in root["children"]] == [2]
+    child = root["children"][0]
+    assert child["root"] == 1
+    assert child["parent"] == 1
+    assert child["children"] == []
+
+    # The counts match the ones of the service node list.
+    nodes = get(api_client, reverse("servicenode-list")).data["results"]
+    counts = {node["id"]: node["unit_count"] for node in nodes}
+    assert child["unit_count"] == counts[2]
+    assert child["unit_count"]["municipality"] == {"turku": 1}
+    assert root["unit_count"] == counts[1]
+
+
+@pytest.mark.django_db
+def test_service_node_tree_conditional_get(api_client, tree_settings, service_nodes):
+    response = get_tree(api_client)
+    etag = response["ETag"]
+    response = get_tree(api_client, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert response["ETag"] == etag
+
+
+@pytest.mark.django_db
+def test_service_node_tree_generation(api_client, tree_settings, service_nodes):
+    etag = get_tree(api_client)["ETag"]
+    assert list(tree_settings.iterdir()) == [tree_settings / "service_node_tree.0.json"]
+
+    # The tree is rebuilt only when the import generation changes.
+    ServiceNode.objects.filter(id=3).update(name_fi="Urheilu")
+    assert get_tree(api_client)["ETag"] == etag
+
+    # A process without the tree in memory or in the cache reads it from disk.
+    SERVICE_NODE_TREE.clear()
+    cache.clear()
+    assert get_tree(api_client)["ETag"] == etag
+
+    bump_cache_generation(TREE_DOMAIN)
+    response = get_tree(api_client)
+    assert response["ETag"] != etag
+    assert json.loads(response.content)[1]["name"] == {"fi": "Urheilu"}
+    assert list(tree_settings.iterdir()) == [tree_settings / "service_node_tree.1.json"]
@@ -1,6 +1,8 @@
 import datetime
 
 import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from munigeo.models import (
     AdministrativeDivision,
     AdministrativeDivisionType,
@@ -10,9 +12,10 @@ from rest_framework.reverse import reverse
 from rest_framework.test import APIClient
 
 from services.management.commands.services_import.services import (
+    get_unit_count_state,
     update_service_node_counts,
 )
-from services.models import ServiceNode, Unit
+from services.models import ServiceNode, ServiceNodeUnitCount, Unit
 
 from .utils import get
 
@@ -265,3 +268,74 @@ def test_service_node_counts_remove_service_node_from_units(units, api_client):
     assert service_node_3["unit_count"]["total"] == 1
     assert service_node_3["unit_count"]["municipality"]["a"] == 1
     assert len(service_node_3["unit_count"]["municipality"]) == 1
+
+
+def get_unit_counts(api_client):
+    return {node["id"]: node["unit_count"] for node in get_nodes(api_client)}
+
+
+@pytest.mark.django_db
+def test_service_node_counts_incremental(units, api_client):
+    s1, s2, s3 = ServiceNode.objects.all().order_by("pk")
+    s2.parent = s1
+    s2.save()
+    update_service_node_counts()
+    a, b = Municipality.objects.all().order_by("pk")
+
+    state = get_unit_count_state()
+    # Unit 1 is counted for node 1 once, although it belongs to its child too.
+    Unit.objects.get(pk=1).service_nodes.remove(s1)
+    Unit.objects.filter(pk=2).update(municipality=a)
+    Unit.objects.filter(pk=5).update(is_active=False)
+    Unit.objects.get(pk=4).service_nodes.add(s3)
+    Unit.objects.create(
+        id=6, name_fi="f", municipality=b, last_modified_time=MOD_TIME
+    ).service_nodes.add(s2)
+    update_service_node_counts(state)
+    incremental_counts = get_unit_counts(api_client)
+
+    call_command("verify_service_node_counts")
+    update_service_node_counts()
+    assert incremental_counts == get_unit_counts(api_client)
+    assert incremental_counts[1]["municipality"] == {"a": 2, "b": 1, "_unknown": 1}
+    assert incremental_counts[2]["municipality"] == {"a": 1, "b": 1, "_unknown": 1}
+    assert incremental_counts[3]["municipality"] == {"a": 1}
+
+
+@pytest.mark.django_db
+def test_service_node_counts_without_division(units, api_client):
+    s1, s2, s3 = ServiceNode.objects.all().order_by("pk")
+    # The units of a municipality without a division are counted together
+    # with the units without a municipality.
+    c = Municipality.objects.create(id="c", name_fi="c")
+    Unit.objects.create(
+        id=6, name_fi="f", municipality=c, last_modified_time=MOD_TIME
+    ).service_nodes.add(s2)
+    update_service_node_counts()
+    assert (
+        ServiceNodeUnitCount.objects.filter(service_node=s2, division=None).count() == 1
+    )
+
+    state = get_unit_count_state()
+    for i in range(7, 9):
+        Unit.objects.create(
+            id=i, name_fi="unit %s" % i, last_modified_time=MOD_TIME
+        ).service_nodes.add(s2)
+    update_service_node_counts(state)
+
+    call_command("verify_service_node_counts")
+    assert (
+        ServiceNodeUnitCount.objects.filter(service_node=s2, division=None).count() == 1
+    )
+    assert get_unit_counts(api_client)[2]["municipality"] == {"a": 1, "_unknown": 4}
+
+
+@pytest.mark.django_db
+def test_verify_service_node_counts(units, api_client):
+    update_service_node_counts()
+    Unit.objects.get(pk=4).service_nodes.add(ServiceNode.objects.get(pk=3))
+    with pytest.raises(CommandError):
+        call_command("verify_service_node_counts")
+    call_command("verify_service_node_counts", "--fix")
+    call_command("verify_service_node_counts")
+    assert get_unit_counts(api_client)[3]["total"] == 2
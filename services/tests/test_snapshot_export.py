@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+import uuid
+
+import pytest
+from django.core.management import call_command
+from munigeo.models import AdministrativeDivision, AdministrativeDivisionType
+
+from services.models import Department, Service, ServiceNode, Unit
+
+from .utils import MOD_TIME
+
+
+@pytest.fixture
+def dataset():
+    department = Department.objects.create(uuid=uuid.uuid4(), name_fi="Kaupunki")
+    root = ServiceNode.objects.create(
+        id=1, name_fi="Kulttuuri", last_modified_time=MOD_TIME
+    )
+    ServiceNode.objects.create(
+        id=2, name_fi="Kirjastot", parent=root, last_modified_time=MOD_TIME
+    )
+    Service.objects.create(id=1, name_fi="Kirjasto", last_modified_time=MOD_TIME)
+    for i in range(3):
+        Unit.objects.create(
+            id=i + 1,
+            name_fi="unit %s" % i,
+            department=department,
+            last_modified_time=MOD_TIME,
+        )
+    Unit.objects.create(
+        id=4, name_fi="hidden", public=False, last_modified_time=MOD_TIME
+    )
+    division_type = AdministrativeDivisionType.objects.create(
+        type="muni", name="Municipality"
+    )
+    AdministrativeDivision.objects.create(
+        type=division_type,
+        name_fi="Turku",
+        ocd_id="ocd-division/country:fi/kunta:turku",
+    )
+
+
+def read_lines(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+@pytest.mark.django_db
+def test_export_snapshot(dataset, tmp_path):
+    call_command("export_snapshot", directory=str(tmp_path), chunk_size=2)
+    manifest = json.loads((tmp_path / "manifest.json").read_text())
+    files = {entry["name"]: entry for entry in manifest["files"]}
+
+    for name, entry in files.items():
+        content = (tmp_path / name).read_bytes()
+        assert entry["size"] == len(content)
+        assert entry["sha256"] == hashlib.sha256(content).hexdigest()
+    checksums = (tmp_path / "SHA256SUMS").read_text().splitlines()
+    assert len(checksums) == len(files)
+
+    units = [json.loads(line) for line in read_lines(tmp_path / "units.ndjson.gz")]
+    assert [unit["id"] for unit in units] == [1, 2, 3]
+    assert units[0]["name"] == {"fi": "unit 0"}
+    assert files["units.ndjson.gz"]["count"] == 3
+
+    service_nodes = [
+        json.loads(line) for line in read_lines(tmp_path / "service_nodes.ndjson.gz")
+    ]
+    assert [(node["id"], node["children"]) for node in service_nodes] == [
+        (1, [2]),
+        (2, []),
+    ]
+    assert files["services.ndjson.gz"]["count"] == 1
+    assert files["departments.ndjson.gz"]["count"] == 1
+
+    with gzip.open(tmp_path / "divisions.geojson.gz") as f:
+        divisions = json.load(f)
+    assert divisions["type"] == "FeatureCollection"
+    assert divisions["features"][0]["properties"]["name"]["fi"] == "Turku"
+    assert divisions["features"][0]["geometry"] is None
+
+    # The temporary files are removed.
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        list(files) + ["manifest.json", "SHA256SUMS"]
+    )
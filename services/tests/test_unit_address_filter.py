@@ -0,0 +1,71 @@
+import pytest
+from rest_framework.reverse import reverse
+
+from services.models import Unit
+from services.utils.address import get_address_regex, normalize_address
+
+from .utils import get, MOD_TIME
+
+
+@pytest.fixture
+def units():
+    for i, (address_fi, address_sv) in enumerate(
+        [
+            ("Kauppiaskatu 5", "Köpmansgatan 5"),
+            ("Kauppiaskatu 5 A", "Köpmansgatan 5 A"),
+            ("Kauppiaskatu 50", "Köpmansgatan 50"),
+            ("Kauppiaskatu 5-7", "Köpmansgatan 5-7"),
+            ("Linnankatu 3b, Turku", "Slottsgatan 3b, Åbo"),
+        ]
+    ):
+        Unit.objects.create(
+            id=i + 1,
+            name_fi="unit %s" % i,
+            street_address_fi=address_fi,
+            street_address_sv=address_sv,
+            last_modified_time=MOD_TIME,
+        )
+    return Unit.objects.all().order_by("pk")
+
+
+def get_unit_ids(api_client, **data):
+    response = get(api_client, reverse("unit-list"), data=data)
+    return sorted(unit["id"] for unit in response.data["results"])
+
+
+@pytest.mark.parametrize(
+    "address,expected",
+    [
+        ("Kauppiaskatu  5", "kauppiaskatu 5"),
+        ("Kauppiaskatu 5 - 7", "kauppiaskatu 5-7"),
+        ("Kauppiaskatu 5 A", "kauppiaskatu 5a"),
+        ("Linnankatu 3 B, Turku", "linnankatu 3b, turku"),
+        ("Linnankatu 3 Bastion", "linnankatu 3 bastion"),
+    ],
+)
+def test_normalize_address(address, expected):
+    assert normalize_address(address) == expected
+
+
+def test_get_address_regex():
+    assert get_address_regex("katu 5-7b") == r"katu\s+5\s*-\s*7\s*b($|\s|,|[a-z])"
+    assert get_address_regex("st. katu 5") == r"st\.\s+katu\s+5($|\s|,|[a-z])"
+
+
+@pytest.mark.django_db
+def test_address_filter(api_client, units):
+    assert get_unit_ids(api_client, address="Kauppiaskatu") == [1, 2, 3, 4]
+    assert get_unit_ids(api_client, address="kauppiaskatu") == [1, 2, 3, 4]
+    assert get_unit_ids(api_client, address="Kauppiaskatu 5") == [1, 2]
+    assert get_unit_ids(api_client, address="KAUPPIASKATU  5") == [1, 2]
+    assert get_unit_ids(api_client, address="Kauppiaskatu 5a") == [2]
+    assert get_unit_ids(api_client, address="Kauppiaskatu 5 - 7") == [4]
+    assert get_unit_ids(api_client, address="Kauppiaskatu 50") == [3]
+    assert get_unit_ids(api_client, address="Linnankatu 3 B, Turku") == [5]
+    assert get_unit_ids(api_client, address="Kauppiaskatu 5.") == []
+
+
+@pytest.mark.django_db
+def test_address_filter_language(api_client, units):
+    assert get_unit_ids(api_client, address="Köpmansgatan 5", language="sv") == [1, 2]
+    assert get_unit_ids(api_client, address="Slottsgatan 3b", language="sv") == [5]
@@ -0,0 +1,105 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+from munigeo.importer.sync import ModelSyncher
+from rest_framework.reverse import reverse
+
+from services.models import Unit, UnitChange
+
+from .utils import get, MOD_TIME
+
+
+@pytest.fixture
+def units():
+    for i in range(3):
+        Unit.objects.create(
+            id=i + 1, name_fi="unit %s" % i, last_modified_time=MOD_TIME
+        )
+    return Unit.objects.all().order_by("pk")
+
+
+def get_changes(api_client, **params):
+    response = get(api_client, reverse("unit-changes"), data=params)
+    return [(x["unit"], x["change_type"]) for x in response.data["results"]]
+
+
+@pytest.mark.django_db
+def test_unit_changes(api_client, units):
+    assert get_changes(api_client) == [
+        (1, UnitChange.CREATED),
+        (2, UnitChange.CREATED),
+        (3, UnitChange.CREATED),
+    ]
+    since = UnitChange.objects.last().time + datetime.timedelta(microseconds=1)
+
+    unit = units[0]
+    unit.name_fi = "renamed"
+    unit.save()
+    # Deletions of the importers are logged too.
+    syncher = ModelSyncher(Unit.objects.all(), lambda obj: obj.id)
+    syncher.mark(syncher.get(1))
+    syncher.mark(syncher.get(2))
+    syncher.finish()
+
+    assert get_changes(api_client, since=since.isoformat()) == [
+        (1, UnitChange.UPDATED),
+        (3, UnitChange.DELETED),
+    ]
+
+
+@pytest.mark.django_db
+def test_unit_changes_pagination(api_client, units):
+    UnitChange.record([4, 5], UnitChange.DELETED)
+    response = get(api_client, reverse("unit-changes"), data={"page_size": 2})
+    assert [x["unit"] for x in response.data["results"]] == [1, 2]
+    response = get(api_client, response.data["next"])
+    assert [x["unit"] for x in response.data["results"]] == [3, 4]
+    response = get(api_client, response.data["next"])
+    assert [x["unit"] for x in response.data["results"]] == [5]
+    assert response.data["next"] is None
+
+
+@pytest.mark.django_db
+def test_unit_changes_invalid_since(api_client):
+    response = api_client.get(reverse("unit-changes"), data={"since": "yesterday"})
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_unit_changes_hidden_units(api_client, units):
+    since = UnitChange.objects.last().time + datetime.timedelta(microseconds=1)
+    Unit.objects.create(
+        id=4, name_fi="unit 3", public=False, last_modified_time=MOD_TIME
+    )
+    units.get(pk=1).soft_delete()
+    # Units hidden without signals are not shown as updated either.
+    unit = units.get(pk=2)
+    unit.name_fi = "renamed"
+    unit.save()
+    Unit.objects.filter(pk=2).update(public=False)
+
+    assert get_changes(api_client, since=since.isoformat()) == [
+        (4, UnitChange.DELETED),
+        (1, UnitChange.DELETED),
+        (2, UnitChange.DELETED),
+    ]
+
+
+@pytest.mark.django_db
+def test_unit_changes_retention(api_client, units, settings):
+    settings.UNIT_CHANGE_RETENTION_DAYS = 30
+    old_time = timezone.now() - datetime.timedelta(days=31)
+    UnitChange.objects.filter(unit_id=1).update(time=old_time)
+
+    response = api_client.get(
+        reverse("unit-changes"), data={"since": old_time.isoformat()}
+    )
+    assert response.status_code == 400
+
+    call_command("prune_unit_changes")
+    assert get_changes(api_client) == [
+        (2, UnitChange.CREATED),
+        (3, UnitChange.CREATED),
+    ]
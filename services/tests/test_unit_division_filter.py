@@ -0,0 +1,77 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from munigeo.models import (
+    AdministrativeDivision,
+    AdministrativeDivisionGeometry,
+    AdministrativeDivisionType,
+)
+from rest_framework.reverse import reverse
+
+from services.divisions import DIVISIONS
+from services.models import Unit
+
+from .utils import get, MOD_TIME
+
+
+def make_square(x, y, size):
+    return MultiPolygon(
+        Polygon(
+            ((x, y), (x + size, y), (x + size, y + size), (x, y + size), (x, y)),
+            srid=3067,
+        ),
+        srid=3067,
+    )
+
+
+@pytest.fixture
+def divisions():
+    DIVISIONS.clear()
+    t, _ = AdministrativeDivisionType.objects.get_or_create(
+        id=1, type="district", defaults={"name": "District"}
+    )
+    for i, name in enumerate(["north", "south"]):
+        div = AdministrativeDivision.objects.create(
+            id=i + 1,
+            type=t,
+            name_fi=name,
+            ocd_id="ocd-division/country:fi/kunta:turku/district:%s" % name,
+        )
+        AdministrativeDivisionGeometry.objects.create(
+            division=div, boundary=make_square(0, i * 1000, 1000)
+        )
+    return AdministrativeDivision.objects.all().order_by("pk")
+
+
+@pytest.fixture
+def units():
+    for i, (x, y) in enumerate([(500, 500), (500, 1500), (5000, 5000)]):
+        Unit.objects.create(
+            id=i + 1,
+            name_fi="unit %s" % i,
+            location=Point(x, y, srid=3067),
+            last_modified_time=MOD_TIME,
+        )
+    return Unit.objects.all().order_by("pk")
+
+
+def get_unit_ids(api_client, division):
+    response = get(api_client, reverse("unit-list"), data={"division": division})
+    return sorted(unit["id"] for unit in response.data["results"])
+
+
+@pytest.mark.django_db
+def test_division_filter(api_client, divisions, units):
+    assert get_unit_ids(api_client, "turku/district:north") == [1]
+    assert get_unit_ids(api_client, "turku/district:south") == [2]
+    assert get_unit_ids(api_client, "turku/district:north,turku/district:south") == [
+        1,
+        2,
+    ]
+
+
+@pytest.mark.django_db
+def test_division_filter_unknown_division(api_client, divisions, units):
+    response = api_client.get(
+        reverse("unit-list"), data={"division": "turku/district:east"}
+    )
+    assert response.status_code == 400
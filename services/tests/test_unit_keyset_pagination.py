@@ -0,0 +1,42 @@
+import pytest
+from rest_framework.reverse import reverse
+
+from services.models import Unit
+
+from .utils import get, MOD_TIME
+
+
+@pytest.fixture
+def units():
+    for i in range(1, 6):
+        Unit.objects.create(id=i, name_fi="unit %s" % i, last_modified_time=MOD_TIME)
+    return Unit.objects.all().order_by("pk")
+
+
+@pytest.mark.django_db
+def test_unit_keyset_pagination(api_client, units):
+    response = get(
+        api_client, reverse("unit-list"), data={"cursor": "", "page_size": 2}
+    )
+    assert "count" not in response.data
+    unit_ids = [unit["id"] for unit in response.data["results"]]
+    while response.data["next"]:
+        response = get(api_client, response.data["next"])
+        unit_ids += [unit["id"] for unit in response.data["results"]]
+    assert unit_ids == [5, 4, 3, 2, 1]
+
+
+@pytest.mark.django_db
+def test_unit_keyset_pagination_estimated_count(api_client, units):
+    response = get(
+        api_client, reverse("unit-list"), data={"cursor": "", "count": "estimate"}
+    )
+    assert isinstance(response.data["estimated_count"], int)
+
+
+@pytest.mark.django_db
+def test_unit_keyset_pagination_distance_ordering(api_client, units):
+    response = api_client.get(
+        reverse("unit-list"), data={"cursor": "", "lat": "60.45", "lon": "22.26"}
+    )
+    assert response.status_code == 400
@@ -0,0 +1,40 @@
+import pytest
+from django.contrib.gis.geos import Point
+from rest_framework.reverse import reverse
+
+from services.models import Unit
+
+from .utils import get, MOD_TIME
+
+
+@pytest.fixture
+def units():
+    # Units east of the origin point at 3 km, 1 km, 2 km and 10 km.
+    origin = Point(22.25, 60.45, srid=4326).transform(3067, clone=True)
+    for i, offset in enumerate([3000, 1000, 2000, 10000]):
+        Unit.objects.create(
+            id=i + 1,
+            name_fi="unit %s" % i,
+            location=Point(origin.x + offset, origin.y, srid=3067),
+            last_modified_time=MOD_TIME,
+        )
+    return Unit.objects.all().order_by("pk")
+
+
+@pytest.mark.django_db
+def test_units_nearest_first(api_client, units):
+    response = get(api_client, reverse("unit-list"), data={"lat": 60.45, "lon": 22.25})
+    results = response.data["results"]
+    assert [unit["id"] for unit in results] == [2, 3, 1, 4]
+    assert [round(unit["distance"]) for unit in results] == [1000, 2000, 3000, 10000]
+
+
+@pytest.mark.django_db
+def test_units_nearest_first_within_distance(api_client, units):
+    response = get(
+        api_client,
+        reverse("unit-list"),
+        data={"lat": 60.45, "lon": 22.25, "distance": 2500, "page_size": 1},
+    )
+    assert response.data["count"] == 2
+    assert [unit["id"] for unit in response.data["results"]] == [2]
@@ -1,9 +1,17 @@
+import datetime
 import json
 import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from django.conf import settings
 from django.contrib.gis.geos import Point
 
+MOD_TIME = datetime.datetime(
+    year=2019, month=1, day=1, hour=1, minute=1, second=1, tzinfo=datetime.timezone.utc
+)
+
 
 def get(api_client, url, data=None):
     response = api_client.get(url, data=data, format="json")
@@ -30,3 +38,31 @@ def get_test_location(latitude, longitude, srid):
     point = Point(x=float(latitude), y=float(longitude), srid=srid)
     point.transform(settings.DEFAULT_SRID)
     return point
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Base class of the request handlers of the stub servers.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def stub_http_server(handler_class, path="/"):
+    """
+    Serve the requests with the given BaseHTTPRequestHandler subclass in a
+    background thread. The URL of the server is in its `url` attribute.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.url = "http://127.0.0.1:%s%s" % (server.server_address[1], path)
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,4 +1,7 @@
 from .accessibility_shortcoming_calculator import AccessibilityShortcomingCalculator
+from .address import filter_by_address
+from .concurrency import run_concurrently
+from .geo import order_by_nearest
 from .models import check_valid_concrete_field
 from .translator import get_translated
 from .types import strtobool
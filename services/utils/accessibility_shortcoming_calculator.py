@@ -1,6 +1,16 @@
+import hashlib
+import json
 import logging
 
-from services.accessibility import RULES
+from services.accessibility import (  # noqa: F401
+    AND,
+    CompiledRules,
+    EQ,
+    NEQ,
+    OperatorError,
+    OR,
+    RULES,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -41,9 +51,13 @@ PATH_TITLES = {
 }
 
 
-class OperatorError(Exception):
-    def __init__(self, operator):
-        self.message = "Invalid operator {}".format(operator)
+def get_properties_hash(properties_by_id):
+    """
+    Return a hash of the accessibility properties of a unit given as a dict
+    of variable id -> value.
+    """
+    data = json.dumps(sorted(properties_by_id.items()), ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf8")).hexdigest()
 
 
 class Singleton(type):
@@ -58,26 +72,71 @@ class Singleton(type):
 class AccessibilityShortcomingCalculator(object, metaclass=Singleton):
     def __init__(self):
         try:
-            self.rules, self.messages = RULES.get_data()
+            self._compiled = RULES.get_compiled()
+            self._rules = self._compiled.rules
+            self._messages = self._compiled.messages
         except FileNotFoundError as e:
             logger.error(e)
-            self.rules, self.messages = {}, []
+            self._rules, self._messages = {}, []
+            self._compiled = None
+
+    @property
+    def rules(self):
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules):
+        self._rules = rules
+        self._compiled = None
+
+    @property
+    def messages(self):
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages):
+        self._messages = messages
+        self._compiled = None
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self._compiled = CompiledRules(self._rules, self._messages)
+        return self._compiled
+
+    @property
+    def rules_hash(self):
+        return self.compiled.hash
+
+    @staticmethod
+    def get_properties(unit):
+        return {p.variable_id: p.value for p in unit.accessibility_properties.all()}
 
     def calculate(self, unit):
-        self.shortcomings = {}
-        properties_by_id = {
-            p.variable.id: p.value for p in unit.accessibility_properties.all()
-        }
-        profile_dict = {
-            profile_id: [
-                rule for rule in self.rules.keys() if rule[0] == str(profile_id)
-            ]
-            for profile_id in PROFILE_IDS.keys()
+        return self.calculate_from_properties(self.get_properties(unit))
+
+    def get_shortcomings_fields(self, properties_by_id):
+        """
+        Return the field values of UnitAccessibilityShortcomings for a unit
+        with the given properties, including the hashes of the inputs.
+        """
+        description, shortcoming_count = self.calculate_from_properties(
+            properties_by_id
+        )
+        return {
+            "accessibility_shortcoming_count": shortcoming_count,
+            "accessibility_description": description,
+            "accessibility_property_hash": get_properties_hash(properties_by_id),
+            "rules_hash": self.rules_hash,
         }
-        for profile_id, profiles in profile_dict.items():
-            for profile in profiles:
+
+    def calculate_from_properties(self, properties_by_id):
+        compiled = self.compiled
+        self.shortcomings = {}
+        for profile_id in PROFILE_IDS.keys():
+            for root in compiled.profile_roots.get(str(profile_id), []):
                 self._calculate_shortcomings(
-                    self.rules[profile], properties_by_id, {}, profile_id
+                    compiled, root, properties_by_id, {}, profile_id
                 )
         shortcomings = {}
         counts = {}
@@ -95,7 +154,7 @@ class AccessibilityShortcomingCalculator(object, metaclass=Singleton):
                     "profiles": [
                         {
                             "id": PROFILE_IDS[profile],
-                            "shortcomings": [self.messages[code] for code in codes],
+                            "shortcomings": [compiled.messages[code] for code in codes],
                         }
                         for profile, codes in profiles.items()
                     ],
@@ -105,81 +164,44 @@ class AccessibilityShortcomingCalculator(object, metaclass=Singleton):
             {PROFILE_IDS[profile]: count for profile, count in counts.items()},
         )
 
-    def _calculate_shortcomings(self, rule, properties, messages, profile_id):
-        if not isinstance(rule["operands"][0], dict):
+    def _calculate_shortcomings(self, compiled, node, properties, messages, profile_id):
+        operator = compiled.operators[node]
+        operands = compiled.operands[node]
+        if operator == EQ or operator == NEQ:
             # This is a leaf rule.
-            prop = properties.get(rule["operands"][0])
+            prop = properties.get(operands[0])
             # If the information is not supplied, pretend that everything is fine.
             if not prop:
-                logger.debug(
-                    "{}: No property {}".format(rule["id"], rule["operands"][0])
-                )
                 return True, False
 
-            if rule["operator"] not in ["EQ", "NEQ"]:
-                raise OperatorError(rule["operator"])
-
-            val = rule["operands"][1]
-            is_ok = (prop == val) if rule["operator"] == "EQ" else (prop != val)
-
-            message_recorded = (
-                self._record_shortcoming(rule, messages, profile_id)
-                if not is_ok
-                else False
-            )
-            logger.debug(
-                "{}: {} {}".format(
-                    rule["id"],
-                    rule["operator"],
-                    (
-                        "{}recorded".format("" if message_recorded else "not ")
-                        if not is_ok
-                        else "passed"
-                    ),
-                )
-            )
-            return is_ok, message_recorded
+            is_ok = (prop == operands[1]) if operator == EQ else (prop != operands[1])
+            if is_ok:
+                return True, False
+            return False, self._record_shortcoming(compiled, node, messages, profile_id)
 
         # This is a compound rule.
-        return_values = []
-        for op in rule["operands"]:
+        all_ok = True
+        for op in operands:
             is_ok, message_recorded = self._calculate_shortcomings(
-                op, properties, messages, profile_id
+                compiled, op, properties, messages, profile_id
             )
-            if rule["operator"] == "AND" and not is_ok and not message_recorded:
+            if operator == AND and not is_ok and not message_recorded:
                 # Short circuit AND evaluation when no message was emitted. This edge case is required!
                 # NOTE: No messages are emitted from the AND clause itself.
-                logger.debug("{}: AND short circuited".format(rule["id"]))
                 return False, False
-            if rule["operator"] == "OR" and is_ok:
+            if operator == OR and is_ok:
                 # Short circuit with OR too when matching satisfying condition found.
-                logger.debug("{}: OR short circuited".format(rule["id"]))
                 return True, False
-            return_values.append(is_ok)
-
-        if rule["operator"] not in ["AND", "OR"]:
-            raise OperatorError(rule["operator"])
+            all_ok = all_ok and is_ok
 
-        if rule["operator"] == "AND" and False not in return_values:
-            logger.debug("{}: AND met".format(rule["id"]))
-            return True, False
-        if rule["operator"] == "OR" and True in return_values:
-            # This condition is never met due to OR short circuiting above
-            logger.debug("{}: OR met".format(rule["id"]))
+        if operator == AND and all_ok:
             return True, False
 
-        message_recorded = self._record_shortcoming(rule, messages, profile_id)
-        logger.debug(
-            "{}: {} {}".format(
-                rule["id"],
-                rule["operator"],
-                "{}recorded".format("" if message_recorded else "not "),
-            )
-        )
-        return False, message_recorded
+        return False, self._record_shortcoming(compiled, node, messages, profile_id)
 
-    def _record_shortcoming(self, rule, messages, profile_id):
-        if rule["msg"] is None or rule["msg"] >= len(self.messages):
+    def _record_shortcoming(self, compiled, node, messages, profile_id):
+        msg = compiled.message_ids[node]
+        if msg is None:
             return False
 
         def record(segment, message):
@@ -189,16 +211,16 @@ class AccessibilityShortcomingCalculator(object, metaclass=Singleton):
             )
             self.shortcomings[profile_id][segment].add(message)
 
-        segment = rule["path"][0]
-        requirement_id = rule["requirement_id"]
+        segment = compiled.segments[node]
+        requirement_id = compiled.requirement_ids[node]
         messages[segment] = messages.get(segment, {})
         messages[segment][requirement_id] = messages[segment].get(requirement_id, [])
-        if rule["id"] == requirement_id:
+        if compiled.ids[node] == requirement_id:
             # This is a top level requirement - only add top level message if there are no specific messages.
             if not messages[segment][requirement_id]:
-                messages[segment][requirement_id].append(rule["msg"])
-                record(segment, rule["msg"])
+                messages[segment][requirement_id].append(msg)
+                record(segment, msg)
         else:
-            messages[segment][requirement_id].append(rule["msg"])
-            record(segment, rule["msg"])
+            messages[segment][requirement_id].append(msg)
+            record(segment, msg)
         return True
@@ -0,0 +1,56 @@
+import re
+
+from django.db.models.functions import Lower
+
+# A house number, e.g. "5", "5-7", "5a" or "5-7b" in the normalized form.
+HOUSE_NUMBER_RE = re.compile(r"^(\d+)(?:-(\d+))?([a-zåäö])?(,?)$")
+
+
+def normalize_address(address):
+    """
+    Return the address in lowercase with the whitespace collapsed and
+    removed from the house number ranges and between the house numbers and
+    their letters, e.g. "Kauppiaskatu  5 - 7 B" -> "kauppiaskatu 5-7b".
+    """
+    address = " ".join(address.lower().split())
+    address = re.sub(r"(\d) ?- ?(?=\d)", r"\1-", address)
+    address = re.sub(r"(\d) ([a-zåäö])(?=[ ,]|$)", r"\1\2", address)
+    return address
+
+
+def get_address_regex(address):
+    """
+    Return a regular expression matching the normalized address. The
+    house number ranges and letters match with or without whitespace and
+    the match must not end in the middle of a house number, e.g. "katu 5"
+    matches "katu 5", "katu 5 a" and "katu 5, turku" but not "katu 50".
+    """
+    parts = []
+    for token in address.split(" "):
+        match = HOUSE_NUMBER_RE.match(token)
+        if match:
+            number, end, letter, comma = match.groups()
+            part = number
+            if end:
+                part += r"\s*-\s*" + end
+            if letter:
+                part += r"\s*" + letter
+            part += comma
+        else:
+            part = re.escape(token)
+        parts.append(part)
+    return r"\s+".join(parts) + r"($|\s|,|[a-z])"
+
+
+def filter_by_address(queryset, field_name, address):
+    """
+    Filter the queryset by the address in the given street address field.
+    A single word matches the start of the address, more words match
+    anywhere in it. The matching is done on the lowercased field, which
+    has a trigram index, so the query does not scan all the rows.
+    """
+    address = normalize_address(address)
+    queryset = queryset.alias(_normalized_address=Lower(field_name))
+    if " " not in address:
+        return queryset.filter(_normalized_address__startswith=address)
+    return queryset.filter(_normalized_address__regex=get_address_regex(address))
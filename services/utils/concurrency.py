@@ -0,0 +1,46 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.CONCURRENT_QUERY_WORKERS,
+                thread_name_prefix="query",
+            )
+        return _executor
+
+
+def _run_in_worker(func):
+    # The worker threads have their own database connections, which are
+    # reused or closed according to CONN_MAX_AGE as in request threads.
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(*funcs):
+    """
+    Call the given functions, which typically evaluate independent
+    querysets, and return their results in the same order. The functions
+    are run in a shared thread pool when settings.CONCURRENT_QUERIES is
+    set, otherwise one after another in the calling thread.
+
+    The functions must not depend on uncommitted changes of the calling
+    thread as the worker threads use separate database connections.
+    """
+    if not settings.CONCURRENT_QUERIES or len(funcs) < 2:
+        return [func() for func in funcs]
+    executor = get_executor()
+    futures = [executor.submit(_run_in_worker, func) for func in funcs]
+    return [future.result() for future in futures]
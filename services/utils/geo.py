@@ -0,0 +1,31 @@
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+
+def order_by_nearest(queryset, field_name, point):
+    """
+    Annotate the queryset with the distance from the point and order it
+    nearest first.
+
+    The ordering uses the PostGIS KNN operator `<->`, which walks the GiST
+    index of the field in distance order. With a LIMIT only the rows of the
+    page are read and only their exact distance is computed, instead of
+    computing the distance of every row and sorting them.
+    """
+    field = queryset.model._meta.get_field(field_name)
+    queryset = queryset.annotate(distance=Distance(field_name, point))
+    if field.geodetic(connection):
+        # On lon/lat geometries `<->` orders by degrees, so the distance is
+        # computed on the geography, which has an expression index.
+        column = "%s.%s" % (
+            connection.ops.quote_name(queryset.model._meta.db_table),
+            connection.ops.quote_name(field.column),
+        )
+        knn = RawSQL(
+            "%s::geography <-> %%s::geography" % column,
+            (point.transform(4326, clone=True).ewkt,),
+        )
+    else:
+        knn = GeometryDistance(field_name, point)
+    return queryset.order_by(knn)
@@ -1,13 +1,31 @@
+import logging
+
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.http import HttpResponse, HttpResponseBadRequest
-from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseNotAllowed
+
+from services.http_client import CircuitOpenError, HTTPClient
+
+logger = logging.getLogger(__name__)
 
+OPEN311_CLIENT = HTTPClient(
+    "open311",
+    connect_timeout=settings.OPEN311["CONNECT_TIMEOUT"],
+    read_timeout=settings.OPEN311["READ_TIMEOUT"],
+    retries=settings.OPEN311["RETRIES"],
+    failure_threshold=settings.OPEN311["CIRCUIT_BREAKER_THRESHOLD"],
+    reset_timeout=settings.OPEN311["CIRCUIT_BREAKER_TIMEOUT"],
+)
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def post_service_request(request):
+
+async def post_service_request(request):
+    # The view is asynchronous so that waiting for the Open311 API does not
+    # hold a worker thread when the application is run with ASGI. The
+    # decorators of Django 4.1 do not support asynchronous views, hence
+    # the method check and csrf_exempt below.
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
     payload = request.POST.copy()
     outgoing = payload.dict()
     if outgoing.get("internal_feedback", False):
@@ -18,7 +36,6 @@ def post_service_request(request):
         api_key = settings.OPEN311["API_KEY"]
     outgoing["api_key"] = api_key
     url = settings.OPEN311["URL_BASE"]
-    session = requests.Session()
 
     # Modify parameters for request in case of City of Turku
     if "smbackend_turku" in settings.INSTALLED_APPS:
@@ -27,8 +44,17 @@ def post_service_request(request):
         outgoing["address_string"] = "null"
         outgoing["service_code"] = settings.OPEN311["SERVICE_CODE"]
 
-    r = session.post(url, data=outgoing)
+    try:
+        r = await sync_to_async(OPEN311_CLIENT.post, thread_sensitive=False)(
+            url, data=outgoing
+        )
+    except (CircuitOpenError, requests.RequestException) as e:
+        logger.warning(f"Open311 request failed: {e}")
+        return HttpResponse(status=503)
     if r.status_code != 200:
         return HttpResponseBadRequest()
 
     return HttpResponse(r.content, content_type="application/json")
+
+
+post_service_request.csrf_exempt = True
@@ -36,8 +36,28 @@ env = environ.Env(
     OPEN311_API_KEY=(str, None),
     OPEN311_INTERNAL_API_KEY=(str, None),
     OPEN311_SERVICE_CODE=(str, None),
+    OPEN311_CONNECT_TIMEOUT=(float, 3.05),
+    OPEN311_READ_TIMEOUT=(float, 10.0),
+    OPEN311_RETRIES=(int, 2),
+    OPEN311_CIRCUIT_BREAKER_THRESHOLD=(int, 5),
+    OPEN311_CIRCUIT_BREAKER_TIMEOUT=(int, 30),
     SHORTCUTTER_UNIT_URL=(str, None),
     ADDRESS_SEARCH_RADIUS=(int, 50),
+    DIVISION_CACHE_TIMEOUT=(int, 3600),
+    DEPARTMENT_CACHE_CHECK_INTERVAL=(int, 10),
+    MUNICIPALITY_CACHE_CHECK_INTERVAL=(int, 10),
+    SERVICE_NODE_TREE_DIR=(str, BASE_DIR + "/var/service_node_tree"),
+    SNAPSHOT_EXPORT_DIR=(str, None),
+    SNAPSHOT_EXPORT_CHUNK_SIZE=(int, 2000),
+    SERVICES_IMPORT_CACHE_DIR=(str, BASE_DIR + "/var/services_import"),
+    SERVICES_IMPORT_FETCH_WORKERS=(int, 4),
+    UNIT_COUNT_DIVISION_TYPES=(list, []),
+    RESPONSE_CACHE_WARMING_URLS=(int, 50),
+    RESPONSE_CACHE_WARMING_DELAY=(int, 60),
+    RESPONSE_CACHE_TRAFFIC_SIZE=(int, 1000),
+    UNIT_CHANGE_RETENTION_DAYS=(int, 90),
+    CONCURRENT_QUERIES=(bool, False),
+    CONCURRENT_QUERY_WORKERS=(int, 8),
     TURKU_API_KEY=(str, None),
     ACCESSIBILITY_SYSTEM_ID=(str, None),
     ADDITIONAL_INSTALLED_APPS=(list, None),
@@ -46,6 +66,7 @@ env = environ.Env(
     TURKU_WFS_URL=(str, None),
     GEO_SEARCH_LOCATION=(str, None),
     GEO_SEARCH_API_KEY=(str, None),
+    GEO_SEARCH_WORKERS=(int, 4),
     PTV_ID_OFFSET=(int, None),
     ECO_COUNTER_STATIONS_URL=(str, None),
     ECO_COUNTER_OBSERVATIONS_URL=(str, None),
@@ -132,7 +153,7 @@ INSTALLED_APPS = [
     "drf_spectacular",
     "munigeo",
     "services.apps.ServicesConfig",
-    "observations",
+    "observations.apps.ObservationsConfig",
     "eco_counter.apps.EcoCounterConfig",
     "mobility_data.apps.MobilityDataConfig",
     "bicycle_network.apps.BicycleNetworkConfig",
@@ -165,12 +186,17 @@ if env("ADDITIONAL_MIDDLEWARE"):
 
 ROOT_URLCONF = "smbackend.urls"
 WSGI_APPLICATION = "smbackend.wsgi.application"
+ASGI_APPLICATION = "smbackend.asgi.application"
 
 # Database
 DATABASES = {"default": env.db()}
 
 # Keep the database connection open for 120s
 CONN_MAX_AGE = 120
+# Run the independent queries of e.g. the search concurrently in a thread
+# pool. Every worker thread uses a database connection of its own.
+CONCURRENT_QUERIES = env("CONCURRENT_QUERIES")
+CONCURRENT_QUERY_WORKERS = env("CONCURRENT_QUERY_WORKERS")
 
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
@@ -201,6 +227,31 @@ TASTYPIE_DEFAULT_FORMATS = ["json"]
 
 DEFAULT_SRID = 3067  # ETRS TM35-FIN
 ADDRESS_SEARCH_RADIUS = env("ADDRESS_SEARCH_RADIUS")
+# Seconds the resolved administrative divisions used by the `division`
+# filters are kept in the process-local cache.
+DIVISION_CACHE_TIMEOUT = env("DIVISION_CACHE_TIMEOUT")
+# Seconds between the checks of the import generation of the process-local
+# department tree cache.
+DEPARTMENT_CACHE_CHECK_INTERVAL = env("DEPARTMENT_CACHE_CHECK_INTERVAL")
+# Seconds between the checks of the generation of the process-local
+# municipality cache.
+MUNICIPALITY_CACHE_CHECK_INTERVAL = env("MUNICIPALITY_CACHE_CHECK_INTERVAL")
+# Directory where the prebuilt service node trees are stored.
+SERVICE_NODE_TREE_DIR = env("SERVICE_NODE_TREE_DIR")
+# Administrative division types for which the unit counts of services and
+# service nodes are precomputed. All division types are used if empty.
+UNIT_COUNT_DIVISION_TYPES = env("UNIT_COUNT_DIVISION_TYPES")
+# Number of the most requested URLs replayed per domain to warm the response
+# cache after an import, 0 disables the warming.
+RESPONSE_CACHE_WARMING_URLS = env("RESPONSE_CACHE_WARMING_URLS")
+# Seconds to wait after an import before warming, so that consecutive
+# imports of the same domain are warmed only once.
+RESPONSE_CACHE_WARMING_DELAY = env("RESPONSE_CACHE_WARMING_DELAY")
+# Number of distinct requests per domain and day kept for the warming.
+RESPONSE_CACHE_TRAFFIC_SIZE = env("RESPONSE_CACHE_TRAFFIC_SIZE")
+# Days the unit change log is kept for the API clients syncing the units.
+# Older changes are removed by the prune_unit_changes command.
+UNIT_CHANGE_RETENTION_DAYS = env("UNIT_CHANGE_RETENTION_DAYS")
 # The Finnish national grid coordinates in TM35-FIN according to JHS-180
 # specification. We use it as a bounding box.
 BOUNDING_BOX = [-548576, 6291456, 1548576, 8388608]
@@ -248,6 +299,15 @@ OPEN311 = {
     "API_KEY": env("OPEN311_API_KEY"),
     "INTERNAL_FEEDBACK_API_KEY": env("OPEN311_INTERNAL_API_KEY"),
     "SERVICE_CODE": env("OPEN311_SERVICE_CODE"),
+    # Timeouts in seconds of the requests to the Open311 API.
+    "CONNECT_TIMEOUT": env("OPEN311_CONNECT_TIMEOUT"),
+    "READ_TIMEOUT": env("OPEN311_READ_TIMEOUT"),
+    # Number of retries of failed connections and 502/503 responses.
+    "RETRIES": env("OPEN311_RETRIES"),
+    # The requests fail fast for CIRCUIT_BREAKER_TIMEOUT seconds after
+    # CIRCUIT_BREAKER_THRESHOLD consecutive failures.
+    "CIRCUIT_BREAKER_THRESHOLD": env("OPEN311_CIRCUIT_BREAKER_THRESHOLD"),
+    "CIRCUIT_BREAKER_TIMEOUT": env("OPEN311_CIRCUIT_BREAKER_TIMEOUT"),
 }
 
 # Shortcut generation URL template
@@ -272,6 +332,15 @@ STATIC_URL = env("STATIC_URL")
 WHITENOISE_STATIC_PREFIX = "/static/"
 MEDIA_ROOT = env("MEDIA_ROOT")
 MEDIA_URL = env("MEDIA_URL")
+# Directory of the dataset snapshot export, served as static downloads
+# under MEDIA_URL by default.
+SNAPSHOT_EXPORT_DIR = env("SNAPSHOT_EXPORT_DIR") or os.path.join(MEDIA_ROOT, "snapshot")
+# Number of rows fetched at a time from the database by the export.
+SNAPSHOT_EXPORT_CHUNK_SIZE = env("SNAPSHOT_EXPORT_CHUNK_SIZE")
+# Directory of the responses cached by services_import_v4 --cached.
+SERVICES_IMPORT_CACHE_DIR = env("SERVICES_IMPORT_CACHE_DIR")
+# Maximum number of resources services_import_v4 fetches concurrently.
+SERVICES_IMPORT_FETCH_WORKERS = env("SERVICES_IMPORT_FETCH_WORKERS")
 
 REST_FRAMEWORK = {
     "PAGE_SIZE": 20,
@@ -431,6 +500,8 @@ TURKU_WFS_URL = env("TURKU_WFS_URL")
 PTV_ID_OFFSET = env("PTV_ID_OFFSET")
 GEO_SEARCH_LOCATION = env("GEO_SEARCH_LOCATION")
 GEO_SEARCH_API_KEY = env("GEO_SEARCH_API_KEY")
+# Number of threads fetching the pages of the geo-search addresses.
+GEO_SEARCH_WORKERS = env("GEO_SEARCH_WORKERS")
 ECO_COUNTER_OBSERVATIONS_URL = env("ECO_COUNTER_OBSERVATIONS_URL")
 ECO_COUNTER_STATIONS_URL = env("ECO_COUNTER_STATIONS_URL")
 TRAFFIC_COUNTER_OBSERVATIONS_BASE_URL = env("TRAFFIC_COUNTER_OBSERVATIONS_BASE_URL")
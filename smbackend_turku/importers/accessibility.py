@@ -1,8 +1,13 @@
+import time
+
 from munigeo.importer.sync import ModelSyncher
 
+from services.import_runs import add_import_rows
 from services.models import (
     AccessibilityVariable,
+    Unit,
     UnitAccessibilityProperty,
+    UnitChange,
     UnitIdentifier,
 )
 from smbackend_turku.importers.utils import (
@@ -11,11 +16,19 @@ from smbackend_turku.importers.utils import (
     get_ar_servicepoint_resource,
 )
 
+BATCH_SIZE = 1000
+UNIT_ACCESSIBILITY_FIELDS = [
+    "accessibility_phone",
+    "accessibility_email",
+    "accessibility_www",
+]
+
 
 class AccessibilityImporter:
     def __init__(self, logger):
         self.logger = logger
         self.__accessibility_variable_cache = {}
+        self.__unit_id_cache = None
 
     def import_accessibility(self):
         self._import_accessibility_variables()
@@ -32,64 +45,130 @@ class AccessibilityImporter:
 
         return self.__accessibility_variable_cache
 
+    @property
+    def _unit_ids(self):
+        """
+        Return a dict of the unit ids by their PTV ids.
+        """
+        if self.__unit_id_cache is None:
+            self.__unit_id_cache = dict(
+                UnitIdentifier.objects.filter(namespace="ptv").values_list(
+                    "value", "unit_id"
+                )
+            )
+        return self.__unit_id_cache
+
+    def _log_rate(self, name, count, started_at):
+        elapsed = time.monotonic() - started_at
+        self.logger.info(
+            "Handled {} {} in {:.1f} s, {:.1f} rows/s".format(
+                count, name, elapsed, count / elapsed if elapsed else 0
+            )
+        )
+        add_import_rows(count)
+
     def _import_accessibility_variables(self):
-        num_of_imports = 0
+        variables = self._accessibility_variables
+        new_variables = {}
+        updated_variables = []
 
-        variables = get_ar_resource("accessibility/variables")
-        for variable in variables:
+        for variable in get_ar_resource("accessibility/variables"):
             variable_name = variable.get("variableName")
             variable_id = variable.get("variableId")
             if not (variable_name and variable_id):
                 continue
-            (
-                accessibility_variable,
-                created,
-            ) = AccessibilityVariable.objects.update_or_create(
-                id=variable_id, defaults={"name": variable_name}
-            )
-            self.__accessibility_variable_cache[variable_id] = accessibility_variable
-            if created:
-                num_of_imports += 1
+            accessibility_variable = variables.get(variable_id)
+            if accessibility_variable is None:
+                new_variables[variable_id] = AccessibilityVariable(
+                    id=variable_id, name=variable_name
+                )
+            elif accessibility_variable.name != variable_name:
+                accessibility_variable.name = variable_name
+                updated_variables.append(accessibility_variable)
 
-        self.logger.info("Imported {} accessibility variables.".format(num_of_imports))
+        AccessibilityVariable.objects.bulk_create(
+            new_variables.values(), batch_size=BATCH_SIZE
+        )
+        AccessibilityVariable.objects.bulk_update(
+            updated_variables, ["name"], batch_size=BATCH_SIZE
+        )
+        variables.update(new_variables)
+
+        self.logger.info(
+            "Imported {} accessibility variables.".format(len(new_variables))
+        )
 
     def _update_unit_accessibility_info(self):
-        num_of_updated_units = 0
+        started_at = time.monotonic()
+        service_points = {}
+        unmatched_ptv_ids = set()
 
-        service_points = get_ar_servicepoint_resource()
-        for service_point in service_points:
+        for service_point in get_ar_servicepoint_resource():
             ptv_id = service_point.get("servicePointId")
             if not ptv_id:
                 continue
-
-            try:
-                unit_identifier = UnitIdentifier.objects.get(
-                    namespace="ptv", value=ptv_id
-                )
-                unit = unit_identifier.unit
-            except UnitIdentifier.DoesNotExist:
+            unit_id = self._unit_ids.get(ptv_id)
+            if unit_id is None:
+                unmatched_ptv_ids.add(ptv_id)
                 continue
+            service_points[unit_id] = service_point
 
-            changed = self._set_unit_accesibility_properties(unit, service_point)
-            if changed:
-                unit.save()
-                num_of_updated_units += 1
+        units = Unit.objects.filter(id__in=service_points).only(
+            "id", *UNIT_ACCESSIBILITY_FIELDS
+        )
+        updated_units = [
+            unit
+            for unit in units
+            if self._set_unit_accesibility_properties(unit, service_points[unit.id])
+        ]
+        # The accessibility contact fields are not in the search columns, so
+        # only the changes of the units are recorded in addition to the
+        # update.
+        Unit.objects.bulk_update(
+            updated_units, UNIT_ACCESSIBILITY_FIELDS, batch_size=BATCH_SIZE
+        )
+        UnitChange.record([unit.id for unit in updated_units], UnitChange.UPDATED)
 
-        self.logger.info("Updated {} units.".format(num_of_updated_units))
+        self.logger.info("Updated {} units.".format(len(updated_units)))
+        if unmatched_ptv_ids:
+            self.logger.info(
+                "No units for {} service points: {}".format(
+                    len(unmatched_ptv_ids), ", ".join(sorted(unmatched_ptv_ids))
+                )
+            )
+        self._log_rate(
+            "service points", len(service_points) + len(unmatched_ptv_ids), started_at
+        )
 
     def _import_unit_accessibility_properties(self):
+        started_at = time.monotonic()
+        deleted_ids = []
+
+        def delete_property(obj):
+            deleted_ids.append(obj.id)
+            return True
+
+        existing_properties = list(UnitAccessibilityProperty.objects.all())
         property_syncher = ModelSyncher(
-            UnitAccessibilityProperty.objects.all(), lambda obj: obj.id
+            existing_properties, lambda obj: obj.id, delete_func=delete_property
         )
-        num_of_imports = 0
+        properties_by_key = {
+            (obj.unit_id, obj.variable_id): obj for obj in existing_properties
+        }
 
+        # The values of the properties by the unit and variable ids. The
+        # last value wins if the source contains the same property twice.
+        values = {}
         # For caching unit ids that are not present in the database
         unit_skip_list = set([])
+        skipped_variable_ids = set()
+        num_of_rows = 0
 
         accessibility_properties = get_ar_servicepoint_accessibility_resource(
             "properties"
         )
         for accessibility_property in accessibility_properties:
+            num_of_rows += 1
             # Make sure that we have all the necessary property attributes
             ptv_id = accessibility_property.get("servicePointId")
             accessibility_variable_id = accessibility_property.get("variableId")
@@ -99,57 +178,67 @@ class AccessibilityImporter:
             ):
                 continue
 
-            # No need to check further if the unit has already been marked as non-existing
-            if ptv_id in unit_skip_list:
-                continue
-
             # Make sure that the unit exists
-            try:
-                # TODO: Optimize this if it gets too slow
-                # One way is to get all unit ids in one go and make a lookup table
-                unit_identifier = UnitIdentifier.objects.get(
-                    namespace="ptv", value=ptv_id
-                )
-                unit = unit_identifier.unit
-            except UnitIdentifier.DoesNotExist:
-                self.logger.info("Unit {} does not exist, skipping".format(ptv_id))
+            unit_id = self._unit_ids.get(ptv_id)
+            if unit_id is None:
                 unit_skip_list.add(ptv_id)
                 continue
 
             # Make sure that the variable exists
             if accessibility_variable_id not in self._accessibility_variables:
-                self.logger.info("No variable {}, skipping".format(ptv_id))
+                skipped_variable_ids.add(accessibility_variable_id)
                 continue
 
-            # Create or update the property including its associated value
-            uap, created = UnitAccessibilityProperty.objects.update_or_create(
-                unit=unit,
-                variable_id=accessibility_variable_id,
-                defaults={"value": accessibility_variable_value},
-            )
-
-            # If an entry was updated
-            if not created:
-                # Mark it as synced
-                sync_uap = property_syncher.get(uap.id)
-                if sync_uap:
-                    property_syncher.mark(sync_uap)
-
-            if created:
-                num_of_imports += 1
+            values[(unit_id, accessibility_variable_id)] = accessibility_variable_value
+
+        new_properties = []
+        updated_properties = []
+        for (unit_id, variable_id), value in values.items():
+            uap = properties_by_key.get((unit_id, variable_id))
+            if uap is None:
+                new_properties.append(
+                    UnitAccessibilityProperty(
+                        unit_id=unit_id, variable_id=variable_id, value=value
+                    )
+                )
+                continue
+            property_syncher.mark(uap)
+            if uap.value != value:
+                uap.value = value
+                updated_properties.append(uap)
 
+        UnitAccessibilityProperty.objects.bulk_create(
+            new_properties, batch_size=BATCH_SIZE
+        )
+        UnitAccessibilityProperty.objects.bulk_update(
+            updated_properties, ["value"], batch_size=BATCH_SIZE
+        )
         property_syncher.finish()
-        self.logger.info("Imported {} accessibility properties.".format(num_of_imports))
+        UnitAccessibilityProperty.objects.filter(id__in=deleted_ids).delete()
+
+        self.logger.info(
+            "Imported {} accessibility properties, updated {} and deleted {}.".format(
+                len(new_properties), len(updated_properties), len(deleted_ids)
+            )
+        )
+        if unit_skip_list:
+            self.logger.info(
+                "No units for {} service points, skipped their properties: {}".format(
+                    len(unit_skip_list), ", ".join(sorted(unit_skip_list))
+                )
+            )
+        if skipped_variable_ids:
+            self.logger.info(
+                "No variables {}, skipped their properties".format(
+                    ", ".join(str(id) for id in sorted(skipped_variable_ids))
+                )
+            )
+        self._log_rate("accessibility properties", num_of_rows, started_at)
 
     def _set_unit_accesibility_properties(self, unit, accessiblity_entry):
-        accessibility_properties = [
-            "accessibility_phone",
-            "accessibility_email",
-            "accessibility_www",
-        ]
         changed = False
 
-        for accessibility_property in accessibility_properties:
+        for accessibility_property in UNIT_ACCESSIBILITY_FIELDS:
             entry_value = accessiblity_entry.get(accessibility_property)
             unit_value = getattr(unit, accessibility_property)
             if entry_value == unit_value:
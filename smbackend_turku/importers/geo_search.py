@@ -1,6 +1,6 @@
 from datetime import datetime
-from queue import Empty, Queue
-from threading import Thread
+from queue import Empty, Full, Queue
+from threading import Event, Thread
 
 import requests
 import urllib3
@@ -12,6 +12,7 @@ from munigeo.models import Address, PostalCodeArea, Street
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 
+from services.import_runs import add_import_rows, import_phase
 from smbackend_turku.importers.utils import get_municipality
 
 SOURCE_DATA_SRID = 4326
@@ -19,9 +20,12 @@ TARGET_DATA_SRID = 3067
 SOURCE_SRS = SpatialReference(SOURCE_DATA_SRID)
 TARGET_SRS = SpatialReference(TARGET_DATA_SRID)
 PAGE_SIZE = 1000
-# Determines how many threads are run simultaneously when importing addresses
-THREAD_POOL_SIZE = 2
+# Maximum number of fetched and parsed pages waiting in the queues of the
+# import, which bounds the memory used when fetching is faster than writing.
+QUEUE_SIZE = 4
 BASE_URL = settings.GEO_SEARCH_LOCATION
+# Marks the end of the pages in the queues of the import.
+DONE = object()
 
 # Contains the municipalities to import
 # Note, # 202: ("Kaarina", "S:t Karins"), and  # 853: ("Turku", "Åbo"),
@@ -61,6 +65,19 @@ ENRICH_MUNICIPALITIES = {
 }
 
 
+def put(queue, item, stop):
+    """
+    Put the item to the bounded queue unless the import is stopped, e.g.
+    because another thread has failed.
+    """
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=0.1)
+            return
+        except Full:
+            continue
+
+
 class GeoSearchImporter:
     addresses_imported = 0
     streets_imported = 0
@@ -91,8 +108,11 @@ class GeoSearchImporter:
     http.mount("https://", adapter)
     http.mount("http://", adapter)
 
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, workers=None, base_url=None, municipalities=None):
         self.logger = logger
+        self.workers = workers or settings.GEO_SEARCH_WORKERS
+        self.base_url = base_url or BASE_URL
+        self.municipalities = municipalities or MUNICIPALITIES
 
     def get_count(self, url):
         headers = {"Authorization": f"Bearer Api-Key {settings.GEO_SEARCH_API_KEY}"}
@@ -118,8 +138,8 @@ class GeoSearchImporter:
         )
         return results
 
-    def worker(self, page_queue, results_queue, url):
-        while not page_queue.empty():
+    def fetch_worker(self, page_queue, results_queue, url, stop):
+        while not stop.is_set():
             try:
                 page = page_queue.get_nowait()
             except Empty:
@@ -127,11 +147,75 @@ class GeoSearchImporter:
             try:
                 results = self.fetch_page(url, page)
             except Exception as err:
-                results_queue.put(err)
-            else:
-                results_queue.put(results)
-            finally:
-                page_queue.task_done()
+                put(results_queue, err, stop)
+                return
+            put(results_queue, results, stop)
+        put(results_queue, DONE, stop)
+
+    def parse_worker(self, results_queue, parsed_queue, parse, workers, stop):
+        done = 0
+        while done < workers and not stop.is_set():
+            try:
+                results = results_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            if results is DONE:
+                done += 1
+                continue
+            if not isinstance(results, Exception):
+                try:
+                    results = parse(results)
+                except Exception as err:
+                    results = err
+            put(parsed_queue, results, stop)
+            if isinstance(results, Exception):
+                return
+        put(parsed_queue, DONE, stop)
+
+    def process_pages(self, url, max_page, parse, write):
+        """
+        Fetch the pages of the URL in the worker threads and parse them in
+        a parser thread, while the parsed pages are written by the write
+        function in the calling thread, which owns the database connection.
+        The bounded queues between the stages keep the fetching from
+        running far ahead of the writing.
+        """
+        page_queue = Queue()
+        for page in range(1, max_page + 1):
+            page_queue.put(page)
+        results_queue = Queue(maxsize=QUEUE_SIZE)
+        parsed_queue = Queue(maxsize=QUEUE_SIZE)
+        stop = Event()
+        workers = min(self.workers, max_page)
+        threads = [
+            Thread(
+                target=self.fetch_worker,
+                args=(page_queue, results_queue, url, stop),
+                daemon=True,
+            )
+            for _ in range(workers)
+        ]
+        threads.append(
+            Thread(
+                target=self.parse_worker,
+                args=(results_queue, parsed_queue, parse, workers, stop),
+                daemon=True,
+            )
+        )
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                parsed = parsed_queue.get()
+                if parsed is DONE:
+                    break
+                if isinstance(parsed, Exception):
+                    raise parsed
+                write(parsed)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
 
     def get_multilingual_street_names(self, result):
         street_name_fi = result["street"]["name"]["fi"]
@@ -196,66 +280,65 @@ class GeoSearchImporter:
             postal_code_area.save()
         return postal_code_area
 
+    def parse_page(self, results):
+        """
+        Return the fields of the streets and the addresses of the page.
+        """
+        rows = []
+        for result in results:
+            street_names = self.get_multilingual_street_names(result)
+            number = result.get("number", "")
+            number_end = result.get("number_end", "")
+            letter = result.get("letter", "")
+            rows.append(
+                {
+                    "postal_code_area": result["postal_code_area"],
+                    "street_names": street_names,
+                    "number": number,
+                    "number_end": number_end,
+                    "letter": letter,
+                    "full_names": self.get_multilingual_full_names(
+                        *street_names, number, number_end, letter
+                    ),
+                    "location": self.get_location(result),
+                }
+            )
+        return rows
+
     @transaction.atomic
-    def save_page(self, results, municipality):
-        cache_misses = 0
-        cache_hits = 0
+    def save_page(self, rows, municipality):
         streets = []
         addresses = []
-        for result in results:
-            postal_code = result["postal_code_area"]["postal_code"]
+        for row in rows:
+            postal_code = row["postal_code_area"]["postal_code"]
             if postal_code not in self.postal_code_areas_cache:
                 self.postal_code_areas_cache[postal_code] = (
-                    self.get_or_create_postal_code_area(postal_code, result)
+                    self.get_or_create_postal_code_area(postal_code, row)
                 )
 
-            (
-                street_name_fi,
-                street_name_sv,
-                street_name_en,
-            ) = self.get_multilingual_street_names(result)
+            street_name_fi, street_name_sv, street_name_en = row["street_names"]
             if street_name_fi not in self.streets_cache:
-                street_entry = {
-                    "name": street_name_fi,
-                    "name_sv": street_name_sv,
-                    "name_en": street_name_en,
-                    "municipality": municipality,
-                }
-                cache_misses += 1
-                try:
-                    street = Street.objects.get(**street_entry)
-                except Street.DoesNotExist:
-                    street = Street(**street_entry)
-                    streets.append(street)
-
+                street = Street(
+                    name=street_name_fi,
+                    name_sv=street_name_sv,
+                    name_en=street_name_en,
+                    municipality=municipality,
+                )
+                streets.append(street)
                 self.streets_cache[street_name_fi] = street
-            else:
-                cache_hits += 1
 
-            location = self.get_location(result)
-            if not location:
+            if not row["location"]:
                 continue
-            number = result.get("number", "")
-            number_end = result.get("number_end", "")
-            letter = result.get("letter", "")
-            full_name_fi, full_name_sv, full_name_en = self.get_multilingual_full_names(
-                street_name_fi,
-                street_name_sv,
-                street_name_en,
-                number,
-                number_end,
-                letter,
-            )
-
+            full_name_fi, full_name_sv, full_name_en = row["full_names"]
             # Ensures that no duplicates goes to DB, as there are some in the source data
             if full_name_fi not in self.address_cache:
                 address = Address(
                     municipality_id=municipality.id,
                     street=self.streets_cache[street_name_fi],
-                    number=number,
-                    number_end=number_end,
-                    letter=letter,
-                    location=location,
+                    number=row["number"],
+                    number_end=row["number_end"],
+                    letter=row["letter"],
+                    location=row["location"],
                     postal_code_area=self.postal_code_areas_cache[postal_code],
                     full_name_fi=full_name_fi,
                     full_name_sv=full_name_sv,
@@ -270,24 +353,23 @@ class GeoSearchImporter:
         if len_streets > 0:
             Street.objects.bulk_create(streets)
         Address.objects.bulk_create(addresses)
+        add_import_rows(len_addresses)
 
         self.logger.info(
             f"Page saved with {len_addresses} addresses and {len_streets} street."
         )
-        self.logger.info(
-            f"Page processed with {cache_hits} caches hits and {cache_misses} misses."
-        )
         self.addresses_imported += len_addresses
         self.streets_imported += len_streets
 
     def import_municipality(self, municipality, municipality_code):
-        # contains the page numbers to fetch
-        page_queue = Queue()
-        # contains the results fetched
-        results_queue = Queue()
-        self.streets_cache = {}
+        # The streets of the municipality are looked up from the cache, which
+        # contains also the streets created by the import.
+        self.streets_cache = {
+            street.name_fi: street
+            for street in Street.objects.filter(municipality=municipality)
+        }
         self.address_cache = {}
-        url = f"{BASE_URL}?municipalitycode={municipality_code}&page_size={1}"
+        url = f"{self.base_url}?municipalitycode={municipality_code}&page_size={1}"
 
         count = self.get_count(url)
         max_page = int(count / PAGE_SIZE) + 1
@@ -296,35 +378,11 @@ class GeoSearchImporter:
             f"Source data for municipality contains {count} items and {max_page} pages(page_size={PAGE_SIZE})."
         )
 
-        url = f"{BASE_URL}?municipalitycode={municipality_code}&page_size={PAGE_SIZE}"
-        for pool in range(0, max_page, THREAD_POOL_SIZE):
-            threads = []
-            # Create threads to the pool
-            for page in range(1, THREAD_POOL_SIZE + 1):
-                page_number = page + pool
-                if page_number <= max_page:
-                    page_queue.put(page_number)
-                    threads.append(
-                        Thread(
-                            target=self.worker,
-                            args=(page_queue, results_queue, url),
-                        )
-                    )
+        url = f"{self.base_url}?municipalitycode={municipality_code}&page_size={PAGE_SIZE}"
 
-            for thread in threads:
-                thread.start()
-            page_queue.join()
-            while threads:
-                threads.pop().join()
-            while not results_queue.empty():
-                results = results_queue.get()
-                if not isinstance(results, Exception):
-                    self.save_page(results, municipality)
-                else:
-                    raise results
-
-            end_time = datetime.now()
-            duration = end_time - self.start_time
+        def write(rows):
+            self.save_page(rows, municipality)
+            duration = datetime.now() - self.start_time
             output_rate = (
                 self.streets_imported + self.addresses_imported
             ) / duration.total_seconds()
@@ -336,10 +394,13 @@ class GeoSearchImporter:
                 f"Addresses imported: {self.addresses_imported}, Streets imported: {self.streets_imported}"
             )
 
+        self.process_pages(url, max_page, self.parse_page, write)
+
     @transaction.atomic
     def enrich_page(self, results, municipality):
         streets = []
         addresses = []
+        updated_addresses = []
         for result in results:
             (
                 street_name_fi,
@@ -363,8 +424,8 @@ class GeoSearchImporter:
                 "municipality": municipality,
             }
             if street_name_fi not in self.streets_cache:
-                try:
-                    street = Street.objects.get(**street_entry)
+                street = self.existing_streets.get(street_name_fi)
+                if street and street.name_en == street_name_en:
                     # Check if finnish and swedish name are the same(no translation) and
                     #  if translated swedish name exists, then we have a translation
                     if (
@@ -375,13 +436,12 @@ class GeoSearchImporter:
                         self.logger.info(
                             f"Updated translation for {street_name_fi} to {street_name_sv}"
                         )
-                        Street.objects.filter(**street_entry).update(
+                        Street.objects.filter(id=street.id).update(
                             name_sv=street_name_sv
                         )
                         self.streets_enriched_with_swedish_translation += 1
                     street_entry["name_sv"] = street_name_sv
-
-                except Street.DoesNotExist:
+                else:
                     street_entry["name_sv"] = street_name_sv
                     street = Street(**street_entry)
                     streets.append(street)
@@ -396,14 +456,20 @@ class GeoSearchImporter:
                 "number_end": result["number_end"],
                 "letter": result["letter"],
             }
-            address = None
-            try:
-                address = Address.objects.get(**address_entry)
-                if not address.postal_code_area:
+            address = self.existing_addresses.get(
+                (
+                    address_entry["street"].id,
+                    address_entry["number"],
+                    address_entry["number_end"],
+                    address_entry["letter"],
+                )
+            )
+            if address:
+                if not address.postal_code_area_id:
                     address.postal_code_area = self.postal_code_areas_cache[postal_code]
                     self.postal_code_areas_added_to_addresses += 1
-                    address.save()
-            except Address.DoesNotExist:
+                    updated_addresses.append(address)
+            else:
                 location = self.get_location(result)
                 if location:
                     (
@@ -437,6 +503,9 @@ class GeoSearchImporter:
             Street.objects.bulk_create(streets)
         if addresses:
             Address.objects.bulk_create(addresses)
+        if updated_addresses:
+            Address.objects.bulk_update(updated_addresses, ["postal_code_area"])
+        add_import_rows(len(results))
 
         self.logger.info(
             f"Processed page, added {len(streets)} streets and {len(addresses)} addresses."
@@ -445,20 +514,37 @@ class GeoSearchImporter:
         self.streets_imported += len(streets)
 
     def enrich_municipality(self, municipality, municipality_code):
-        url = f"{BASE_URL}?municipalitycode={municipality_code}&page_size={1}"
+        url = f"{self.base_url}?municipalitycode={municipality_code}&page_size={1}"
         self.streets_cache = {}
         self.address_cache = {}
+        # The existing streets and addresses of the municipality are looked
+        # up from dicts instead of querying them for every result.
+        self.existing_streets = {
+            street.name_fi: street
+            for street in Street.objects.filter(municipality=municipality)
+        }
+        self.existing_addresses = {
+            (
+                address.street_id,
+                address.number,
+                address.number_end,
+                address.letter,
+            ): address
+            for address in Address.objects.filter(municipality=municipality)
+        }
         count = self.get_count(url)
         max_page = int(count / PAGE_SIZE) + 1
         self.logger.info(f"Enriching municipality {municipality}.")
         self.logger.info(
             f"Source data for municipality contains {count} items and {max_page} pages(page_size={PAGE_SIZE})."
         )
-        url = f"{BASE_URL}?municipalitycode={municipality_code}&page_size={PAGE_SIZE}"
-        # add 1 as we start from 1 not 0.
-        for page in range(1, max_page + 1):
-            results = self.fetch_page(url, page)
-            self.enrich_page(results, municipality)
+        url = f"{self.base_url}?municipalitycode={municipality_code}&page_size={PAGE_SIZE}"
+        self.process_pages(
+            url,
+            max_page,
+            list,
+            lambda results: self.enrich_page(results, municipality),
+        )
 
     def enrich_addresses(self):
         """
@@ -482,7 +568,8 @@ class GeoSearchImporter:
             if not municipality:
                 self.logger.warning(f"Municipality {muni[1][0]} not found.")
                 continue
-            self.enrich_municipality(municipality, code)
+            with import_phase(f"enrich {muni[1][0]}"):
+                self.enrich_municipality(municipality, code)
 
         end_time = datetime.now()
         duration = end_time - self.start_time
@@ -514,7 +601,7 @@ class GeoSearchImporter:
         self.postal_code_areas_cache = {}
         self.postal_code_areas_created = 0
 
-        for muni in MUNICIPALITIES.items():
+        for muni in self.municipalities.items():
             code = muni[0]
             municipality = get_municipality(muni[1][0])
             if not municipality:
@@ -523,7 +610,8 @@ class GeoSearchImporter:
             # Delete all addresses of the municipality, ensures data is up to date.
             Street.objects.filter(municipality_id=municipality).delete()
 
-            self.import_municipality(municipality, code)
+            with import_phase(f"import {muni[1][0]}"):
+                self.import_municipality(municipality, code)
 
         end_time = datetime.now()
         duration = end_time - self.start_time
@@ -546,7 +634,7 @@ class GeoSearchImporter:
             f"Addresses where fetched and stored at a average rate of (addresses/s): {output_rate}"
         )
         self.logger.info(
-            f"THREAD_POOL_SIZE: {THREAD_POOL_SIZE} PAGE_SIZE:{PAGE_SIZE}"
+            f"Workers: {self.workers} PAGE_SIZE:{PAGE_SIZE}"
             + f" Fetched {self.addresses_imported} addresses and {self.streets_imported} streets."
         )
 
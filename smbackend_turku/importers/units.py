@@ -9,8 +9,13 @@ from django.utils import formats, translation
 from django.utils.dateparse import parse_date
 from munigeo.importer.sync import ModelSyncher
 
+from services.management.commands.services_import.bulk import (
+    get_source_hash,
+    UnitBulkWriter,
+)
 from services.management.commands.services_import.services import (
     remove_empty_service_nodes,
+    update_division_unit_counts,
     update_service_counts,
     update_service_node_counts,
 )
@@ -106,20 +111,51 @@ class UnitImporter:
         self.logger = logger
         self.importer = importer
         self.delete_external_source = delete_external_sources
-        self.unitsyncher = ModelSyncher(Unit.objects.all(), lambda obj: obj.id)
+        # The current relations of the units are compared in memory.
+        queryset = Unit.objects.select_related(
+            "accessibility_shortcomings"
+        ).prefetch_related(
+            "identifiers",
+            "connections",
+            "services",
+            "service_nodes",
+            "accessibility_properties",
+        )
+        self.unitsyncher = ModelSyncher(queryset, lambda obj: obj.id)
 
     def import_units(self):
         units = get_turku_resource("palvelupisteet")
 
+        self.services = {service.id: service for service in Service.objects.all()}
+        self.service_node_ids_by_service = defaultdict(set)
+        for node_id, service_id in ServiceNode.objects.filter(
+            related_services__isnull=False
+        ).values_list("id", "related_services"):
+            self.service_node_ids_by_service[service_id].add(node_id)
+        # The units are imported again when the services or the accessibility
+        # rules change.
+        self.source_context_hash = get_source_hash(
+            AccessibilityShortcomingCalculator().rules_hash,
+            sorted(self.services),
+            sorted(
+                (service_id, sorted(node_ids))
+                for service_id, node_ids in self.service_node_ids_by_service.items()
+            ),
+        )
+        self.writer = UnitBulkWriter(logger=self.logger)
+
         for unit in units:
             self._handle_unit(unit)
+        self.writer.flush()
+        self.writer.log_throughput()
         if not self.delete_external_source:
             for config in get_external_sources_yaml_config():
                 self._handle_external_units(config)
 
         self.unitsyncher.finish()
-        update_service_node_counts()
+        update_service_node_counts(getattr(self.importer, "unit_count_state", None))
         update_service_counts()
+        update_division_unit_counts()
         remove_empty_service_nodes(self.logger)
 
     def _handle_unit(self, unit_data):
@@ -133,9 +169,31 @@ class UnitImporter:
             return
 
         obj = self.unitsyncher.get(unit_id)
+        # The accessibility properties come from the accessibility importer,
+        # and the shortcomings of the unit are calculated from them.
+        accessibility_properties = sorted(
+            (p.variable_id, p.value)
+            for p in (self._get_related(obj, "accessibility_properties") if obj else [])
+        )
+        # The expired opening hours are left out of the unit, so the unit is
+        # imported again when some of them expire.
+        opening_hours_data = self._get_current_opening_hours(unit_data)
+        source_hash = get_source_hash(
+            unit_data,
+            opening_hours_data,
+            accessibility_properties,
+            self.source_context_hash,
+        )
+        if obj and obj.source_hash == source_hash:
+            self.unitsyncher.mark(obj)
+            self.writer.unit_handled(skipped=True)
+            return
+
+        created = False
         if not obj:
             obj = Unit(id=unit_id)
             obj._changed = True
+            created = True
 
         self._handle_root_fields(obj, unit_data)
         self._handle_location(obj, unit_data)
@@ -143,14 +201,15 @@ class UnitImporter:
         self._handle_ptv_id(obj, unit_data)
         self._handle_service_descriptions(obj, unit_data)
         self._handle_provider_type(obj)
-        self._save_object(obj)
-        self._handle_opening_hours(obj, unit_data)
+        self._handle_opening_hours(obj, opening_hours_data)
         self._handle_email_and_phone_numbers(obj, unit_data)
-        self._handle_services_and_service_nodes(obj, unit_data)
+        services = self._handle_services_and_service_nodes(obj, unit_data)
         self._handle_accessibility_shortcomings(obj)
-        self._handle_service_names(obj)
-        self._save_object(obj)
+        self._handle_service_names(obj, services)
+        self._save_object(obj, created)
+        self.writer.set_source_hash(obj, source_hash)
         self.unitsyncher.mark(obj)
+        self.writer.unit_handled()
 
     def _handle_external_units(self, config):
         """
@@ -168,13 +227,43 @@ class UnitImporter:
                 synch_unit = self.unitsyncher.get(unit.id)
                 self.unitsyncher.mark(synch_unit)
 
-    def _save_object(self, obj):
+    def _save_object(self, obj, created=False):
         if obj._changed:
             obj.last_modified_time = datetime.now(UTC_TIMEZONE)
-            obj.save()
+            self.writer.save_unit(obj, created=created)
             if self.importer:
                 self.importer.services_changed = True
 
+    @staticmethod
+    def _get_related(obj, field_name):
+        # New units have no related rows yet, so they are not queried.
+        if obj._state.adding:
+            return []
+        return list(getattr(obj, field_name).all())
+
+    @staticmethod
+    def _get_connection_key(connection):
+        return (
+            connection.order,
+            connection.name_fi,
+            connection.name_sv,
+            connection.name_en,
+            connection.email,
+            connection.phone,
+        )
+
+    def _replace_connections(self, obj, section_type, connections):
+        old_connections = sorted(
+            self._get_connection_key(c)
+            for c in self._get_related(obj, "connections")
+            if c.section_type == section_type
+        )
+        new_connections = sorted(self._get_connection_key(c) for c in connections)
+        if old_connections != new_connections:
+            self.writer.replace_related(
+                UnitConnection, obj.id, connections, section_type=section_type
+            )
+
     def _handle_root_fields(self, obj, unit_data):
         self._update_fields(obj, unit_data, ROOT_FIELD_MAPPING)
 
@@ -261,67 +350,87 @@ class UnitImporter:
 
     def _handle_ptv_id(self, obj, unit_data):
         ptv_id = unit_data.get("ptv_id")
-
-        if ptv_id:
-            created, _ = UnitIdentifier.objects.get_or_create(
-                namespace="ptv", value=ptv_id, unit=obj
+        old_ptv_ids = [
+            identifier.value
+            for identifier in self._get_related(obj, "identifiers")
+            if identifier.namespace == "ptv"
+        ]
+        new_ptv_ids = [ptv_id] if ptv_id else []
+
+        if old_ptv_ids != new_ptv_ids:
+            self.writer.replace_related(
+                UnitIdentifier,
+                obj.id,
+                [
+                    UnitIdentifier(namespace="ptv", value=value, unit_id=obj.id)
+                    for value in new_ptv_ids
+                ],
+                namespace="ptv",
             )
-            if created:
-                obj._changed = True
-        else:
-            num_of_deleted, _ = UnitIdentifier.objects.filter(
-                namespace="ptv", unit=obj
-            ).delete()
-            if num_of_deleted:
-                obj._changed = True
+            obj._changed = True
 
     def _handle_services_and_service_nodes(self, obj, unit_data):
-        old_service_ids = set(obj.services.values_list("id", flat=True))
-        old_service_node_ids = set(obj.service_nodes.values_list("id", flat=True))
-        obj.services.clear()
-        obj.service_nodes.clear()
+        """
+        Update the services and the service nodes of the unit and return
+        the services of the unit.
+        """
+        old_service_ids = {s.id for s in self._get_related(obj, "services")}
+        old_service_node_ids = {n.id for n in self._get_related(obj, "service_nodes")}
 
+        new_service_ids = []
+        new_service_node_ids = set()
         for service_offer in unit_data.get("palvelutarjoukset", []):
             for service_data in service_offer.get("palvelut", []):
                 service_id = int(service_data.get("koodi"))
-                try:
-                    service = Service.objects.get(id=service_id)
-                except Service.DoesNotExist:
+                if service_id not in self.services:
                     # TODO fail the unit node completely here?
                     self.logger.warning(
                         'Service "{}" does not exist!'.format(service_id)
                     )
                     continue
-
-                UnitServiceDetails.objects.get_or_create(unit=obj, service=service)
-
-                service_nodes = ServiceNode.objects.filter(related_services=service)
-                obj.service_nodes.add(*service_nodes)
-
-        new_service_ids = set(obj.services.values_list("id", flat=True))
-        new_service_node_ids = set(obj.service_nodes.values_list("id", flat=True))
-
-        if (
-            old_service_ids != new_service_ids
-            or old_service_node_ids != new_service_node_ids
-        ):
+                if service_id not in new_service_ids:
+                    new_service_ids.append(service_id)
+                new_service_node_ids |= self.service_node_ids_by_service[service_id]
+
+        if old_service_ids != set(new_service_ids):
+            self.writer.replace_related(
+                UnitServiceDetails,
+                obj.id,
+                [
+                    UnitServiceDetails(unit_id=obj.id, service_id=service_id)
+                    for service_id in new_service_ids
+                ],
+            )
+            obj._changed = True
+        if old_service_node_ids != new_service_node_ids:
+            self.writer.set_m2m("service_nodes", obj.id, new_service_node_ids)
             obj._changed = True
 
         set_syncher_object_field(
             obj,
             "root_service_nodes",
-            ",".join(str(x) for x in obj.get_root_service_nodes()),
+            ",".join(
+                str(x) for x in self.writer.get_root_service_nodes(new_service_node_ids)
+            ),
         )
+        # In the default ordering of the services.
+        return [self.services[id] for id in sorted(new_service_ids, reverse=True)]
 
     def _handle_accessibility_shortcomings(self, obj):
-        description, count = AccessibilityShortcomingCalculator().calculate(obj)
-        UnitAccessibilityShortcomings.objects.update_or_create(
-            unit=obj,
-            defaults={
-                "accessibility_shortcoming_count": count,
-                "accessibility_description": description,
-            },
-        )
+        calculator = AccessibilityShortcomingCalculator()
+        properties = {
+            p.variable_id: p.value
+            for p in self._get_related(obj, "accessibility_properties")
+        }
+        fields = calculator.get_shortcomings_fields(properties)
+        try:
+            shortcomings = None if obj._state.adding else obj.accessibility_shortcomings
+        except UnitAccessibilityShortcomings.DoesNotExist:
+            shortcomings = None
+        if shortcomings is None or any(
+            getattr(shortcomings, field) != value for field, value in fields.items()
+        ):
+            self.writer.set_shortcomings(obj.id, fields)
 
     def _handle_service_descriptions(self, obj, unit_data):
         description_data = unit_data.get("kuvaus_kieliversiot", {})
@@ -338,16 +447,30 @@ class UnitImporter:
         if obj.provider_type is None:
             set_syncher_object_field(obj, "provider_type", 1)
 
-    def _handle_opening_hours(self, obj, unit_data):
-        obj.connections.filter(section_type=OPENING_HOURS_SECTION_TYPE).delete()
-
+    def _get_current_opening_hours(self, unit_data):
+        """
+        Return the opening hours data of the unit without the expired ones.
+        """
         try:
             opening_hours_data = unit_data["fyysinenPaikka"]["aukioloajat"]
         except KeyError:
             self.logger.debug(
                 "Cannot find opening hours for unit {}".format(unit_data.get("koodi"))
             )
-            return
+            return []
+
+        today = date.today()
+        current_opening_hours = []
+        for opening_hours_datum in opening_hours_data:
+            start = parse_date(opening_hours_datum["voimassaoloAlkamishetki"])
+            end = parse_date(opening_hours_datum["voimassaoloPaattymishetki"])
+            if start and start < today and end and end < today:
+                continue
+            current_opening_hours.append(opening_hours_datum)
+        return current_opening_hours
+
+    def _handle_opening_hours(self, obj, opening_hours_data):
+        connections = []
 
         # Opening hours data will be stored in a complex structure where opening hours data is
         # first grouped by type and then by Finnish name / title. Inside there each data entry
@@ -373,13 +496,6 @@ class UnitImporter:
             opening_hours_data, key=lambda x: x.get("voimassaoloAlkamishetki")
         ):
             opening_hours_type = opening_hours_datum["aukiolotyyppi"]
-
-            start = parse_date(opening_hours_datum["voimassaoloAlkamishetki"])
-            end = parse_date(opening_hours_datum["voimassaoloPaattymishetki"])
-            today = date.today()
-            if start and start < today and end and end < today:
-                continue
-
             opening_time = self._format_time(opening_hours_datum["avaamisaika"])
             closing_time = self._format_time(opening_hours_datum["sulkemisaika"])
 
@@ -441,38 +557,38 @@ class UnitImporter:
                         first_part, second_part
                     )
 
-                UnitConnection.objects.create(
-                    unit=obj,
-                    section_type=OPENING_HOURS_SECTION_TYPE,
-                    order=index,
-                    **names
+                connections.append(
+                    UnitConnection(
+                        unit_id=obj.id,
+                        section_type=OPENING_HOURS_SECTION_TYPE,
+                        order=index,
+                        **names
+                    )
                 )
                 index += 1
 
-    def _handle_email_and_phone_numbers(self, obj, unit_data):
-        UnitConnection.objects.filter(
-            unit=obj, section_type=PHONE_OR_EMAIL_SECTION_TYPE
-        ).delete()
+        self._replace_connections(obj, OPENING_HOURS_SECTION_TYPE, connections)
 
+    def _handle_email_and_phone_numbers(self, obj, unit_data):
+        connections = []
         index = 0
         email = unit_data.get("sahkoposti")
 
         if email:
-            UnitConnection.objects.get_or_create(
-                unit=obj,
-                section_type=PHONE_OR_EMAIL_SECTION_TYPE,
-                email=email,
-                name_fi="Sähköposti",
-                name_sv="E-post",
-                name_en="Email",
-                order=index,
+            connections.append(
+                UnitConnection(
+                    unit_id=obj.id,
+                    section_type=PHONE_OR_EMAIL_SECTION_TYPE,
+                    email=email,
+                    name_fi="Sähköposti",
+                    name_sv="E-post",
+                    name_en="Email",
+                    order=index,
+                )
             )
             index += 1
 
         phone_number_data = unit_data.get("puhelinnumerot", [])
-        if not phone_number_data:
-            return
-
         for phone_number_datum in phone_number_data:
             number_type = phone_number_datum.get("numerotyyppi")
             descriptions = phone_number_datum.get("kuvaus_kieliversiot", {})
@@ -487,17 +603,21 @@ class UnitImporter:
                 for language in LANGUAGES
             }
 
-            UnitConnection.objects.get_or_create(
-                unit=obj,
-                section_type=PHONE_OR_EMAIL_SECTION_TYPE,
-                phone=self._generate_phone_number(phone_number_datum),
-                order=index,
-                **names
+            connections.append(
+                UnitConnection(
+                    unit_id=obj.id,
+                    section_type=PHONE_OR_EMAIL_SECTION_TYPE,
+                    phone=self._generate_phone_number(phone_number_datum),
+                    order=index,
+                    **names
+                )
             )
             index += 1
 
-    def _handle_service_names(self, obj):
-        set_syncher_service_names_field(obj)
+        self._replace_connections(obj, PHONE_OR_EMAIL_SECTION_TYPE, connections)
+
+    def _handle_service_names(self, obj, services):
+        set_syncher_service_names_field(obj, services)
 
     def _generate_phone_number(self, phone_number_datum):
         if not phone_number_datum:
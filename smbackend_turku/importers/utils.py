@@ -191,11 +191,13 @@ def set_field(obj, obj_field_name, entry_value):
     return True
 
 
-def set_service_names_field(obj):
+def set_service_names_field(obj, services=None):
     service_names_fi = []
     service_names_sv = []
     service_names_en = []
-    for service in obj.services.all():
+    if services is None:
+        services = obj.services.all()
+    for service in services:
         if service.name_fi:
             service_names_fi.append(service.name_fi)
         if service.name_sv:
@@ -216,8 +218,8 @@ def set_service_names_field(obj):
     return True
 
 
-def set_syncher_service_names_field(obj):
-    obj._changed |= set_service_names_field(obj)
+def set_syncher_service_names_field(obj, services=None):
+    obj._changed |= set_service_names_field(obj, services)
 
 
 def set_syncher_object_field(obj, obj_field_name, value):
@@ -5,6 +5,7 @@ from services.management.commands.services_import.services import (
     update_service_node_counts,
 )
 from services.models import Service, ServiceNode, Unit
+from services.response_cache import invalidates_cache
 
 SERVICE_NODE = "service_node"
 SERVICE = "service"
@@ -26,6 +27,7 @@ DELETE = [
 # changed. The bug that caused this is fixed and after this is run the
 # script is obsolete.
 class Command(BaseCommand):
+    @invalidates_cache("search", "mobility_data", "service_node_tree")
     def handle(self, *args, **options):
         for ids in DELETE:
             Unit.objects.filter(services__id=ids[SERVICE]).delete()
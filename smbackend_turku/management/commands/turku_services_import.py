@@ -7,6 +7,9 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.utils import translation
 
+from services.import_runs import import_phase, records_import_run
+from services.management.commands.services_import.services import get_unit_count_state
+from services.response_cache import invalidates_cache
 from smbackend_turku.importers.accessibility import import_accessibility
 from smbackend_turku.importers.addresses import import_addresses
 from smbackend_turku.importers.bicycle_stands import (  # noqa: F401
@@ -154,11 +157,18 @@ class Command(BaseCommand):
     # Activate the default language for the duration of the import
     # to make sure translated fields are populated correctly.
     @translation.override(settings.LANGUAGES[0][0])
+    @invalidates_cache("search", "mobility_data", "service_node_tree", "municipalities")
+    @records_import_run()
     def handle(self, **options):
 
         self.options = options
         self.verbosity = int(options.get("verbosity", 1))
         self.logger = logging.getLogger("turku_services_import")
+        # The state before the import, for updating the unit counts of only
+        # the service nodes of the changed units.
+        self.unit_count_state = None
+        if "units" in options["import_types"]:
+            self.unit_count_state = get_unit_count_state()
         # if set delete all external sources.
         self.delete_external_sources = options.get("delete_external_sources", False)
         # if set delete external sources in arguments
@@ -192,7 +202,8 @@ class Command(BaseCommand):
                 method = getattr(self, "import_%s" % imp)
                 if self.verbosity:
                     print("Importing %s..." % imp)
-                method()
+                with import_phase(imp):
+                    method()
                 import_count += 1
 
             if not import_count:
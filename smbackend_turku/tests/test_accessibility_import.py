@@ -90,3 +90,44 @@ def test_accessibility_variables_import(
     assert unit_accessibility_properties == 5
     assert unit_accessibility_property_1.value == "true"
     assert unit_accessibility_property_2.value == "false"
+
+
+@pytest.mark.django_db
+@patch("smbackend_turku.importers.utils.get_ar_servicepoint_accessibility_resource")
+@patch("smbackend_turku.importers.utils.get_ar_servicepoint_resource")
+@patch("smbackend_turku.importers.utils.get_ar_resource")
+def test_accessibility_properties_reimport(
+    ar_resource, ar_se_resource, ar_se_accessibility_resource
+):
+    from smbackend_turku.importers.accessibility import AccessibilityImporter
+
+    logger = logging.getLogger(__name__)
+
+    ar_resource.return_value = get_test_resource(
+        resource_name="accessibility/variables"
+    )
+    ar_se_resource.return_value = get_test_resource(resource_name="info")
+    ar_se_accessibility_resource.return_value = get_test_resource(
+        resource_name="properties"
+    )
+    create_municipalities()
+    create_units()
+    AccessibilityImporter(logger=logger).import_accessibility()
+
+    ptv_id_1 = "8j76h2hj-hb8b-8j87-j7g7-8796hg87654k"
+    unit = UnitIdentifier.objects.get(namespace="ptv", value=ptv_id_1).unit
+    uap = UnitAccessibilityProperty.objects.get(unit=unit, variable_id=259)
+    uap.value = "changed"
+    uap.save()
+    variable = AccessibilityVariable.objects.create(id=1, name="removed")
+    stale = UnitAccessibilityProperty.objects.create(
+        unit=unit, variable=variable, value="true"
+    )
+
+    AccessibilityImporter(logger=logger).import_accessibility()
+
+    # The changed value is updated in place and the property missing from
+    # the source is deleted.
+    assert UnitAccessibilityProperty.objects.count() == 5
+    assert UnitAccessibilityProperty.objects.get(id=uap.id).value == "true"
+    assert not UnitAccessibilityProperty.objects.filter(id=stale.id).exists()
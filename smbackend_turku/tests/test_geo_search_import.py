@@ -0,0 +1,128 @@
+import json
+import logging
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.contrib.gis.geos import Point
+from munigeo.models import Address, PostalCodeArea, Street
+
+from services.tests.utils import stub_http_server, StubRequestHandler
+from smbackend_turku.importers import geo_search
+from smbackend_turku.importers.geo_search import GeoSearchImporter
+from smbackend_turku.importers.utils import get_municipality
+from smbackend_turku.tests.utils import create_municipalities
+
+
+def get_result(street_fi, street_sv, number, postal_code="20100"):
+    return {
+        "street": {"name": {"fi": street_fi, "sv": street_sv}},
+        "number": number,
+        "number_end": "",
+        "letter": "",
+        "location": {"type": "Point", "coordinates": [22.26, 60.45]},
+        "postal_code_area": {
+            "postal_code": postal_code,
+            "name": {"fi": "Turku", "sv": "Åbo"},
+        },
+    }
+
+
+RESULTS = [
+    get_result("Aurakatu", "Auragatan", "1"),
+    get_result("Aurakatu", "Auragatan", "2"),
+    # Duplicate of the first address.
+    get_result("Aurakatu", "Auragatan", "1"),
+    get_result("Linnankatu", "Slottsgatan", "1", postal_code="20200"),
+    get_result("Hämeenkatu", "", "5"),
+]
+
+
+class GeoSearchHandler(StubRequestHandler):
+    def do_GET(self):  # noqa: N802
+        query = parse_qs(urlparse(self.path).query)
+        page_size = int(query["page_size"][0])
+        page = int(query.get("page", ["1"])[0])
+        self.server.pages.append(page)
+        start = (page - 1) * page_size
+        body = json.dumps(
+            {
+                "count": len(RESULTS),
+                "results": RESULTS[start : start + page_size],
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def geo_search_server():
+    with stub_http_server(GeoSearchHandler, path="/address/") as server:
+        server.pages = []
+        yield server
+
+
+@pytest.mark.django_db
+def test_geo_search_import(geo_search_server, monkeypatch):
+    monkeypatch.setattr(geo_search, "PAGE_SIZE", 2)
+    create_municipalities()
+    get_municipality.cache_clear()
+    importer = GeoSearchImporter(
+        logger=logging.getLogger(__name__),
+        workers=2,
+        base_url=geo_search_server.url,
+        municipalities={853: ("Turku", "Åbo")},
+    )
+    importer.import_addresses()
+
+    # The count request and the three pages of the results.
+    assert sorted(geo_search_server.pages) == [1, 1, 2, 3]
+    assert Street.objects.count() == 3
+    assert Address.objects.count() == 4
+    assert PostalCodeArea.objects.count() == 2
+    assert importer.duplicate_addresses == 1
+    street = Street.objects.get(name_fi="Hämeenkatu")
+    assert street.name_sv == "Hämeenkatu"
+    assert street.municipality_id == "turku"
+    address = Address.objects.get(street__name_fi="Linnankatu")
+    assert address.full_name_sv == "Slottsgatan 1"
+    assert address.postal_code_area.postal_code == "20200"
+
+
+@pytest.mark.django_db
+def test_geo_search_enrich(geo_search_server, monkeypatch):
+    monkeypatch.setattr(geo_search, "PAGE_SIZE", 2)
+    monkeypatch.setattr(geo_search, "ENRICH_MUNICIPALITIES", {853: ("Turku", "Åbo")})
+    create_municipalities()
+    get_municipality.cache_clear()
+    # The street and the address imported from the WFS server, without the
+    # Swedish name and the postal code area.
+    street = Street.objects.create(
+        name_fi="Aurakatu",
+        name_sv="Aurakatu",
+        name_en="Aurakatu",
+        municipality_id="turku",
+    )
+    address = Address.objects.create(
+        street=street,
+        municipality_id="turku",
+        number="1",
+        location=Point(240000, 6710000, srid=3067),
+        full_name_fi="Aurakatu 1",
+    )
+    importer = GeoSearchImporter(
+        logger=logging.getLogger(__name__),
+        workers=2,
+        base_url=geo_search_server.url,
+    )
+    importer.enrich_addresses()
+
+    assert Street.objects.get(id=street.id).name_sv == "Auragatan"
+    address = Address.objects.get(id=address.id)
+    assert address.postal_code_area.postal_code == "20100"
+    assert Street.objects.count() == 3
+    assert Address.objects.count() == 4
+    assert Address.objects.filter(street=street).count() == 2
+    assert importer.postal_code_areas_added_to_addresses == 1
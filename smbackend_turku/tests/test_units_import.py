@@ -4,11 +4,20 @@ from unittest.mock import patch
 
 import pytest
 from django.utils import timezone
+from freezegun import freeze_time
 
 from services.management.commands.services_import.services import (
     update_service_root_service_nodes,
 )
-from services.models import Service, ServiceNode, Unit, UnitConnection
+from services.models import (
+    AccessibilityVariable,
+    Service,
+    ServiceNode,
+    Unit,
+    UnitAccessibilityProperty,
+    UnitChange,
+    UnitConnection,
+)
 from smbackend_turku.tests.utils import (
     create_municipalities,
     get_location,
@@ -97,3 +106,72 @@ def test_unit_import(resource):
     assert unit_connections_opening_hours == 2
     assert unit_connection_1.name == opening_hours_name_1
     assert unit_connection_2.name == opening_hours_name_2
+
+
+@pytest.mark.django_db
+@patch("smbackend_turku.importers.utils.get_turku_resource")
+def test_unchanged_units_are_skipped(resource):
+    from smbackend_turku.importers.units import UnitImporter
+
+    logger = logging.getLogger(__name__)
+    create_municipalities()
+    resource.return_value = get_test_resource(resource_name=None)
+    UnitImporter(logger=logger).import_units()
+    modified_times = dict(Unit.objects.values_list("id", "last_modified_time"))
+    since = timezone.now()
+
+    UnitImporter(logger=logger).import_units()
+
+    assert dict(Unit.objects.values_list("id", "last_modified_time")) == modified_times
+    assert not UnitChange.objects.filter(time__gte=since).exists()
+
+
+@pytest.mark.django_db
+@patch("smbackend_turku.importers.utils.get_turku_resource")
+def test_units_with_expired_opening_hours_are_not_skipped(resource):
+    from smbackend_turku.importers.units import UnitImporter
+
+    logger = logging.getLogger(__name__)
+    create_municipalities()
+    data = get_test_resource(resource_name=None)
+    opening_hours = data[0]["fyysinenPaikka"]["aukioloajat"][0]
+    opening_hours["voimassaoloAlkamishetki"] = "2020-01-01"
+    opening_hours["voimassaoloPaattymishetki"] = "2020-06-02"
+    resource.return_value = data
+    with freeze_time("2020-06-01"):
+        UnitImporter(logger=logger).import_units()
+
+    # The units are skipped on the next day if their data has not changed.
+    with freeze_time("2020-06-02"):
+        since = timezone.now()
+        UnitImporter(logger=logger).import_units()
+        assert not UnitChange.objects.filter(time__gte=since).exists()
+
+    with freeze_time("2020-06-03"):
+        since = timezone.now()
+        UnitImporter(logger=logger).import_units()
+        assert list(
+            UnitChange.objects.filter(time__gte=since).values_list("unit_id", flat=True)
+        ) == [int(data[0]["koodi"])]
+
+
+@pytest.mark.django_db
+@patch("smbackend_turku.importers.utils.get_turku_resource")
+def test_units_with_changed_accessibility_are_not_skipped(resource):
+    from smbackend_turku.importers.units import UnitImporter
+
+    logger = logging.getLogger(__name__)
+    create_municipalities()
+    resource.return_value = get_test_resource(resource_name=None)
+    UnitImporter(logger=logger).import_units()
+    unit = Unit.objects.order_by("id").first()
+    source_hashes = dict(Unit.objects.values_list("id", "source_hash"))
+
+    # The accessibility importer has changed the properties of the unit.
+    variable = AccessibilityVariable.objects.create(id=1, name="variable")
+    UnitAccessibilityProperty.objects.create(unit=unit, variable=variable, value="1")
+    UnitImporter(logger=logger).import_units()
+
+    new_source_hashes = dict(Unit.objects.values_list("id", "source_hash"))
+    assert new_source_hashes.pop(unit.id) != source_hashes.pop(unit.id)
+    assert new_source_hashes == source_hashes
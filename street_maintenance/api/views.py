@@ -2,12 +2,13 @@ from datetime import datetime
 
 from django.utils.decorators import method_decorator
 from django.utils.timezone import make_aware
-from django.views.decorators.cache import cache_page
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from rest_framework import mixins, viewsets
 from rest_framework.exceptions import ParseError
 from rest_framework.pagination import PageNumberPagination
 
+from services.api_pagination import KeysetPaginationMixin
+from services.response_cache import generation_cache_page
 from street_maintenance.api.serializers import (
     ActiveEventSerializer,
     GeometryHistorySerializer,
@@ -86,9 +87,10 @@ _maintenance_works_list_parameters = [
         "geometry is a linestring a separate list of coordinates will be serialized.",
     )
 )
-class MaintenanceWorkViewSet(viewsets.ReadOnlyModelViewSet):
+class MaintenanceWorkViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = MaintenanceWorkSerializer
     pagination_class = LargeResultsSetPagination
+    keyset_ordering = "-timestamp"
 
     def get_queryset(self):
         queryset = MaintenanceWork.objects.all()
@@ -158,9 +160,10 @@ _geometry_history_list_parameters = [
         "GeometryHistory object is created. The coordinates are in SRID 4326.",
     )
 )
-class GeometryHitoryViewSet(viewsets.ReadOnlyModelViewSet):
+class GeometryHitoryViewSet(KeysetPaginationMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = GeometryHistorySerializer
     pagination_class = LargeResultsSetPagination
+    keyset_ordering = "-timestamp"
 
     def get_queryset(self):
         queryset = GeometryHistory.objects.all()
@@ -188,7 +191,7 @@ class GeometryHitoryViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(timestamp__gte=make_aware(start_date_time))
         return queryset
 
-    @method_decorator(cache_page(60 * 15))
+    @method_decorator(generation_cache_page(60 * 15, "street_maintenance"))
     def list(self, request):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
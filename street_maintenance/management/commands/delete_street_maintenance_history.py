@@ -2,6 +2,7 @@ import logging
 
 from django.core.management import BaseCommand
 
+from services.response_cache import invalidates_cache
 from street_maintenance.models import GeometryHistory, MaintenanceUnit
 
 from .constants import PROVIDERS
@@ -21,6 +22,7 @@ class Command(BaseCommand):
             help=", ".join(PROVIDERS),
         )
 
+    @invalidates_cache("street_maintenance")
     def handle(self, *args, **options):
         providers = [p.upper() for p in options.get("providers", None)]
 
@@ -3,6 +3,8 @@ from datetime import datetime
 
 from django.core.management import BaseCommand
 
+from services.import_runs import add_import_rows, import_phase, records_import_run
+from services.response_cache import invalidates_cache
 from street_maintenance.models import MaintenanceUnit, MaintenanceWork
 
 from .constants import (
@@ -50,6 +52,8 @@ class Command(BaseCommand):
             help=", ".join(PROVIDERS),
         )
 
+    @invalidates_cache("street_maintenance")
+    @records_import_run()
     def handle(self, *args, **options):
         history_size = None
         fetch_size = None
@@ -79,28 +83,32 @@ class Command(BaseCommand):
                 if fetch_size
                 else HISTORY_SIZES[provider].get(FETCH_SIZE, None)
             )
-            match provider.upper():
-                case PROVIDER_TYPES.DESTIA | PROVIDER_TYPES.INFRAROAD:
-                    num_created_units, num_del_units = create_maintenance_units(
-                        provider
-                    )
-                    num_created_works, num_del_works = create_maintenance_works(
-                        provider, history_size, fetch_size
-                    )
-                case PROVIDER_TYPES.KUNTEC:
-                    num_created_units, num_del_units = create_kuntec_maintenance_units()
-                    num_created_works, num_del_works = create_kuntec_maintenance_works(
-                        history_size
-                    )
+            with import_phase(provider):
+                match provider.upper():
+                    case PROVIDER_TYPES.DESTIA | PROVIDER_TYPES.INFRAROAD:
+                        num_created_units, num_del_units = create_maintenance_units(
+                            provider
+                        )
+                        num_created_works, num_del_works = create_maintenance_works(
+                            provider, history_size, fetch_size
+                        )
+                    case PROVIDER_TYPES.KUNTEC:
+                        num_created_units, num_del_units = (
+                            create_kuntec_maintenance_units()
+                        )
+                        num_created_works, num_del_works = (
+                            create_kuntec_maintenance_works(history_size)
+                        )
 
-                case PROVIDER_TYPES.YIT:
-                    access_token = get_yit_access_token()
-                    num_created_units, num_del_units = create_yit_maintenance_units(
-                        access_token
-                    )
-                    num_created_works, num_del_works = create_yit_maintenance_works(
-                        access_token, history_size
-                    )
+                    case PROVIDER_TYPES.YIT:
+                        access_token = get_yit_access_token()
+                        num_created_units, num_del_units = create_yit_maintenance_units(
+                            access_token
+                        )
+                        num_created_works, num_del_works = create_yit_maintenance_works(
+                            access_token, history_size
+                        )
+                add_import_rows(num_created_works)
 
             tot_num_units = MaintenanceUnit.objects.filter(provider=provider).count()
             tot_num_works = MaintenanceWork.objects.filter(
@@ -120,7 +128,8 @@ class Command(BaseCommand):
             )
 
             if num_created_works > 0:
-                precalculate_geometry_history(provider)
+                with import_phase(f"{provider} geometry history"):
+                    precalculate_geometry_history(provider)
             else:
                 logger.warning(
                     f"No works created for {provider}, skipping geometry history population."